@@ -0,0 +1,431 @@
+"""Asyncio (aiohttp) serving mode for the BetterWeather API.
+
+Serves the same routes as api_server.py and shares its station index,
+demand tracker and generation job manager. Frames are streamed with
+non-blocking sendfile, and requests for stations that are still being
+generated await the shared job instead of holding a thread. Filesystem work
+(manifest reads, stats, demand flushes, image opens) runs on the default
+executor so it never stalls the event loop. Selected with
+API_SERVER_MODE=async (see api_server.py).
+"""
+import asyncio
+import functools
+import os
+
+from aiohttp import hdrs, web
+
+from api_server import (API_PORT, IMAGES_DIR, MAX_BATCH_LOCATIONS, NUM_IMAGES, SERVE_WAIT_SECONDS, STATION_IDS,
+                        STATION_INDEX, background_path, bundle_info, demand, format_match, jobs, layers_info,
+                        metrics_text, parse_coordinate, parse_k, parse_range_km)
+from api_server import select_rendition as select_rendition_sync
+from bundles import FrameBundle
+from frame_store import FrameStore
+from generation_jobs import QueueFullError
+from http_cache import BACKGROUND_MAX_AGE_SECONDS, IMMUTABLE_MAX_AGE_SECONDS, CacheHeaders, ETag, FrameMaxAge, IsNotModified
+from metrics import CONTENT_TYPE, METRICS
+from radar_stations import MosaicId
+from renditions import PROFILES
+
+
+def error(message: str, status: int) -> web.Response:
+    return web.json_response({'status': 'error', 'message': message}, status=status)
+
+
+@functools.lru_cache(maxsize=None)
+def station_store(radar_id: str) -> FrameStore:
+    """Shared frame store for a validated station, so its manifest cache lasts across requests"""
+    return FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR)
+
+
+def retry_response(message: str, status: int = 202, state: str = 'generating') -> web.Response:
+    """JSON response asking the client to retry shortly"""
+    return web.json_response({'status': state, 'message': message}, status=status,
+                             headers={'Retry-After': str(max(1, round(SERVE_WAIT_SECONDS)))})
+
+
+async def in_thread(func, *args):
+    """Run a blocking call on the default executor and await its result"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def wait_for_job(job, timeout: float) -> bool:
+    """Await a generation job for up to timeout seconds without cancelling it"""
+    if not job.done:
+        await asyncio.wait([asyncio.wrap_future(job.future)], timeout=timeout)
+    return job.done
+
+
+def indexed_frame(store: FrameStore, index: int) -> tuple:
+    """(path, timestamp, newest timestamp) of a buffered slot; path is None if its file is missing"""
+    image_path, timestamp = store.Frame(index)
+    if not image_path or not os.path.exists(image_path):
+        return None, timestamp, None
+    return image_path, timestamp, store.Timestamps()[-1]
+
+
+def timestamped_frame(store: FrameStore, timestamp: str) -> str:
+    """Path of the buffered frame with a BOM timestamp, None if it isn't buffered"""
+    image_path = store.PathFor(timestamp)
+    return image_path if image_path and os.path.exists(image_path) else None
+
+
+async def select_rendition(image_path: str, radar_id: str, timestamp: str, profile: str, store: FrameStore,
+                           layer: str = None) -> tuple:
+    """(path, mimetype) of a frame's overlay or device profile rendition (see api_server.select_rendition)"""
+    if layer != 'radar' and (not profile or not timestamp):
+        return image_path, 'image/png'
+    return await in_thread(select_rendition_sync, image_path, radar_id, timestamp, profile, store, layer)
+
+
+class FrameFileResponse(web.FileResponse):
+    """FileResponse that leaves If-Modified-Since to http_cache.IsNotModified.
+
+    aiohttp would otherwise answer it with 304 for URLs whose file can be
+    replaced within the same second (see IsNotModified).
+    """
+
+    async def prepare(self, request: web.BaseRequest):
+        if hdrs.IF_MODIFIED_SINCE in request.headers:
+            headers = request.headers.copy()
+            del headers[hdrs.IF_MODIFIED_SINCE]
+            request = request.clone(headers=headers)
+        return await super().prepare(request)
+
+
+def frame_headers(image_path: str, radar_id: str, newest_timestamp: str, immutable: bool, max_age: int) -> tuple:
+    """(etag, last_modified, headers) for a frame; stats the file and may read the station's cadence"""
+    etag, last_modified = ETag(image_path)
+    if immutable:
+        headers = CacheHeaders(etag, last_modified, IMMUTABLE_MAX_AGE_SECONDS, immutable=True)
+    elif max_age is not None:
+        headers = CacheHeaders(etag, last_modified, max_age)
+    else:
+        headers = CacheHeaders(etag, last_modified, FrameMaxAge(radar_id, newest_timestamp, IMAGES_DIR))
+    return etag, last_modified, headers
+
+
+async def send_frame(request: web.Request, image_path: str, radar_id: str, timestamp: str,
+                     newest_timestamp: str = None, immutable: bool = False, mimetype: str = 'image/png',
+                     max_age: int = None) -> web.StreamResponse:
+    """Frame response with validators and cache lifetime, or 304 (see api_server.send_frame)"""
+    etag, last_modified, headers = await in_thread(
+        frame_headers, image_path, radar_id, newest_timestamp, immutable, max_age)
+    if timestamp:
+        headers['X-Frame-Timestamp'] = timestamp
+
+    if IsNotModified(request.headers, etag, last_modified, modified_since=immutable):
+        return web.Response(status=304, headers=headers)
+    return FrameFileResponse(image_path, headers={'Content-Type': mimetype, **headers})
+
+
+async def receive_location(request: web.Request) -> web.Response:
+    """Receive GPS coordinates from watch and return nearest radar station"""
+    try:
+        lat = parse_coordinate(request.query.get('lat'), 90)
+        lon = parse_coordinate(request.query.get('lon'), 180)
+        k = parse_k(request.query.get('k', 1))
+        range_km = parse_range_km(request.query.get('range_km'))
+        mosaic = request.query.get('mosaic') == '1'
+    except (TypeError, ValueError) as e:
+        print(f'Error parsing coordinates: {e}')
+        return error('Invalid coordinates', 400)
+
+    print(f'Received GPS coordinates: lat={lat}, lon={lon}')
+    matches = STATION_INDEX.Nearest(lat, lon, k, range_km)
+    radar_id = matches[0]['radar_id']
+    print(f'Nearest radar: {radar_id} ({matches[0]["radar_name"]}) - {matches[0]["distance_km"]:.1f}km away')
+    await in_thread(demand.Record, MosaicId(radar_id) if mosaic else radar_id)
+
+    response = {'status': 'success', **format_match(matches[0]), 'coordinates': {'lat': lat, 'lon': lon}}
+    if mosaic:
+        response['mosaic_id'] = MosaicId(radar_id)
+    if k > 1:
+        response['nearest'] = [format_match(match) for match in matches]
+    return web.json_response(response)
+
+
+async def receive_locations(request: web.Request) -> web.Response:
+    """Resolve the nearest radar stations for many coordinates in one call"""
+    try:
+        body = await request.json()
+    except ValueError:
+        body = {}
+    locations = body.get('locations') if isinstance(body, dict) else None
+    if not isinstance(locations, list) or not locations:
+        return error('Expected a non-empty "locations" list', 400)
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        return error(f'At most {MAX_BATCH_LOCATIONS} locations per request', 400)
+
+    try:
+        k = parse_k(body.get('k', 1))
+        range_km = parse_range_km(body.get('range_km'))
+        lats = [parse_coordinate(location['lat'], 90) for location in locations]
+        lons = [parse_coordinate(location['lon'], 180) for location in locations]
+    except (TypeError, ValueError, KeyError) as e:
+        print(f'Error parsing batch coordinates: {e}')
+        return error('Invalid coordinates', 400)
+
+    results = []
+    for lat, lon, matches in zip(lats, lons, STATION_INDEX.NearestMany(lats, lons, k, range_km)):
+        result = {**format_match(matches[0]), 'coordinates': {'lat': lat, 'lon': lon}}
+        if k > 1:
+            result['nearest'] = [format_match(match) for match in matches]
+        results.append(result)
+    return web.json_response({'status': 'success', 'results': results})
+
+
+def buffered_images(store: FrameStore) -> tuple:
+    """([whether each slot's file exists], timestamps) of a station's buffer"""
+    paths = [store.Path(i) for i in range(NUM_IMAGES)]
+    return [path is not None and os.path.exists(path) for path in paths], store.Timestamps()
+
+
+async def check_images(request: web.Request) -> web.Response:
+    """Check if images exist for a radar station"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+
+    store = station_store(radar_id)
+    images_exist, timestamps = await in_thread(buffered_images, store)
+    return web.json_response({'status': 'success', 'radar_id': radar_id, 'all_images_exist': all(images_exist),
+                              'images_exist': images_exist, 'timestamps': timestamps})
+
+
+async def generate_images(request: web.Request) -> web.Response:
+    """Trigger image generation for a radar station"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+    await in_thread(demand.Record, radar_id)
+
+    if jobs.Active(radar_id):
+        return web.json_response({'status': 'in_progress',
+                                  'message': f'Images for {radar_id} are already being generated',
+                                  'job': jobs.Status(radar_id)}, status=202)
+
+    if await in_thread(station_store(radar_id).IsFull):
+        return web.json_response({'status': 'success', 'message': f'Images for {radar_id} already exist'})
+
+    try:
+        job = jobs.Submit(radar_id)
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}')
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    return web.json_response({'status': 'generating', 'message': f'Started generating images for {radar_id}',
+                              'job': job.Status()}, status=202)
+
+
+async def job_status(request: web.Request) -> web.Response:
+    """Status of the current or most recent generation job for a radar station"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+
+    status = jobs.Status(radar_id)
+    if status is None:
+        return error(f'No generation job for {radar_id}', 404)
+    return web.json_response({'status': 'success', 'job': status})
+
+
+async def serve_image(request: web.Request) -> web.StreamResponse:
+    """Serve radar image, generating if it doesn't exist"""
+    radar_id = request.match_info['radar_id']
+    index = int(request.match_info['index'])
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+    if index < 0 or index >= NUM_IMAGES:
+        return error('Invalid image index', 400)
+    profile = request.query.get('profile')
+    if profile is not None and profile not in PROFILES:
+        return error('Unknown device profile', 400)
+    layer = request.query.get('layer')
+    if layer not in (None, 'radar'):
+        return error('Unknown layer', 400)
+    await in_thread(demand.Record, radar_id)
+
+    # The station's shared store caches its manifest by stat, so resolving the slot is a single stat
+    store = station_store(radar_id)
+    image_path, timestamp, newest = await in_thread(indexed_frame, store, index)
+    METRICS.Count('station_frames', image_path is not None)
+    if image_path:
+        image_path, mimetype = await select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+        if image_path is None:
+            return error('No radar overlay for this frame', 404)
+        return await send_frame(request, image_path, radar_id, timestamp, newest, mimetype=mimetype)
+
+    if await in_thread(store.IsFull) and not jobs.Active(radar_id):
+        return error('Image not found', 404)
+
+    # Start (or join) the station's generation and await it briefly
+    try:
+        job = jobs.Submit(radar_id)
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    if not await wait_for_job(job, SERVE_WAIT_SECONDS):
+        return retry_response('Images are being generated, please retry')
+
+    if not job.success:
+        return error(job.error or 'Image generation failed', 500)
+    image_path, timestamp, newest = await in_thread(indexed_frame, store, index)
+    if not image_path:
+        return error('Image not found', 404)  # Generated, but fewer frames are published than the buffer holds
+    image_path, mimetype = await select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+    if image_path is None:
+        return error('No radar overlay for this frame', 404)
+    return await send_frame(request, image_path, radar_id, timestamp, newest, mimetype=mimetype)
+
+
+async def serve_image_at(request: web.Request) -> web.StreamResponse:
+    """Serve the frame with a given BOM timestamp (YYYYMMDDHHMM) while it is buffered"""
+    radar_id = request.match_info['radar_id']
+    timestamp = request.match_info['timestamp']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+    profile = request.query.get('profile')
+    if profile is not None and profile not in PROFILES:
+        return error('Unknown device profile', 400)
+    layer = request.query.get('layer')
+    if layer not in (None, 'radar'):
+        return error('Unknown layer', 400)
+
+    store = station_store(radar_id)
+    image_path = await in_thread(timestamped_frame, store, timestamp)
+    if not image_path:
+        return error('Frame not buffered', 404)
+    image_path, mimetype = await select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+    if image_path is None:
+        return error('No radar overlay for this frame', 404)
+    return await send_frame(request, image_path, radar_id, timestamp, immutable=True, mimetype=mimetype)
+
+
+async def wait_for_frames(radar_id: str, store: FrameStore) -> web.Response:
+    """Start generation if nothing is buffered yet (see api_server.wait_for_frames)"""
+    buffered = await in_thread(store.Length) > 0
+    METRICS.Count('station_frames', buffered)
+    if buffered:
+        return None
+    try:
+        job = jobs.Submit(radar_id)
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    if not await wait_for_job(job, SERVE_WAIT_SECONDS):
+        return retry_response('Images are being generated, please retry')
+    if not job.success:
+        return error(job.error or 'Image generation failed', 500)
+    return None
+
+
+async def station_bundle(radar_id: str) -> tuple:
+    """(metadata, None) for a station's sprite sheet, or (None, response) (see api_server.station_bundle)"""
+    bundle = FrameBundle(station_store(radar_id))
+    response = await wait_for_frames(radar_id, bundle.store)
+    if response is not None:
+        return None, response
+
+    # Only the first request after an update renders the sheet; keep it off the event loop
+    meta = await in_thread(bundle.Get)
+    if meta is None:
+        return None, error('No frames buffered', 404)
+    return meta, None
+
+
+async def serve_bundle(request: web.Request) -> web.StreamResponse:
+    """Serve every buffered frame of a station as one sprite sheet (oldest first, row by row)"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+    await in_thread(demand.Record, radar_id)
+
+    meta, response = await station_bundle(radar_id)
+    if meta is None:
+        return response
+    response = await send_frame(request, meta['path'], radar_id, None, meta['timestamps'][-1])
+    response.headers['X-Frame-Timestamps'] = ','.join(ts or '' for ts in meta['timestamps'])
+    response.headers['X-Bundle-Layout'] = f'{meta["columns"]}x{meta["frame_width"]}x{meta["frame_height"]}'
+    return response
+
+
+async def bundle_manifest(request: web.Request) -> web.Response:
+    """Describe a station's sprite sheet: frame timestamps and where each frame sits"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+
+    meta, response = await station_bundle(radar_id)
+    if meta is None:
+        return response
+    return web.json_response({'status': 'success', 'url': f'/images/{radar_id}-bundle.png', **bundle_info(meta)})
+
+
+async def serve_background(request: web.Request) -> web.StreamResponse:
+    """Serve a station's static background layer (map, topography and roads)"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+
+    bg_path = background_path(radar_id)
+    if not await in_thread(os.path.exists, bg_path):
+        return error('Background not generated', 404)
+    if request.query.get('v'):
+        return await send_frame(request, bg_path, radar_id, None, immutable=True)
+    return await send_frame(request, bg_path, radar_id, None, max_age=BACKGROUND_MAX_AGE_SECONDS)
+
+
+async def layers_manifest(request: web.Request) -> web.Response:
+    """Describe how to stack a station's background and radar-only overlays"""
+    radar_id = request.match_info['radar_id']
+    if radar_id not in STATION_IDS:
+        return error('Invalid radar ID', 400)
+    await in_thread(demand.Record, radar_id)
+
+    store = station_store(radar_id)
+    response = await wait_for_frames(radar_id, store)
+    if response is not None:
+        return response
+    info = await in_thread(layers_info, radar_id, store)
+    if info is None:
+        return error('Background not generated', 404)
+    return web.json_response({'status': 'success', **info})
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Pipeline metrics in Prometheus text format"""
+    text = await in_thread(metrics_text)
+    return web.Response(body=text.encode(), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def health_check(request: web.Request) -> web.Response:
+    """Health check endpoint"""
+    return web.json_response({'status': 'ok'})
+
+
+def CreateApp() -> web.Application:
+    app = web.Application()
+    app.add_routes([
+        web.get('/api/location', receive_location),
+        web.post('/api/location/batch', receive_locations),
+        web.get('/api/check-images/{radar_id}', check_images),
+        web.post('/api/generate/{radar_id}', generate_images),
+        web.get('/api/jobs/{radar_id}', job_status),
+        web.get(r'/images/{radar_id}-{index:\d+}.png', serve_image),
+        web.get(r'/images/{radar_id}/{timestamp:\d+}.png', serve_image_at),
+        web.get('/images/{radar_id}-bundle.png', serve_bundle),
+        web.get('/api/bundle/{radar_id}', bundle_manifest),
+        web.get('/images/{radar_id}/background.png', serve_background),
+        web.get('/api/layers/{radar_id}', layers_manifest),
+        web.get('/api/metrics', metrics),
+        web.get('/api/health', health_check),
+    ])
+    return app
+
+
+def Run(host: str = '0.0.0.0', port: int = API_PORT):
+    print(f'Starting BetterWeather API server (asyncio) on port {port}...')
+    web.run_app(CreateApp(), host=host, port=port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    Run()
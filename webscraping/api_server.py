@@ -1,347 +1,120 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
+from PIL import Image
 import math
 import os
 import sys
-import threading
+import time
 
-# Add current directory to path to import ftpscraper functions
+# Add current directory to path to import the pipeline modules
 sys.path.insert(0, '/app')
 
+from bundles import FrameBundle
+from frame_store import FRAME_DIR, BackgroundPath, FrameStore
+from ftpscraper import GenerateStation
+from generation_jobs import JobManager, QueueFullError
+from cadence import TimestampSeconds
+from http_cache import BACKGROUND_MAX_AGE_SECONDS, IMMUTABLE_MAX_AGE_SECONDS, CacheHeaders, ETag, FrameMaxAge, IsNotModified
+from metrics import CONTENT_TYPE, METRICS, ReadSnapshot, Render
+from radar_stations import RADAR_STATIONS, MosaicId, MosaicPrimary
+from refresh_scheduler import DemandTracker
+from renditions import MIME_TYPES, PROFILES, RenditionCache
+from station_index import StationIndex
+
 app = Flask(__name__)
 
-# Track ongoing generation tasks to prevent duplicates
-generation_locks = {}
-
-# Australian BOM Radar Stations with coordinates
-# Source: http://www.bom.gov.au/products/radar_transparencies.shtml
-RADAR_STATIONS = {
-    'IDR011': {'name': 'Broadmeadows', 'lat': -37.691, 'lon': 144.946, 'scale': 2833.33},
-    'IDR012': {'name': 'Broadmeadows', 'lat': -37.691, 'lon': 144.946, 'scale': 1416.67},
-    'IDR013': {'name': 'Broadmeadows', 'lat': -37.691, 'lon': 144.946, 'scale': 708.33},
-    'IDR014': {'name': 'Broadmeadows', 'lat': -37.691, 'lon': 144.946, 'scale': 354.17},
-    'IDR021': {'name': 'Melbourne', 'lat': -37.852, 'lon': 144.752, 'scale': 2833.33},
-    'IDR022': {'name': 'Melbourne', 'lat': -37.852, 'lon': 144.752, 'scale': 1416.67},
-    'IDR023': {'name': 'Melbourne', 'lat': -37.852, 'lon': 144.752, 'scale': 708.33},
-    'IDR024': {'name': 'Melbourne', 'lat': -37.852, 'lon': 144.752, 'scale': 354.17},
-    'IDR031': {'name': 'Wollongong', 'lat': -34.2639, 'lon': 150.8739, 'scale': 2833.33},
-    'IDR032': {'name': 'Wollongong', 'lat': -34.2639, 'lon': 150.8739, 'scale': 1416.67},
-    'IDR033': {'name': 'Wollongong', 'lat': -34.2639, 'lon': 150.8739, 'scale': 708.33},
-    'IDR034': {'name': 'Wollongong', 'lat': -34.2639, 'lon': 150.8739, 'scale': 354.17},
-    'IDR041': {'name': 'Newcastle', 'lat': -32.7317, 'lon': 152.02499, 'scale': 2833.33},
-    'IDR042': {'name': 'Newcastle', 'lat': -32.7317, 'lon': 152.02499, 'scale': 1416.67},
-    'IDR043': {'name': 'Newcastle', 'lat': -32.7317, 'lon': 152.02499, 'scale': 708.33},
-    'IDR044': {'name': 'Newcastle', 'lat': -32.7317, 'lon': 152.02499, 'scale': 354.17},
-    'IDR061': {'name': 'Geraldton', 'lat': -28.8, 'lon': 114.7, 'scale': 2833.33},
-    'IDR062': {'name': 'Geraldton', 'lat': -28.8, 'lon': 114.7, 'scale': 1416.67},
-    'IDR063': {'name': 'Geraldton', 'lat': -28.8, 'lon': 114.7, 'scale': 708.33},
-    'IDR064': {'name': 'Geraldton', 'lat': -28.8, 'lon': 114.7, 'scale': 354.17},
-    'IDR071': {'name': 'Wyndham', 'lat': -15.453, 'lon': 128.119, 'scale': 2833.33},
-    'IDR072': {'name': 'Wyndham', 'lat': -15.453, 'lon': 128.119, 'scale': 1416.67},
-    'IDR073': {'name': 'Wyndham', 'lat': -15.453, 'lon': 128.119, 'scale': 708.33},
-    'IDR081': {'name': 'Gympie', 'lat': -25.967, 'lon': 152.58299, 'scale': 2833.33},
-    'IDR082': {'name': 'Gympie', 'lat': -25.967, 'lon': 152.58299, 'scale': 1416.67},
-    'IDR083': {'name': 'Gympie', 'lat': -25.967, 'lon': 152.58299, 'scale': 708.33},
-    'IDR084': {'name': 'Gympie', 'lat': -25.967, 'lon': 152.58299, 'scale': 354.17},
-    'IDR101': {'name': 'Darwin Ap', 'lat': -12.425, 'lon': 130.89101, 'scale': 2833.33},
-    'IDR102': {'name': 'Darwin Ap', 'lat': -12.425, 'lon': 130.89101, 'scale': 1416.67},
-    'IDR103': {'name': 'Darwin Ap', 'lat': -12.425, 'lon': 130.89101, 'scale': 708.33},
-    'IDR104': {'name': 'Darwin Ap', 'lat': -12.425, 'lon': 130.89101, 'scale': 354.17},
-    'IDR1061': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 2833.33},
-    'IDR1062': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 1416.67},
-    'IDR1063': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 708.33},
-    'IDR1064': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.5511, 'scale': 354.17},
-    'IDR1071': {'name': 'Richmond', 'lat': -20.75178, 'lon': 143.14145, 'scale': 2833.33},
-    'IDR1072': {'name': 'Richmond', 'lat': -20.75178, 'lon': 143.14145, 'scale': 1416.67},
-    'IDR1073': {'name': 'Richmond', 'lat': -20.75178, 'lon': 143.14145, 'scale': 708.33},
-    'IDR1074': {'name': 'Richmond', 'lat': -20.75178, 'lon': 143.14145, 'scale': 354.17},
-    'IDR1081': {'name': 'Toowoomba', 'lat': -27.2743, 'lon': 151.9924, 'scale': 2833.33},
-    'IDR1082': {'name': 'Toowoomba', 'lat': -27.2743, 'lon': 151.9924, 'scale': 1416.67},
-    'IDR1083': {'name': 'Toowoomba', 'lat': -27.2743, 'lon': 151.9924, 'scale': 708.33},
-    'IDR1084': {'name': 'Toowoomba', 'lat': -27.2743, 'lon': 151.9924, 'scale': 354.17},
-    'IDR111': {'name': 'Adelaide Ap', 'lat': -34.95, 'lon': 138.533, 'scale': 2833.33},
-    'IDR1111': {'name': 'Karratha', 'lat': -20.9924, 'lon': 116.8758, 'scale': 2833.33},
-    'IDR1112': {'name': 'Karratha', 'lat': -20.9924, 'lon': 116.8758, 'scale': 1416.67},
-    'IDR1113': {'name': 'Karratha', 'lat': -20.9924, 'lon': 116.8758, 'scale': 708.33},
-    'IDR1114': {'name': 'Karratha', 'lat': -20.9924, 'lon': 116.8758, 'scale': 354.17},
-    'IDR112': {'name': 'Adelaide Ap', 'lat': -34.95, 'lon': 138.533, 'scale': 1416.67},
-    'IDR1121': {'name': 'Gove Ap', 'lat': -12.26898, 'lon': 136.82043, 'scale': 2833.33},
-    'IDR1122': {'name': 'Gove Ap', 'lat': -12.26898, 'lon': 136.82043, 'scale': 1416.67},
-    'IDR1123': {'name': 'Gove Ap', 'lat': -12.26898, 'lon': 136.82043, 'scale': 708.33},
-    'IDR1124': {'name': 'Gove Ap', 'lat': -12.26898, 'lon': 136.82043, 'scale': 354.17},
-    'IDR113': {'name': 'Adelaide Ap', 'lat': -34.95, 'lon': 138.533, 'scale': 708.33},
-    'IDR114': {'name': 'Adelaide Ap', 'lat': -34.95, 'lon': 138.533, 'scale': 354.17},
-    'IDR1141': {'name': 'Carnarvon', 'lat': -24.883, 'lon': 113.667, 'scale': 2833.33},
-    'IDR1142': {'name': 'Carnarvon', 'lat': -24.883, 'lon': 113.667, 'scale': 1416.67},
-    'IDR1143': {'name': 'Carnarvon', 'lat': -24.883, 'lon': 113.667, 'scale': 708.33},
-    'IDR1144': {'name': 'Carnarvon', 'lat': -24.8883, 'lon': 113.66938, 'scale': 354.17},
-    'IDR131': {'name': 'Sydney Ap', 'lat': -33.941, 'lon': 151.175, 'scale': 2833.33},
-    'IDR132': {'name': 'Sydney Ap', 'lat': -33.941, 'lon': 151.175, 'scale': 1416.67},
-    'IDR133': {'name': 'Sydney Ap', 'lat': -33.941, 'lon': 151.175, 'scale': 708.33},
-    'IDR141': {'name': 'Mt Gambier', 'lat': -37.75, 'lon': 140.78, 'scale': 2833.33},
-    'IDR142': {'name': 'Mt Gambier', 'lat': -37.75, 'lon': 140.78, 'scale': 1416.67},
-    'IDR143': {'name': 'Mt Gambier', 'lat': -37.75, 'lon': 140.78, 'scale': 708.33},
-    'IDR151': {'name': 'Dampier', 'lat': -20.65, 'lon': 116.687, 'scale': 2833.33},
-    'IDR152': {'name': 'Dampier', 'lat': -20.65, 'lon': 116.687, 'scale': 1416.67},
-    'IDR153': {'name': 'Dampier', 'lat': -20.65, 'lon': 116.687, 'scale': 708.33},
-    'IDR154': {'name': 'Dampier', 'lat': -20.65, 'lon': 116.687, 'scale': 354.17},
-    'IDR161': {'name': 'Port Hedland', 'lat': -20.3719, 'lon': 118.6317, 'scale': 2833.33},
-    'IDR162': {'name': 'Port Hedland', 'lat': -20.3719, 'lon': 118.6317, 'scale': 1416.67},
-    'IDR163': {'name': 'Port Hedland', 'lat': -20.3719, 'lon': 118.6317, 'scale': 708.33},
-    'IDR171': {'name': 'Broome', 'lat': -17.945, 'lon': 122.225, 'scale': 2833.33},
-    'IDR172': {'name': 'Broome', 'lat': -17.945, 'lon': 122.225, 'scale': 1416.67},
-    'IDR173': {'name': 'Broome', 'lat': -17.945, 'lon': 122.225, 'scale': 708.33},
-    'IDR174': {'name': 'Broome', 'lat': -17.945, 'lon': 122.225, 'scale': 354.17},
-    'IDR191': {'name': 'Cairns', 'lat': -16.817, 'lon': 145.683, 'scale': 2833.33},
-    'IDR192': {'name': 'Cairns', 'lat': -16.817, 'lon': 145.683, 'scale': 1416.67},
-    'IDR193': {'name': 'Cairns', 'lat': -16.817, 'lon': 145.683, 'scale': 708.33},
-    'IDR194': {'name': 'Cairns', 'lat': -16.817, 'lon': 145.683, 'scale': 354.17},
-    'IDR221': {'name': 'Mackay', 'lat': -21.117, 'lon': 149.217, 'scale': 2833.33},
-    'IDR222': {'name': 'Mackay', 'lat': -21.117, 'lon': 149.217, 'scale': 1416.67},
-    'IDR223': {'name': 'Mackay', 'lat': -21.117, 'lon': 149.217, 'scale': 708.33},
-    'IDR224': {'name': 'Mackay', 'lat': -21.1172, 'lon': 149.2169, 'scale': 354.17},
-    'IDR231': {'name': 'Gladstone', 'lat': -23.85, 'lon': 151.267, 'scale': 2833.33},
-    'IDR232': {'name': 'Gladstone', 'lat': -23.85, 'lon': 151.267, 'scale': 1416.67},
-    'IDR233': {'name': 'Gladstone', 'lat': -23.85, 'lon': 151.267, 'scale': 708.33},
-    'IDR241': {'name': 'Bowen', 'lat': -19.886, 'lon': 148.075, 'scale': 2833.33},
-    'IDR242': {'name': 'Bowen', 'lat': -19.886, 'lon': 148.075, 'scale': 1416.67},
-    'IDR243': {'name': 'Bowen', 'lat': -19.886, 'lon': 148.075, 'scale': 708.33},
-    'IDR251': {'name': 'Alice Springs', 'lat': -23.817, 'lon': 133.89999, 'scale': 2833.33},
-    'IDR252': {'name': 'Alice Springs', 'lat': -23.817, 'lon': 133.89999, 'scale': 1416.67},
-    'IDR253': {'name': 'Alice Springs', 'lat': -23.817, 'lon': 133.89999, 'scale': 708.33},
-    'IDR261': {'name': 'Perth Ap', 'lat': -31.933, 'lon': 115.967, 'scale': 2833.33},
-    'IDR262': {'name': 'Perth Ap', 'lat': -31.933, 'lon': 115.967, 'scale': 1416.67},
-    'IDR263': {'name': 'Perth Ap', 'lat': -31.933, 'lon': 115.967, 'scale': 708.33},
-    'IDR264': {'name': 'Perth Ap', 'lat': -31.933, 'lon': 115.967, 'scale': 354.17},
-    'IDR271': {'name': 'Woomera', 'lat': -31.157, 'lon': 136.80299, 'scale': 2833.33},
-    'IDR272': {'name': 'Woomera', 'lat': -31.157, 'lon': 136.80299, 'scale': 1416.67},
-    'IDR273': {'name': 'Woomera', 'lat': -31.157, 'lon': 136.80299, 'scale': 708.33},
-    'IDR281': {'name': 'Grafton', 'lat': -29.622, 'lon': 152.951, 'scale': 2833.33},
-    'IDR282': {'name': 'Grafton', 'lat': -29.622, 'lon': 152.951, 'scale': 1416.67},
-    'IDR283': {'name': 'Grafton', 'lat': -29.622, 'lon': 152.951, 'scale': 708.33},
-    'IDR291': {'name': 'Learmonth', 'lat': -22.104, 'lon': 113.998, 'scale': 2833.33},
-    'IDR292': {'name': 'Learmonth', 'lat': -22.104, 'lon': 113.998, 'scale': 1416.67},
-    'IDR293': {'name': 'Learmonth', 'lat': -22.104, 'lon': 113.998, 'scale': 708.33},
-    'IDR311': {'name': 'Albany', 'lat': -34.95, 'lon': 117.8, 'scale': 2833.33},
-    'IDR312': {'name': 'Albany', 'lat': -34.95, 'lon': 117.8, 'scale': 1416.67},
-    'IDR313': {'name': 'Albany', 'lat': -34.95, 'lon': 117.8, 'scale': 708.33},
-    'IDR314': {'name': 'Albany', 'lat': -34.95, 'lon': 117.8, 'scale': 354.17},
-    'IDR321': {'name': 'Esperance', 'lat': -33.83, 'lon': 121.892, 'scale': 2833.33},
-    'IDR322': {'name': 'Esperance', 'lat': -33.83, 'lon': 121.892, 'scale': 1416.67},
-    'IDR323': {'name': 'Esperance', 'lat': -33.83, 'lon': 121.892, 'scale': 708.33},
-    'IDR324': {'name': 'Esperance', 'lat': -33.83, 'lon': 121.892, 'scale': 354.17},
-    'IDR331': {'name': 'Ceduna', 'lat': -32.131, 'lon': 133.69501, 'scale': 2833.33},
-    'IDR332': {'name': 'Ceduna', 'lat': -32.131, 'lon': 133.69501, 'scale': 1416.67},
-    'IDR333': {'name': 'Ceduna', 'lat': -32.131, 'lon': 133.69501, 'scale': 708.33},
-    'IDR334': {'name': 'Ceduna', 'lat': -32.131, 'lon': 133.69501, 'scale': 354.17},
-    'IDR361': {'name': 'Mornington Is', 'lat': -16.666, 'lon': 139.16701, 'scale': 2833.33},
-    'IDR362': {'name': 'Mornington Is', 'lat': -16.666, 'lon': 139.16701, 'scale': 1416.67},
-    'IDR363': {'name': 'Mornington Is', 'lat': -16.666, 'lon': 139.16701, 'scale': 708.33},
-    'IDR371': {'name': 'Hobart', 'lat': -42.833, 'lon': 147.50999, 'scale': 2833.33},
-    'IDR372': {'name': 'Hobart', 'lat': -42.833, 'lon': 147.50999, 'scale': 1416.67},
-    'IDR373': {'name': 'Hobart', 'lat': -42.833, 'lon': 147.50999, 'scale': 708.33},
-    'IDR381': {'name': 'Newdegate', 'lat': -33.097, 'lon': 119.0087, 'scale': 2833.33},
-    'IDR382': {'name': 'Newdegate', 'lat': -33.097, 'lon': 119.0087, 'scale': 1416.67},
-    'IDR383': {'name': 'Newdegate', 'lat': -33.097, 'lon': 119.0087, 'scale': 708.33},
-    'IDR384': {'name': 'Newdegate', 'lat': -33.097, 'lon': 119.0087, 'scale': 354.17},
-    'IDR391': {'name': 'Halls Creek', 'lat': -18.231, 'lon': 127.663, 'scale': 2833.33},
-    'IDR392': {'name': 'Halls Creek', 'lat': -18.231, 'lon': 127.663, 'scale': 1416.67},
-    'IDR393': {'name': 'Halls Creek', 'lat': -18.231, 'lon': 127.663, 'scale': 708.33},
-    'IDR394': {'name': 'Halls Creek', 'lat': -18.231, 'lon': 127.663, 'scale': 354.17},
-    'IDR401': {'name': 'Canberra', 'lat': -35.6628, 'lon': 149.5108, 'scale': 2833.33},
-    'IDR402': {'name': 'Canberra', 'lat': -35.6628, 'lon': 149.5108, 'scale': 1416.67},
-    'IDR403': {'name': 'Canberra', 'lat': -35.6628, 'lon': 149.5108, 'scale': 708.33},
-    'IDR404': {'name': 'Canberra', 'lat': -35.6628, 'lon': 149.5108, 'scale': 354.17},
-    'IDR411': {'name': 'Willis Is', 'lat': -16.3, 'lon': 149.983, 'scale': 2833.33},
-    'IDR412': {'name': 'Willis Is', 'lat': -16.3, 'lon': 149.983, 'scale': 1416.67},
-    'IDR413': {'name': 'Willis Is', 'lat': -16.3, 'lon': 149.983, 'scale': 708.33},
-    'IDR421': {'name': 'Katherine', 'lat': -14.513, 'lon': 132.446, 'scale': 2833.33},
-    'IDR422': {'name': 'Katherine', 'lat': -14.513, 'lon': 132.446, 'scale': 1416.67},
-    'IDR423': {'name': 'Katherine', 'lat': -14.513, 'lon': 132.446, 'scale': 708.33},
-    'IDR424': {'name': 'Katherine', 'lat': -14.513, 'lon': 132.446, 'scale': 354.17},
-    'IDR431': {'name': 'Brisbane Ap', 'lat': -27.392, 'lon': 153.13, 'scale': 2833.33},
-    'IDR432': {'name': 'Brisbane Ap', 'lat': -27.392, 'lon': 153.13, 'scale': 1416.67},
-    'IDR433': {'name': 'Brisbane Ap', 'lat': -27.392, 'lon': 153.13, 'scale': 708.33},
-    'IDR434': {'name': 'Brisbane Ap', 'lat': -27.392, 'lon': 153.13, 'scale': 354.17},
-    'IDR441': {'name': 'Giles', 'lat': -25.03, 'lon': 128.3, 'scale': 2833.33},
-    'IDR442': {'name': 'Giles', 'lat': -25.03, 'lon': 128.3, 'scale': 1416.67},
-    'IDR443': {'name': 'Giles', 'lat': -25.03, 'lon': 128.3, 'scale': 708.33},
-    'IDR461': {'name': 'Sellicks Hill', 'lat': -35.33, 'lon': 138.5, 'scale': 2833.33},
-    'IDR462': {'name': 'Sellicks Hill', 'lat': -35.33, 'lon': 138.5, 'scale': 1416.67},
-    'IDR463': {'name': 'Sellicks Hill', 'lat': -35.33, 'lon': 138.5, 'scale': 708.33},
-    'IDR481': {'name': 'Kalgoorlie', 'lat': -30.7834, 'lon': 121.4549, 'scale': 2833.33},
-    'IDR482': {'name': 'Kalgoorlie', 'lat': -30.785, 'lon': 121.452, 'scale': 1416.67},
-    'IDR483': {'name': 'Kalgoorlie', 'lat': -30.785, 'lon': 121.452, 'scale': 708.33},
-    'IDR484': {'name': 'Kalgoorlie', 'lat': -30.7834, 'lon': 121.4549, 'scale': 354.17},
-    'IDR491': {'name': 'Yarrawonga', 'lat': -36.03, 'lon': 146.02299, 'scale': 2833.33},
-    'IDR492': {'name': 'Yarrawonga', 'lat': -36.03, 'lon': 146.02299, 'scale': 1416.67},
-    'IDR493': {'name': 'Yarrawonga', 'lat': -36.03, 'lon': 146.02299, 'scale': 708.33},
-    'IDR494': {'name': 'Yarrawonga', 'lat': -36.03, 'lon': 146.02299, 'scale': 354.17},
-    'IDR501': {'name': 'Marburg', 'lat': -27.608, 'lon': 152.539, 'scale': 2833.33},
-    'IDR502': {'name': 'Marburg', 'lat': -27.608, 'lon': 152.539, 'scale': 1416.67},
-    'IDR503': {'name': 'Marburg', 'lat': -27.608, 'lon': 152.539, 'scale': 708.33},
-    'IDR504': {'name': 'Marburg', 'lat': -27.6063, 'lon': 152.5401, 'scale': 354.17},
-    'IDR511': {'name': 'Melbourne Ap', 'lat': -37.667, 'lon': 144.83, 'scale': 2833.33},
-    'IDR512': {'name': 'Melbourne Ap', 'lat': -37.667, 'lon': 144.83, 'scale': 1416.67},
-    'IDR513': {'name': 'Melbourne Ap', 'lat': -37.667, 'lon': 144.83, 'scale': 708.33},
-    'IDR514': {'name': 'Melbourne Ap', 'lat': -37.667, 'lon': 144.83, 'scale': 354.17},
-    'IDR521': {'name': 'NW Tasmania', 'lat': -41.181, 'lon': 145.57899, 'scale': 2833.33},
-    'IDR522': {'name': 'NW Tasmania', 'lat': -41.181, 'lon': 145.57899, 'scale': 1416.67},
-    'IDR523': {'name': 'NW Tasmania', 'lat': -41.181, 'lon': 145.57899, 'scale': 708.33},
-    'IDR524': {'name': 'NW Tasmania', 'lat': -41.181, 'lon': 145.57899, 'scale': 354.17},
-    'IDR531': {'name': 'Moree', 'lat': -29.5, 'lon': 149.85001, 'scale': 2833.33},
-    'IDR532': {'name': 'Moree', 'lat': -29.5, 'lon': 149.85001, 'scale': 1416.67},
-    'IDR533': {'name': 'Moree', 'lat': -29.5, 'lon': 149.85001, 'scale': 708.33},
-    'IDR551': {'name': 'Wagga Wagga', 'lat': -35.167, 'lon': 147.467, 'scale': 2833.33},
-    'IDR552': {'name': 'Wagga Wagga', 'lat': -35.167, 'lon': 147.467, 'scale': 1416.67},
-    'IDR553': {'name': 'Wagga Wagga', 'lat': -35.167, 'lon': 147.467, 'scale': 708.33},
-    'IDR561': {'name': 'Longreach', 'lat': -23.43, 'lon': 144.28999, 'scale': 2833.33},
-    'IDR562': {'name': 'Longreach', 'lat': -23.43, 'lon': 144.28999, 'scale': 1416.67},
-    'IDR563': {'name': 'Longreach', 'lat': -23.43, 'lon': 144.28999, 'scale': 708.33},
-    'IDR581': {'name': 'South Doodlakine', 'lat': -31.777, 'lon': 117.9529, 'scale': 2833.33},
-    'IDR582': {'name': 'South Doodlakine', 'lat': -31.777, 'lon': 117.9529, 'scale': 1416.67},
-    'IDR583': {'name': 'South Doodlakine', 'lat': -31.777, 'lon': 117.9529, 'scale': 708.33},
-    'IDR584': {'name': 'South Doodlakine', 'lat': -31.777, 'lon': 117.9529, 'scale': 354.17},
-    'IDR621': {'name': 'Norfolk Is', 'lat': -29.04, 'lon': 167.94, 'scale': 2833.33},
-    'IDR622': {'name': 'Norfolk Is', 'lat': -29.04, 'lon': 167.94, 'scale': 1416.67},
-    'IDR623': {'name': 'Norfolk Is', 'lat': -29.04, 'lon': 167.94, 'scale': 708.33},
-    'IDR631': {'name': 'Darwin', 'lat': -12.457, 'lon': 130.925, 'scale': 2833.33},
-    'IDR632': {'name': 'Darwin', 'lat': -12.457, 'lon': 130.925, 'scale': 1416.67},
-    'IDR633': {'name': 'Darwin', 'lat': -12.457, 'lon': 130.925, 'scale': 708.33},
-    'IDR634': {'name': 'Darwin', 'lat': -12.457, 'lon': 130.925, 'scale': 354.17},
-    'IDR641': {'name': 'Adelaide', 'lat': -34.617, 'lon': 138.46899, 'scale': 2833.33},
-    'IDR642': {'name': 'Adelaide', 'lat': -34.617, 'lon': 138.46899, 'scale': 1416.67},
-    'IDR643': {'name': 'Adelaide', 'lat': -34.617, 'lon': 138.46899, 'scale': 708.33},
-    'IDR644': {'name': 'Adelaide', 'lat': -34.617, 'lon': 138.46899, 'scale': 354.17},
-    'IDR661': {'name': 'Brisbane', 'lat': -27.7181, 'lon': 153.24001, 'scale': 2833.33},
-    'IDR662': {'name': 'Brisbane', 'lat': -27.7181, 'lon': 153.24001, 'scale': 1416.67},
-    'IDR663': {'name': 'Brisbane', 'lat': -27.7181, 'lon': 153.24001, 'scale': 708.33},
-    'IDR664': {'name': 'Brisbane', 'lat': -27.7181, 'lon': 153.24001, 'scale': 354.17},
-    'IDR671': {'name': 'Warrego', 'lat': -26.44, 'lon': 147.3492, 'scale': 2833.33},
-    'IDR672': {'name': 'Warrego', 'lat': -26.44, 'lon': 147.3492, 'scale': 1416.67},
-    'IDR673': {'name': 'Warrego', 'lat': -26.44, 'lon': 147.3492, 'scale': 708.33},
-    'IDR681': {'name': 'Bairnsdale', 'lat': -37.8876, 'lon': 147.5755, 'scale': 2833.33},
-    'IDR682': {'name': 'Bairnsdale', 'lat': -37.8876, 'lon': 147.5755, 'scale': 1416.67},
-    'IDR683': {'name': 'Bairnsdale', 'lat': -37.8876, 'lon': 147.5755, 'scale': 708.33},
-    'IDR684': {'name': 'Bairnsdale', 'lat': -37.8876, 'lon': 147.5755, 'scale': 354.17},
-    'IDR691': {'name': 'Namoi', 'lat': -31.024, 'lon': 150.1915, 'scale': 2833.33},
-    'IDR692': {'name': 'Namoi', 'lat': -31.024, 'lon': 150.1915, 'scale': 1416.67},
-    'IDR693': {'name': 'Namoi', 'lat': -31.024, 'lon': 150.1915, 'scale': 708.33},
-    'IDR694': {'name': 'Namoi', 'lat': -31.024, 'lon': 150.1915, 'scale': 354.17},
-    'IDR701': {'name': 'Perth', 'lat': -32.3917, 'lon': 115.8669, 'scale': 2833.33},
-    'IDR702': {'name': 'Perth', 'lat': -32.3917, 'lon': 115.8669, 'scale': 1416.67},
-    'IDR703': {'name': 'Perth', 'lat': -32.3917, 'lon': 115.8669, 'scale': 708.33},
-    'IDR704': {'name': 'Perth', 'lat': -32.3917, 'lon': 115.8669, 'scale': 354.17},
-    'IDR711': {'name': 'Sydney', 'lat': -33.7008, 'lon': 151.2095, 'scale': 2833.33},
-    'IDR712': {'name': 'Sydney', 'lat': -33.7008, 'lon': 151.2095, 'scale': 1416.67},
-    'IDR713': {'name': 'Sydney', 'lat': -33.7008, 'lon': 151.2095, 'scale': 708.33},
-    'IDR714': {'name': 'Sydney', 'lat': -33.7008, 'lon': 151.2095, 'scale': 354.17},
-    'IDR721': {'name': 'Emerald', 'lat': -23.5498, 'lon': 148.239, 'scale': 2833.33},
-    'IDR722': {'name': 'Emerald', 'lat': -23.5498, 'lon': 148.239, 'scale': 1416.67},
-    'IDR723': {'name': 'Emerald', 'lat': -23.5498, 'lon': 148.239, 'scale': 708.33},
-    'IDR724': {'name': 'Emerald', 'lat': -23.5498, 'lon': 148.239, 'scale': 354.17},
-    'IDR731': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 2833.33},
-    'IDR732': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 1416.67},
-    'IDR733': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.55099, 'scale': 708.33},
-    'IDR734': {'name': 'Townsville', 'lat': -19.4196, 'lon': 146.5511, 'scale': 354.17},
-    'IDR741': {'name': 'Greenvale', 'lat': -18.997, 'lon': 144.995, 'scale': 2833.33},
-    'IDR742': {'name': 'Greenvale', 'lat': -18.997, 'lon': 144.995, 'scale': 1416.67},
-    'IDR743': {'name': 'Greenvale', 'lat': -18.997, 'lon': 144.995, 'scale': 708.33},
-    'IDR744': {'name': 'Greenvale', 'lat': -18.997, 'lon': 144.995, 'scale': 354.17},
-    'IDR751': {'name': 'Mt Isa', 'lat': -20.7112, 'lon': 139.55499, 'scale': 2833.33},
-    'IDR752': {'name': 'Mt Isa', 'lat': -20.7112, 'lon': 139.55499, 'scale': 1416.67},
-    'IDR753': {'name': 'Mt Isa', 'lat': -20.7112, 'lon': 139.55499, 'scale': 708.33},
-    'IDR754': {'name': 'Mt Isa', 'lat': -20.7112, 'lon': 139.55499, 'scale': 354.17},
-    'IDR761': {'name': 'Mt Koonya', 'lat': -43.112, 'lon': 147.806, 'scale': 2833.33},
-    'IDR762': {'name': 'Hobart Mt Koonya', 'lat': -43.112, 'lon': 147.806, 'scale': 1416.67},
-    'IDR763': {'name': 'Hobart Mt Koonya', 'lat': -43.112, 'lon': 147.806, 'scale': 708.33},
-    'IDR764': {'name': 'Hobart Mt Koonya', 'lat': -43.112, 'lon': 147.806, 'scale': 354.17},
-    'IDR771': {'name': 'Arafura', 'lat': -11.649, 'lon': 133.38, 'scale': 2833.33},
-    'IDR772': {'name': 'Arafura', 'lat': -11.649, 'lon': 133.38, 'scale': 1416.67},
-    'IDR773': {'name': 'Arafura', 'lat': -11.649, 'lon': 133.38, 'scale': 708.33},
-    'IDR774': {'name': 'Arafura', 'lat': -11.649, 'lon': 133.38, 'scale': 354.17},
-    'IDR781': {'name': 'Weipa', 'lat': -12.671, 'lon': 141.922, 'scale': 2833.33},
-    'IDR782': {'name': 'Weipa', 'lat': -12.671, 'lon': 141.922, 'scale': 1416.67},
-    'IDR783': {'name': 'Weipa', 'lat': -12.671, 'lon': 141.922, 'scale': 708.33},
-    'IDR784': {'name': 'Weipa', 'lat': -12.666, 'lon': 141.925, 'scale': 354.17},
-    'IDR791': {'name': 'Watheroo', 'lat': -30.36, 'lon': 116.2922, 'scale': 2833.33},
-    'IDR792': {'name': 'Watheroo', 'lat': -30.36, 'lon': 116.2922, 'scale': 1416.67},
-    'IDR793': {'name': 'Watheroo', 'lat': -30.36, 'lon': 116.2922, 'scale': 708.33},
-    'IDR794': {'name': 'Watheroo', 'lat': -30.36, 'lon': 116.2922, 'scale': 354.17},
-    'IDR931': {'name': 'Brewarrina', 'lat': -29.9696, 'lon': 146.8129, 'scale': 2833.33},
-    'IDR932': {'name': 'Brewarrina', 'lat': -29.9696, 'lon': 146.8129, 'scale': 1416.67},
-    'IDR933': {'name': 'Brewarrina', 'lat': -29.9696, 'lon': 146.8129, 'scale': 708.33},
-    'IDR934': {'name': 'Brewarrina', 'lat': -29.9696, 'lon': 146.8129, 'scale': 354.17},
-    'IDR941': {'name': 'Hillston', 'lat': -33.5519, 'lon': 145.52859, 'scale': 2833.33},
-    'IDR942': {'name': 'Hillston', 'lat': -33.5519, 'lon': 145.52859, 'scale': 1416.67},
-    'IDR943': {'name': 'Hillston', 'lat': -33.5519, 'lon': 145.52859, 'scale': 708.33},
-    'IDR944': {'name': 'Hillston', 'lat': -33.5519, 'lon': 145.52859, 'scale': 354.17},
-    'IDR951': {'name': 'Rainbow', 'lat': -35.9975, 'lon': 142.01331, 'scale': 2833.33},
-    'IDR952': {'name': 'Rainbow', 'lat': -35.9975, 'lon': 142.01331, 'scale': 1416.67},
-    'IDR953': {'name': 'Rainbow', 'lat': -35.9975, 'lon': 142.01331, 'scale': 708.33},
-    'IDR954': {'name': 'Rainbow', 'lat': -35.9975, 'lon': 142.01331, 'scale': 354.17},
-    'IDR961': {'name': 'Yeoval', 'lat': -32.74442, 'lon': 148.7081, 'scale': 2833.33},
-    'IDR962': {'name': 'Yeoval', 'lat': -32.74442, 'lon': 148.7081, 'scale': 1416.67},
-    'IDR963': {'name': 'Yeoval', 'lat': -32.74442, 'lon': 148.7081, 'scale': 708.33},
-    'IDR964': {'name': 'Yeoval', 'lat': -32.74442, 'lon': 148.7081, 'scale': 354.17},
-    'IDR971': {'name': 'Mildura', 'lat': -34.2871, 'lon': 141.59821, 'scale': 2833.33},
-    'IDR972': {'name': 'Mildura', 'lat': -34.2871, 'lon': 141.59821, 'scale': 1416.67},
-    'IDR973': {'name': 'Mildura', 'lat': -34.2871, 'lon': 141.59821, 'scale': 708.33},
-    'IDR974': {'name': 'Mildura', 'lat': -34.2871, 'lon': 141.59821, 'scale': 354.17},
-    'IDR981': {'name': 'Taroom', 'lat': -25.696, 'lon': 149.89799, 'scale': 2833.33},
-    'IDR982': {'name': 'Taroom', 'lat': -25.696, 'lon': 149.89799, 'scale': 1416.67},
-    'IDR983': {'name': 'Taroom', 'lat': -25.696, 'lon': 149.89799, 'scale': 708.33},
-    'IDR984': {'name': 'Taroom', 'lat': -25.696, 'lon': 149.89799, 'scale': 354.17},
-}
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance in km between two coordinates using Haversine formula"""
-    R = 6371  # Earth's radius in km
-
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-
-    return R * c
-
-def find_nearest_radar(lat, lon):
-    """Find the nearest radar station to given coordinates"""
-    nearest_id = None
-    nearest_distance = float('inf')
-
-    for radar_id, info in RADAR_STATIONS.items():
-        distance = haversine_distance(lat, lon, info['lat'], info['lon'])
-        if distance < nearest_distance:
-            nearest_distance = distance
-            nearest_id = radar_id
-
-    return nearest_id, nearest_distance
+# Rendered frames are kept in a per-station ring buffer (see frame_store.py), in the directory the scraper writes
+IMAGES_DIR = FRAME_DIR
+NUM_IMAGES = 7
+
+API_PORT = int(os.environ.get('API_PORT', '5000'))
+# 'flask' (threaded development server) or 'async' (aiohttp, see api_async.py)
+API_SERVER_MODE = os.environ.get('API_SERVER_MODE', 'flask')
+
+# Requested stations are written to images/demand.json for the scraper's refresh scheduler
+demand = DemandTracker(IMAGES_DIR)
+
+# Frames re-encoded per device profile on first request (?profile=, see renditions.py)
+renditions = RenditionCache(IMAGES_DIR)
+
+# How long serve_image waits for a generation before asking the client to retry
+SERVE_WAIT_SECONDS = float(os.environ.get('SERVE_WAIT_SECONDS', '5'))
+
+def run_generation(radar_id):
+    return GenerateStation(radar_id, NUM_IMAGES)
+
+# One shared generation per station on a bounded worker pool
+jobs = JobManager(run_generation)
+
+# Stations frames can be requested for: every BOM station and a mosaic centred on each (see mosaic.py)
+STATION_IDS = set(RADAR_STATIONS) | {MosaicId(radar_id) for radar_id in RADAR_STATIONS}
+
+# Precomputed unit-sphere index over the deduplicated radar sites
+STATION_INDEX = StationIndex(RADAR_STATIONS)
+
+# Most coordinates accepted by one /api/location/batch call
+MAX_BATCH_LOCATIONS = 1000
+
+def format_match(match):
+    """JSON fields for one nearest-station result"""
+    return {
+        'radar_id': match['radar_id'],
+        'radar_name': match['radar_name'],
+        'distance_km': round(match['distance_km'], 1),
+        'range_km': match['range_km'],
+    }
+
+def parse_range_km(value):
+    """Optional range_km parameter (radar range in km used to pick the variant)"""
+    if value is None:
+        return None
+    range_km = float(value)
+    if not math.isfinite(range_km) or range_km <= 0:
+        raise ValueError(f'Invalid range_km {value}')
+    return range_km
+
+def parse_coordinate(value, limit):
+    """Latitude (limit 90) or longitude (limit 180) in degrees; ValueError if not finite or out of range"""
+    coordinate = float(value)
+    if not math.isfinite(coordinate) or abs(coordinate) > limit:
+        raise ValueError(f'Coordinate {value} out of range')
+    return coordinate
+
+def parse_k(value):
+    """Number of nearest stations to return; ValueError unless at least 1"""
+    k = int(value)
+    if k <= 0:
+        raise ValueError(f'Invalid k {value}')
+    return k
 
 @app.route('/api/location', methods=['GET'])
 def receive_location():
     """Receive GPS coordinates from watch and return nearest radar station"""
     try:
-        lat = float(request.args.get('lat'))
-        lon = float(request.args.get('lon'))
+        lat = parse_coordinate(request.args.get('lat'), 90)
+        lon = parse_coordinate(request.args.get('lon'), 180)
+        k = parse_k(request.args.get('k', 1))
+        range_km = parse_range_km(request.args.get('range_km'))
+        mosaic = request.args.get('mosaic') == '1'
 
         print(f'Received GPS coordinates: lat={lat}, lon={lon}')
 
-        # Find nearest radar station
-        radar_id, distance = find_nearest_radar(lat, lon)
-        radar_info = RADAR_STATIONS[radar_id]
+        # Find nearest radar stations, picking each site's range variant
+        matches = STATION_INDEX.Nearest(lat, lon, k, range_km)
+        radar_id = matches[0]['radar_id']
 
-        print(f'Nearest radar: {radar_id} ({radar_info["name"]}) - {distance:.1f}km away')
+        print(f'Nearest radar: {radar_id} ({matches[0]["radar_name"]}) - {matches[0]["distance_km"]:.1f}km away')
+        demand.Record(MosaicId(radar_id) if mosaic else radar_id)
 
         response = {
             'status': 'success',
-            'radar_id': radar_id,
-            'radar_name': radar_info['name'],
-            'distance_km': round(distance, 1),
+            **format_match(matches[0]),
             'coordinates': {'lat': lat, 'lon': lon}
         }
+        if mosaic:
+            # Frames of the nearest station filled in from overlapping ones, served as /images/<mosaic_id>-<n>.png
+            response['mosaic_id'] = MosaicId(radar_id)
+        if k > 1:
+            response['nearest'] = [format_match(match) for match in matches]
 
         return jsonify(response), 200
 
@@ -352,19 +125,56 @@ def receive_location():
         print(f'Error processing location: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/location/batch', methods=['POST'])
+def receive_locations():
+    """Resolve the nearest radar stations for many coordinates in one call
+
+    Body: {"locations": [{"lat": ..., "lon": ...}, ...], "k": 1, "range_km": null}
+    """
+    try:
+        body = request.get_json(silent=True)
+        locations = body.get('locations') if isinstance(body, dict) else None
+        if not isinstance(locations, list) or not locations:
+            return jsonify({'status': 'error', 'message': 'Expected a non-empty "locations" list'}), 400
+        if len(locations) > MAX_BATCH_LOCATIONS:
+            return jsonify({'status': 'error',
+                            'message': f'At most {MAX_BATCH_LOCATIONS} locations per request'}), 400
+
+        k = parse_k(body.get('k', 1))
+        range_km = parse_range_km(body.get('range_km'))
+        lats = [parse_coordinate(location['lat'], 90) for location in locations]
+        lons = [parse_coordinate(location['lon'], 180) for location in locations]
+
+        results = []
+        for lat, lon, matches in zip(lats, lons, STATION_INDEX.NearestMany(lats, lons, k, range_km)):
+            result = {**format_match(matches[0]), 'coordinates': {'lat': lat, 'lon': lon}}
+            if k > 1:
+                result['nearest'] = [format_match(match) for match in matches]
+            results.append(result)
+
+        return jsonify({'status': 'success', 'results': results}), 200
+
+    except (TypeError, ValueError, KeyError) as e:
+        print(f'Error parsing batch coordinates: {e}')
+        return jsonify({'status': 'error', 'message': 'Invalid coordinates'}), 400
+    except Exception as e:
+        print(f'Error processing batch locations: {e}')
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/check-images/<radar_id>', methods=['GET'])
 def check_images(radar_id):
     """Check if images exist for a radar station"""
     try:
         # Validate radar_id
-        if radar_id not in RADAR_STATIONS:
+        if radar_id not in STATION_IDS:
             return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
 
         # Check if all 7 images exist
+        store = FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR)
         images_exist = []
-        for i in range(7):
-            image_path = f'/app/images/{radar_id}-{i}.png'
-            images_exist.append(os.path.exists(image_path))
+        for i in range(NUM_IMAGES):
+            image_path = store.Path(i)
+            images_exist.append(image_path is not None and os.path.exists(image_path))
 
         all_exist = all(images_exist)
 
@@ -372,130 +182,385 @@ def check_images(radar_id):
             'status': 'success',
             'radar_id': radar_id,
             'all_images_exist': all_exist,
-            'images_exist': images_exist
+            'images_exist': images_exist,
+            'timestamps': store.Timestamps()
         }), 200
 
     except Exception as e:
         print(f'Error checking images: {e}')
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def retry_response(message, status_code=202, status='generating'):
+    """JSON response asking the client to retry shortly"""
+    response = jsonify({'status': status, 'message': message})
+    response.headers['Retry-After'] = str(max(1, round(SERVE_WAIT_SECONDS)))
+    return response, status_code
+
 @app.route('/api/generate/<radar_id>', methods=['POST'])
 def generate_images(radar_id):
     """Trigger image generation for a radar station"""
     try:
         # Validate radar_id
-        if radar_id not in RADAR_STATIONS:
+        if radar_id not in STATION_IDS:
             return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+        demand.Record(radar_id)
 
         # Check if already generating
-        if radar_id in generation_locks:
+        if jobs.Active(radar_id):
             return jsonify({
                 'status': 'in_progress',
-                'message': f'Images for {radar_id} are already being generated'
+                'message': f'Images for {radar_id} are already being generated',
+                'job': jobs.Status(radar_id)
             }), 202
 
         # Check if images already exist
-        all_exist = all(os.path.exists(f'/app/images/{radar_id}-{i}.png') for i in range(7))
+        all_exist = FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR).IsFull()
         if all_exist:
             return jsonify({
                 'status': 'success',
                 'message': f'Images for {radar_id} already exist'
             }), 200
 
-        # Start generation in background thread
-        generation_locks[radar_id] = True
-
-        def generate_in_background():
-            try:
-                # Import here to avoid module-level execution issues
-                from ftpscraper import GenerateImagesForRadar
-                success = GenerateImagesForRadar(radar_id, 7)
-                print(f'Background generation for {radar_id}: {"success" if success else "failed"}')
-            except Exception as e:
-                print(f'Error in background generation for {radar_id}: {e}')
-            finally:
-                if radar_id in generation_locks:
-                    del generation_locks[radar_id]
-
-        thread = threading.Thread(target=generate_in_background)
-        thread.daemon = True
-        thread.start()
-
+        # Queue generation on the worker pool
+        job = jobs.Submit(radar_id)
         return jsonify({
             'status': 'generating',
-            'message': f'Started generating images for {radar_id}'
+            'message': f'Started generating images for {radar_id}',
+            'job': job.Status()
         }), 202
 
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}')
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
     except Exception as e:
         print(f'Error triggering generation: {e}')
-        if radar_id in generation_locks:
-            del generation_locks[radar_id]
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/jobs/<radar_id>', methods=['GET'])
+def job_status(radar_id):
+    """Status of the current or most recent generation job for a radar station"""
+    if radar_id not in STATION_IDS:
+        return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+
+    status = jobs.Status(radar_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': f'No generation job for {radar_id}'}), 404
+    return jsonify({'status': 'success', 'job': status}), 200
+
+def select_rendition(image_path, radar_id, timestamp, profile, store, layer=None):
+    """(path, mimetype) of a frame's radar-only overlay or device profile rendition, the frame itself if neither
+
+    The path is None if an overlay was asked for but the frame was stored without one.
+    """
+    if layer == 'radar':
+        overlay_path = FrameStore.OverlayPath(image_path)
+        return (overlay_path if os.path.exists(overlay_path) else None), 'image/png'
+    if not profile or not timestamp:
+        return image_path, 'image/png'
+    path = renditions.Get(radar_id, timestamp, profile, image_path, store.Timestamps())
+    return path, MIME_TYPES[PROFILES[profile]['format']]
+
+def send_frame(image_path, radar_id, timestamp, newest_timestamp=None, immutable=False, mimetype='image/png',
+               max_age=None):
+    """Send a frame with ETag/Last-Modified/Cache-Control, or 304 if the client's copy is current
+
+    Frames addressed by logical index change when the station next updates, so
+    they may be cached until then; frames addressed by timestamp never change.
+    """
+    etag, last_modified = ETag(image_path)
+    if immutable:
+        headers = CacheHeaders(etag, last_modified, IMMUTABLE_MAX_AGE_SECONDS, immutable=True)
+    elif max_age is not None:
+        headers = CacheHeaders(etag, last_modified, max_age)
+    else:
+        headers = CacheHeaders(etag, last_modified, FrameMaxAge(radar_id, newest_timestamp, IMAGES_DIR))
+    if timestamp:
+        headers['X-Frame-Timestamp'] = timestamp
+
+    if IsNotModified(request.headers, etag, last_modified, modified_since=immutable):
+        return Response(status=304, headers=headers)
+    response = send_file(image_path, mimetype=mimetype, etag=False, conditional=False)
+    response.headers.update(headers)
+    return response
+
+@app.route('/images/<radar_id>/<timestamp>.png', methods=['GET'])
+def serve_image_at(radar_id, timestamp):
+    """Serve the frame with a given BOM timestamp (YYYYMMDDHHMM) while it is buffered"""
+    if radar_id not in STATION_IDS:
+        return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+    profile = request.args.get('profile')
+    if profile is not None and profile not in PROFILES:
+        return jsonify({'status': 'error', 'message': 'Unknown device profile'}), 400
+    layer = request.args.get('layer')
+    if layer not in (None, 'radar'):
+        return jsonify({'status': 'error', 'message': 'Unknown layer'}), 400
+
+    store = FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR)
+    image_path = store.PathFor(timestamp)
+    if not image_path or not os.path.exists(image_path):
+        return jsonify({'status': 'error', 'message': 'Frame not buffered'}), 404
+    image_path, mimetype = select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+    if image_path is None:
+        return jsonify({'status': 'error', 'message': 'No radar overlay for this frame'}), 404
+    return send_frame(image_path, radar_id, timestamp, immutable=True, mimetype=mimetype)
+
 @app.route('/images/<radar_id>-<int:index>.png', methods=['GET'])
 def serve_image(radar_id, index):
     """Serve radar image, generating if it doesn't exist"""
     try:
         # Validate radar_id
-        if radar_id not in RADAR_STATIONS:
+        if radar_id not in STATION_IDS:
             print(f'Invalid radar ID requested: {radar_id}', flush=True)
             return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
 
         # Validate index
-        if index < 0 or index >= 7:
+        if index < 0 or index >= NUM_IMAGES:
             print(f'Invalid image index requested: {index}', flush=True)
             return jsonify({'status': 'error', 'message': 'Invalid image index'}), 400
-
-        image_path = f'/app/images/{radar_id}-{index}.png'
-
-        # If image exists, serve it
-        if os.path.exists(image_path):
-            from flask import send_file
+        profile = request.args.get('profile')
+        if profile is not None and profile not in PROFILES:
+            return jsonify({'status': 'error', 'message': 'Unknown device profile'}), 400
+        layer = request.args.get('layer')
+        if layer not in (None, 'radar'):
+            return jsonify({'status': 'error', 'message': 'Unknown layer'}), 400
+        demand.Record(radar_id)
+
+        # Map logical frame index (0 = oldest) to its ring buffer slot
+        store = FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR)
+        image_path, timestamp = store.Frame(index)
+        cached = bool(image_path) and os.path.exists(image_path)
+        METRICS.Count('station_frames', cached)
+
+        # If image exists, serve it (or 304 if the client's copy is current)
+        if cached:
             print(f'Serving existing image: {radar_id}-{index}.png', flush=True)
-            return send_file(image_path, mimetype='image/png')
+            image_path, mimetype = select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+            if image_path is None:
+                return jsonify({'status': 'error', 'message': 'No radar overlay for this frame'}), 404
+            return send_frame(image_path, radar_id, timestamp, store.Timestamps()[-1], mimetype=mimetype)
 
         # Image doesn't exist - check if all images for this radar need generation
         print(f'Image {radar_id}-{index}.png not found, checking if generation needed...', flush=True)
-        all_exist = all(os.path.exists(f'/app/images/{radar_id}-{i}.png') for i in range(7))
-
-        if not all_exist and radar_id not in generation_locks:
-            print(f'Starting synchronous generation for {radar_id}...', flush=True)
-            generation_locks[radar_id] = True
-
-            # Generate synchronously for first request
-            try:
-                from ftpscraper import GenerateImagesForRadar
-                success = GenerateImagesForRadar(radar_id, 7)
-                if success and os.path.exists(image_path):
-                    print(f'Generated and serving {radar_id}-{index}.png', flush=True)
-                    from flask import send_file
-                    return send_file(image_path, mimetype='image/png')
-                else:
-                    print(f'Generation failed or image still missing for {radar_id}', flush=True)
-                    return jsonify({'status': 'error', 'message': 'Image generation failed'}), 500
-            except Exception as e:
-                print(f'Error generating images for {radar_id}: {e}', flush=True)
-                return jsonify({'status': 'error', 'message': str(e)}), 500
-            finally:
-                if radar_id in generation_locks:
-                    del generation_locks[radar_id]
-        elif radar_id in generation_locks:
-            # Currently generating, ask client to retry
-            print(f'Image {radar_id}-{index}.png still generating, returning 202', flush=True)
-            return jsonify({'status': 'generating', 'message': 'Images are being generated, please retry'}), 202
-        else:
+        if store.IsFull() and not jobs.Active(radar_id):
             print(f'Image {radar_id}-{index}.png not found and cannot generate', flush=True)
             return jsonify({'status': 'error', 'message': 'Image not found'}), 404
 
+        # Start (or join) the station's generation and wait briefly for it
+        job = jobs.Submit(radar_id)
+        if not job.Wait(SERVE_WAIT_SECONDS):
+            print(f'Image {radar_id}-{index}.png still generating, returning 202', flush=True)
+            return retry_response('Images are being generated, please retry')
+
+        if not job.success:
+            print(f'Generation failed for {radar_id}', flush=True)
+            return jsonify({'status': 'error', 'message': job.error or 'Image generation failed'}), 500
+
+        image_path, timestamp = store.Frame(index)
+        if not image_path or not os.path.exists(image_path):
+            # BOM published fewer frames than the buffer holds; the rest arrive with later refreshes
+            print(f'Generated {radar_id} but it has no frame {index} ({store.Length()} buffered)', flush=True)
+            return jsonify({'status': 'error', 'message': 'Image not found'}), 404
+        print(f'Generated and serving {radar_id}-{index}.png', flush=True)
+        image_path, mimetype = select_rendition(image_path, radar_id, timestamp, profile, store, layer)
+        if image_path is None:
+            return jsonify({'status': 'error', 'message': 'No radar overlay for this frame'}), 404
+        return send_frame(image_path, radar_id, timestamp, store.Timestamps()[-1], mimetype=mimetype)
+
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
     except Exception as e:
         print(f'Error serving image {radar_id}-{index}: {e}', flush=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def wait_for_frames(radar_id, store):
+    """Start generation if nothing is buffered yet; a response if the client should retry or it failed, else None"""
+    buffered = store.Length() > 0
+    METRICS.Count('station_frames', buffered)
+    if buffered:
+        return None
+    job = jobs.Submit(radar_id)
+    if not job.Wait(SERVE_WAIT_SECONDS):
+        return retry_response('Images are being generated, please retry')
+    if not job.success:
+        return jsonify({'status': 'error', 'message': job.error or 'Image generation failed'}), 500
+    return None
+
+def station_bundle(radar_id):
+    """(metadata, None) for a station's sprite sheet, or (None, response) if its frames aren't ready"""
+    bundle = FrameBundle(FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR))
+    response = wait_for_frames(radar_id, bundle.store)
+    if response is not None:
+        return None, response
+    meta = bundle.Get()
+    if meta is None:
+        return None, (jsonify({'status': 'error', 'message': 'No frames buffered'}), 404)
+    return meta, None
+
+def bundle_info(meta):
+    return {key: meta[key] for key in ('radar_id', 'timestamps', 'columns', 'frame_width', 'frame_height', 'frames')}
+
+@app.route('/images/<radar_id>-bundle.png', methods=['GET'])
+def serve_bundle(radar_id):
+    """Serve every buffered frame of a station as one sprite sheet (oldest first, row by row)"""
+    try:
+        if radar_id not in STATION_IDS:
+            return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+        demand.Record(radar_id)
+
+        meta, response = station_bundle(radar_id)
+        if meta is None:
+            return response
+        response = send_frame(meta['path'], radar_id, None, meta['timestamps'][-1])
+        response.headers['X-Frame-Timestamps'] = ','.join(ts or '' for ts in meta['timestamps'])
+        response.headers['X-Bundle-Layout'] = f'{meta["columns"]}x{meta["frame_width"]}x{meta["frame_height"]}'
+        return response
+
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    except Exception as e:
+        print(f'Error serving bundle for {radar_id}: {e}', flush=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/bundle/<radar_id>', methods=['GET'])
+def bundle_manifest(radar_id):
+    """Describe a station's sprite sheet: frame timestamps and where each frame sits"""
+    try:
+        if radar_id not in STATION_IDS:
+            return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+
+        meta, response = station_bundle(radar_id)
+        if meta is None:
+            return response
+        return jsonify({'status': 'success', 'url': f'/images/{radar_id}-bundle.png', **bundle_info(meta)}), 200
+
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    except Exception as e:
+        print(f'Error describing bundle for {radar_id}: {e}', flush=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def background_path(radar_id):
+    radar_id = MosaicPrimary(radar_id) or radar_id  # A mosaic is drawn on its station's background
+    return BackgroundPath(radar_id)
+
+def layers_info(radar_id, store):
+    """Layered-delivery manifest: the station background plus a radar-only overlay per frame, bottom to top"""
+    bg_path = background_path(radar_id)
+    if not os.path.exists(bg_path):
+        return None
+    etag, _ = ETag(bg_path)
+    with Image.open(bg_path) as bg:
+        width, height = bg.size
+
+    frames = []
+    for index, timestamp in enumerate(store.Timestamps()):
+        overlay = timestamp is not None and os.path.exists(FrameStore.OverlayPath(store.Path(index)))
+        frames.append({
+            'index': index,
+            'timestamp': timestamp,
+            'overlay': f'/images/{radar_id}/{timestamp}.png?layer=radar' if overlay else None,
+            'frame': f'/images/{radar_id}/{timestamp}.png' if timestamp else f'/images/{radar_id}-{index}.png',
+        })
+    return {
+        'radar_id': radar_id,
+        'width': width,
+        'height': height,
+        # Versioned by the background's ETag, so it can be cached for good
+        'background': f'/images/{radar_id}/background.png?v=' + etag.strip('"'),
+        'stack': ['background', 'overlay'],
+        'blend': 'source-over',
+        'frames': frames,
+    }
+
+@app.route('/images/<radar_id>/background.png', methods=['GET'])
+def serve_background(radar_id):
+    """Serve a station's static background layer (map, topography and roads)"""
+    if radar_id not in STATION_IDS:
+        return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+
+    bg_path = background_path(radar_id)
+    if not os.path.exists(bg_path):
+        return jsonify({'status': 'error', 'message': 'Background not generated'}), 404
+    if request.args.get('v'):
+        return send_frame(bg_path, radar_id, None, immutable=True)
+    return send_frame(bg_path, radar_id, None, max_age=BACKGROUND_MAX_AGE_SECONDS)
+
+@app.route('/api/layers/<radar_id>', methods=['GET'])
+def layers_manifest(radar_id):
+    """Describe how to stack a station's background and radar-only overlays"""
+    try:
+        if radar_id not in STATION_IDS:
+            return jsonify({'status': 'error', 'message': 'Invalid radar ID'}), 400
+        demand.Record(radar_id)
+
+        store = FrameStore(radar_id, NUM_IMAGES, IMAGES_DIR)
+        response = wait_for_frames(radar_id, store)
+        if response is not None:
+            return response
+        info = layers_info(radar_id, store)
+        if info is None:
+            return jsonify({'status': 'error', 'message': 'Background not generated'}), 404
+        return jsonify({'status': 'success', **info}), 200
+
+    except QueueFullError as e:
+        print(f'Refusing generation for {radar_id}: {e}', flush=True)
+        return retry_response('Too many stations are being generated, please retry', 503, 'busy')
+    except Exception as e:
+        print(f'Error describing layers for {radar_id}: {e}', flush=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def frame_ages():
+    """[(labels, seconds since the newest frame timestamp)] for every station buffer"""
+    now = time.time()
+    ages = []
+    try:
+        names = sorted(os.listdir(IMAGES_DIR))
+    except FileNotFoundError:
+        return ages
+    for name in names:
+        if not name.endswith('manifest.json'):
+            continue
+        station = name[:-len('.manifest.json')] or None  # The scraper's default station has no prefix
+        timestamps = [ts for ts in FrameStore(station, NUM_IMAGES, IMAGES_DIR).Timestamps() if ts]
+        if timestamps:
+            ages.append(({'radar_id': station or 'default'}, round(now - TimestampSeconds(timestamps[-1]), 1)))
+    return ages
+
+def metrics_text():
+    """This process's and the scraper's metrics, plus job and freshness gauges, as Prometheus text"""
+    snapshots = {'api': METRICS.Snapshot()}
+    scraper = ReadSnapshot(IMAGES_DIR)
+    if scraper is not None:
+        snapshots['scraper'] = scraper
+    counts = jobs.Counts()
+    return Render(snapshots, [
+        ('generation_queue_depth', 'Stations waiting for a generation worker.', [({}, counts['queued'])]),
+        ('generation_running', 'Stations being generated.', [({}, counts['running'])]),
+        ('frame_age_seconds', 'Seconds since the timestamp of each station\'s newest frame.', frame_ages()),
+    ])
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Pipeline metrics in Prometheus text format"""
+    return Response(metrics_text(), content_type=CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'ok'}), 200
 
 if __name__ == '__main__':
-    print('Starting BetterWeather API server on port 5000...')
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # Run as a script this module is __main__, so register it under its own name too: api_async then
+    # imports this module's job manager, demand tracker and caches instead of building a second set
+    sys.modules['api_server'] = sys.modules[__name__]
+    from render_pool import RENDER_POOL
+    RENDER_POOL.Start()  # Workers are ready before the first on-demand generation
+    if API_SERVER_MODE == 'async':
+        import api_async
+        api_async.Run(port=API_PORT)
+    else:
+        print(f'Starting BetterWeather API server on port {API_PORT}...')
+        app.run(host='0.0.0.0', port=API_PORT, debug=False)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Benchmark frame compositing: per-frame PIL path vs batched NumPy engine
+
+Run from the webscraping directory:
+    python benchmarks/bench_compositing.py [--frames 7] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compositor import CompositeFrames, LoadBackgroundArray, ToArray
+
+SAMPLE_FRAME = 'IDR714.T.202310260114.png'
+SAMPLE_LAYERS = ['radar_transparencies/IDR714.background.png',
+                 'radar_transparencies/IDR714.topography.png',
+                 'radar_transparencies/IDR714.roads.png']
+
+
+def CropAndResize(img: Image.Image) -> Image.Image:
+    border = 70 + 16
+    down = 70
+    img = img.crop((border, border+down, img.width - border, img.height - border+down))
+    return img.resize((240, 240), Image.Resampling.LANCZOS)
+
+
+def MakeInputs(tmp_dir: str, num_frames: int):
+    """Cropped radar frames plus a composite background PNG on disk"""
+    background = None
+    for path in SAMPLE_LAYERS:
+        layer = CropAndResize(Image.open(path).convert('RGBA'))
+        background = layer if background is None else Image.alpha_composite(background, layer)
+    background_path = os.path.join(tmp_dir, 'composite_background.png')
+    background.save(background_path)
+
+    # Roll the sample frame so each frame in the set differs
+    radar = CropAndResize(Image.open(SAMPLE_FRAME))
+    frames = [radar.rotate(i * 7) for i in range(num_frames)]
+    return frames, background_path
+
+
+def PilPath(frames: list, background_path: str) -> list:
+    """Previous behaviour: reload the background from disk for every frame"""
+    results = []
+    for radar in frames:
+        background = Image.open(background_path).convert('RGBA')
+        results.append(Image.alpha_composite(background, radar.convert('RGBA')))
+    return results
+
+
+def NumpyPath(frames: list, background_path: str) -> list:
+    background = LoadBackgroundArray(background_path)  # Cached after the first call
+    batch = CompositeFrames(background, np.stack([ToArray(radar) for radar in frames]))
+    return [Image.fromarray(frame) for frame in batch]
+
+
+def Measure(func, frames, background_path, repeat: int) -> float:
+    func(frames, background_path)  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(frames, background_path)
+    return repeat * len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=7, help='frames per batch')
+    parser.add_argument('--repeat', type=int, default=50, help='batches to time')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frames, background_path = MakeInputs(tmp_dir, args.frames)
+
+        pil_out = PilPath(frames, background_path)
+        np_out = NumpyPath(frames, background_path)
+        max_diff = max(int(np.abs(np.asarray(a, np.int16) - np.asarray(b, np.int16)).max())
+                       for a, b in zip(pil_out, np_out))
+
+        pil_fps = Measure(PilPath, frames, background_path, args.repeat)
+        np_fps = Measure(NumpyPath, frames, background_path, args.repeat)
+
+    print(f'Compositing {args.frames}-frame batches, {args.repeat} repeats')
+    print(f'  PIL (background reloaded per frame): {pil_fps:8.1f} frames/s')
+    print(f'  NumPy (cached background, batched):  {np_fps:8.1f} frames/s  ({np_fps / pil_fps:.1f}x)')
+    print(f'  Max channel difference vs PIL: {max_diff}')
+
+
+if __name__ == '__main__':
+    main()
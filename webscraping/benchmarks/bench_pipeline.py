@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Offline benchmark of the scrape-and-render pipeline against a local FTP server
+
+Starts an FTP server (pyftpdlib) on localhost serving a synthetic BOM tree:
+512x512 palette radar frames under /anon/gen/radar and background,
+topography and roads layers under /anon/gen/radar_transparencies. The
+pipeline is then driven end to end for 1, 10 and 100 stations, each scale in
+a fresh worker process so its peak RSS is its own. Reported per stage:
+
+    transparencies  DownloadTransparencies for a station
+    background      CreateCompositeBackground for a station
+    generate        GenerateImagesForRadar (list, download, render, encode, store)
+    update          UpdateImageNames for one frame
+    combine         CombineImages for the default station
+
+--ftp-latency adds a delay before every transfer to stand in for the round
+trips to the real BOM server, where parallel downloads pay off.
+
+Run from the webscraping directory (needs `pip install pyftpdlib`):
+    python benchmarks/bench_pipeline.py [--stations 1 10 100] [--frames 7] [--ftp-latency 0.1]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+WEBSCRAPING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, WEBSCRAPING_DIR)
+
+SIZE = 512
+# Shape of the BOM radar palette: 0 transparent, 1-2 label text, 3-11 rain intensity bands
+RADAR_PALETTE = [0, 0, 0, 192, 192, 192, 0, 0, 0, 245, 245, 255, 180, 180, 255, 120, 120, 255, 20, 20, 255,
+                 0, 102, 102, 0, 216, 195, 0, 150, 144, 255, 255, 0, 255, 200, 0]
+RAIN_LEVELS = np.arange(3, 12, dtype=np.uint8)
+CADENCE_MINUTES = 6
+STAGES = ('transparencies', 'background', 'generate', 'update', 'combine')
+
+
+def StationIds(count: int) -> list:
+    """BOM-shaped radar IDs: IDR<site><range>, four ranges per site"""
+    return [f'IDR{i // 4 + 1:02d}{i % 4 + 1}' for i in range(count)]
+
+
+def _PaletteImage(indices: np.ndarray, palette: list, transparency: int = None) -> Image.Image:
+    image = Image.fromarray(indices, 'P')
+    image.putpalette(palette)
+    if transparency is not None:
+        image.info['transparency'] = transparency
+    return image
+
+
+def SyntheticFrame(rng: np.random.Generator) -> Image.Image:
+    """Radar frame: rain cells as concentric intensity bands, a label strip, transparent elsewhere"""
+    y, x = np.mgrid[:SIZE, :SIZE]
+    intensity = np.zeros((SIZE, SIZE), np.float32)
+    for _ in range(rng.integers(3, 12)):
+        cy, cx = rng.uniform(0, SIZE, 2)
+        ry, rx = rng.uniform(10, 90, 2)
+        intensity = np.maximum(intensity, 1 - np.hypot((y - cy) / ry, (x - cx) / rx))
+    levels = np.clip((intensity * len(RAIN_LEVELS)).astype(np.int16), 0, len(RAIN_LEVELS))
+    indices = np.where(levels > 0, RAIN_LEVELS[np.maximum(levels - 1, 0)], 0).astype(np.uint8)
+    indices[:16, :200] = 2  # BOM frames carry a title strip
+    indices[4:12, 8:190:6] = 1
+    return _PaletteImage(indices, RADAR_PALETTE, transparency=0)
+
+
+def SyntheticLayers(rng: np.random.Generator) -> dict:
+    """background (opaque land/sea), topography (shaded contours) and roads (lines) palette layers"""
+    y, x = np.mgrid[:SIZE, :SIZE] / SIZE
+    coast = np.sin(x * rng.uniform(3, 8)) * 0.2 + rng.uniform(0.3, 0.7)
+    background = np.where(y > coast, 1, 0).astype(np.uint8)
+    background[-20:, :] = 2
+    height = np.sin(x * rng.uniform(5, 15)) * np.cos(y * rng.uniform(5, 15))
+    topography = np.clip(((height + 1) * 2).astype(np.uint8), 0, 3)
+    topography[background == 0] = 0
+    roads = np.zeros((SIZE, SIZE), np.uint8)
+    for _ in range(rng.integers(5, 15)):
+        if rng.random() < 0.5:
+            roads[rng.integers(SIZE), :] = 1
+        else:
+            roads[:, rng.integers(SIZE)] = 1
+    return {
+        'background': _PaletteImage(background, [170, 210, 240, 235, 225, 200, 255, 255, 255]),
+        'topography': _PaletteImage(topography, [0, 0, 0, 215, 205, 175, 190, 175, 140, 160, 140, 110], 0),
+        'roads': _PaletteImage(roads, [0, 0, 0, 120, 120, 120], 0),
+    }
+
+
+def PopulateFtpRoot(root: str, stations: list, frames: int, seed: int = 0):
+    radar_dir = os.path.join(root, 'anon', 'gen', 'radar')
+    layers_dir = os.path.join(root, 'anon', 'gen', 'radar_transparencies')
+    os.makedirs(radar_dir)
+    os.makedirs(layers_dir)
+
+    start = time.time() // (CADENCE_MINUTES * 60) * (CADENCE_MINUTES * 60) - frames * CADENCE_MINUTES * 60
+    timestamps = [time.strftime('%Y%m%d%H%M', time.gmtime(start + i * CADENCE_MINUTES * 60)) for i in range(frames)]
+    for n, radar_id in enumerate(stations):
+        rng = np.random.default_rng(seed + n)
+        for name, layer in SyntheticLayers(rng).items():
+            layer.save(os.path.join(layers_dir, f'{radar_id}.{name}.png'))
+        for timestamp in timestamps:
+            SyntheticFrame(rng).save(os.path.join(radar_dir, f'{radar_id}.T.{timestamp}.png'))
+
+
+def StartFtpServer(root: str, latency: float = 0):
+    try:
+        from pyftpdlib.authorizers import DummyAuthorizer
+        from pyftpdlib.handlers import FTPHandler
+        from pyftpdlib.log import config_logging
+        from pyftpdlib.servers import ThreadedFTPServer
+    except ImportError:
+        sys.exit('bench_pipeline.py needs a local FTP server: pip install pyftpdlib')
+
+    config_logging(level=logging.WARNING)
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(root)
+    def ftp_RETR(self, file):
+        time.sleep(latency)  # Each session has its own thread, so only this transfer waits
+        return FTPHandler.ftp_RETR(self, file)
+
+    handler = type('Handler', (FTPHandler,), {'authorizer': authorizer, 'ftp_RETR': ftp_RETR})
+    server = ThreadedFTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, kwargs={'handle_exit': False}, daemon=True).start()
+    return server, server.socket.getsockname()[1]
+
+
+def Timed(timings: dict, stage: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def RunWorker(num_stations: int, frames: int) -> dict:
+    """Drive the pipeline for num_stations in the current directory (called in a fresh process)"""
+    import ftpscraper
+    from frame_store import FrameStore
+
+    os.makedirs('images', exist_ok=True)
+    stations = StationIds(num_stations)
+    timings = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for radar_id in stations:
+            layers = Timed(timings, 'transparencies', ftpscraper.DownloadTransparencies, radar_id)
+            Timed(timings, 'background', ftpscraper.CreateCompositeBackground, layers,
+                  f'composite_background_{radar_id}.png')
+        for radar_id in stations:
+            Timed(timings, 'generate', ftpscraper.GenerateImagesForRadar, radar_id, frames)
+
+        # The default station's path: render its frames again and push each one, then build radar.png
+        background = ftpscraper.LoadBackgroundArray(f'composite_background_{stations[0]}.png')
+        filenames = list(reversed(ftpscraper.GetRecentRadarFiles(stations[0], frames)))
+        for filename, frame, overlay in ftpscraper.ProcessFrames(filenames, background):
+            Timed(timings, 'update', ftpscraper.UpdateImageNames, frame, frames, None,
+                  ftpscraper.FrameTimestamp(filename), overlay)
+        Timed(timings, 'combine', ftpscraper.CombineImages, frames, 3)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'stations': num_stations,
+        'elapsed': elapsed,
+        'frames_rendered': sum(FrameStore(radar_id, frames).Length() for radar_id in stations),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'timings': timings,
+    }
+
+
+def RunScale(num_stations: int, frames: int, port: int) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ, BOM_FTP_HOST='127.0.0.1', BOM_FTP_PORT=str(port), PYTHONPATH=WEBSCRAPING_DIR)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', str(num_stations),
+                                 '--frames', str(frames)], cwd=work_dir, env=env, check=True,
+                                capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def Report(result: dict):
+    print(f'\n{result["stations"]} station(s): {result["elapsed"]:.2f}s, '
+          f'{result["stations"] / result["elapsed"]:.2f} stations/s, '
+          f'{result["frames_rendered"] / result["elapsed"]:.1f} frames/s, peak RSS {result["peak_rss_mb"]:.0f} MB')
+    print(f'{"stage":>15} {"calls":>6} {"total s":>8} {"mean ms":>8} {"p95 ms":>8} {"per s":>8}')
+    for stage in STAGES:
+        samples = sorted(result['timings'].get(stage, []))
+        if not samples:
+            continue
+        total = sum(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f'{stage:>15} {len(samples):>6} {total:>8.2f} {total / len(samples) * 1000:>8.1f} '
+              f'{p95 * 1000:>8.1f} {len(samples) / total:>8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stations', type=int, nargs='+', default=[1, 10, 100], help='station counts to run')
+    parser.add_argument('--frames', type=int, default=7, help='frames per station')
+    parser.add_argument('--ftp-latency', type=float, default=0, help='seconds added before each FTP download')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(RunWorker(args.worker, args.frames)))
+        return
+
+    with tempfile.TemporaryDirectory() as ftp_root:
+        print(f'Generating synthetic BOM tree for {max(args.stations)} stations...')
+        PopulateFtpRoot(ftp_root, StationIds(max(args.stations)), args.frames)
+        server, port = StartFtpServer(ftp_root, args.ftp_latency)
+        try:
+            for num_stations in args.stations:
+                Report(RunScale(num_stations, args.frames, port))
+        finally:
+            server.close_all()
+
+
+if __name__ == '__main__':
+    main()
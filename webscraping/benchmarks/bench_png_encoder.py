@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark PNG encoder settings: bytes per frame, encode time and fidelity
+
+Frames are the sample radar image composited over the IDR714 background
+layers, shifted a few pixels per frame to stand in for moving rain; the
+radar-only RGBA overlays of layered delivery are measured as a second case.
+Each setting is timed through quantize + save, and its fidelity is the PSNR
+of the decoded frame (RGBA for overlays) against the full-colour original.
+
+Run from the webscraping directory:
+    python benchmarks/bench_png_encoder.py [--frames 7] [--repeat 5] [--full]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, features
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compositor import CompositeFrames, FlattenLayers
+from png_encoder import PngEncoder
+from resampling import CropAndResizeStack
+
+SAMPLE_FRAME = 'IDR714.T.202310260114.png'
+SAMPLE_LAYERS = ['radar_transparencies/IDR714.background.png',
+                 'radar_transparencies/IDR714.topography.png',
+                 'radar_transparencies/IDR714.roads.png']
+
+# (colors, method, dither, compress_level, strategy); colors 0 = full-colour RGBA
+CURATED = [
+    (0, 'mediancut', 'none', 6, 'default'),  # Previous behaviour: Pillow defaults
+    (0, 'mediancut', 'none', 9, 'default'),
+    (256, 'fastoctree', 'none', 6, 'default'),  # png_encoder defaults
+    (256, 'fastoctree', 'none', 9, 'default'),
+    (256, 'mediancut', 'none', 9, 'default'),
+    (256, 'fastoctree', 'floydsteinberg', 9, 'default'),
+    (128, 'fastoctree', 'none', 9, 'default'),
+    (64, 'fastoctree', 'none', 9, 'default'),
+    (32, 'fastoctree', 'none', 9, 'default'),
+    (256, 'fastoctree', 'none', 1, 'default'),
+    (256, 'fastoctree', 'none', 9, 'filtered'),
+    (256, 'fastoctree', 'none', 9, 'rle'),
+    (256, 'fastoctree', 'none', 9, 'huffman'),
+]
+
+
+def SampleFrames(count: int) -> tuple:
+    """(composited frames, radar-only RGBA overlays) with the rain shifted a few pixels each time"""
+    with Image.open(SAMPLE_FRAME) as im:
+        radar = im.convert('RGBA')
+    layers = [Image.open(path).convert('RGBA') for path in SAMPLE_LAYERS]
+    background = FlattenLayers(list(CropAndResizeStack(layers)))
+    shifted = [Image.fromarray(np.roll(np.asarray(radar), (3 * i, 2 * i), axis=(0, 1))) for i in range(count)]
+    overlays = CropAndResizeStack(shifted)
+    frames = [Image.fromarray(frame) for frame in CompositeFrames(background, overlays)]
+    return frames, [Image.fromarray(overlay, 'RGBA') for overlay in overlays]
+
+
+def Psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def Measure(frames: list, setting: tuple, repeat: int) -> dict:
+    colors, method, dither, level, strategy = setting
+    encoder = PngEncoder(colors, method, dither, level, strategy)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = [encoder.Encode(frame) for frame in frames]
+        best = min(best, time.perf_counter() - start)
+
+    mode = 'RGBA' if frames[0].mode == 'RGBA' else 'RGB'
+    psnr = [Psnr(np.asarray(frame.convert(mode)), np.asarray(Image.open(BytesIO(data)).convert(mode)))
+            for frame, data in zip(frames, encoded)]
+    return {
+        'bytes': sum(len(data) for data in encoded) / len(frames),
+        'ms': best / len(frames) * 1000,
+        'psnr': min(psnr),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=7, help='frames per run')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per setting (best is reported)')
+    parser.add_argument('--full', action='store_true', help='every combination instead of the curated settings')
+    args = parser.parse_args()
+
+    settings = CURATED
+    if args.full:
+        methods = ['mediancut', 'fastoctree'] + (['libimagequant'] if features.check('libimagequant') else [])
+        settings = [(0, 'mediancut', 'none', level, strategy)
+                    for level, strategy in itertools.product((1, 6, 9), ('default', 'filtered', 'rle'))]
+        settings += list(itertools.product((32, 64, 128, 256), methods, ('none', 'floydsteinberg'), (1, 6, 9),
+                                           ('default', 'filtered', 'rle', 'huffman')))
+
+    frames, overlays = SampleFrames(args.frames)
+    for title, images in (('Composited frames', frames), ('RGBA overlays', overlays)):
+        baseline = None
+        print(f'\n{title}')
+        print(f'{"colors":>6} {"method":>13} {"dither":>14} {"level":>5} {"strategy":>8} '
+              f'{"bytes/frame":>11} {"vs RGBA":>7} {"ms/frame":>8} {"PSNR dB":>7}')
+        for setting in settings:
+            r = Measure(images, setting, args.repeat)
+            baseline = baseline or r['bytes']
+            colors, method, dither, level, strategy = setting
+            print(f'{colors or "RGBA":>6} {method if colors else "-":>13} {dither if colors else "-":>14} '
+                  f'{level:>5} {strategy:>8} {r["bytes"]:>11.0f} {r["bytes"] / baseline:>7.2f} {r["ms"]:>8.2f} '
+                  f'{r["psnr"]:>7.1f}')
+
+
+if __name__ == '__main__':
+    main()
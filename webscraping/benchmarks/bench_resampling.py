@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark crop-and-resize: per-image PIL LANCZOS vs the palette-preserving resampler
+
+Radar frames are timed through the whole crop/resize + composite stage, since
+the resampler keeps them as palette indices until the compositor. Background
+layers are timed through crop/resize alone.
+
+Run from the webscraping directory:
+    python benchmarks/bench_resampling.py [--frames 7] [--repeat 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from compositor import CompositeFrames, CompositePaletteFrames, FlattenLayers, PremultiplyUint8
+from resampling import CropAndResizePalette, CropAndResizeStack
+
+SAMPLE_FRAME = 'IDR714.T.202310260114.png'
+SAMPLE_LAYERS = ['radar_transparencies/IDR714.background.png',
+                 'radar_transparencies/IDR714.topography.png',
+                 'radar_transparencies/IDR714.roads.png']
+
+
+def PilCropAndResize(images: list) -> np.ndarray:
+    """Previous behaviour: crop and LANCZOS-resize each image separately"""
+    border = 70 + 16
+    down = 70
+    results = []
+    for img in images:
+        img = img.crop((border, border+down, img.width - border, img.height - border+down))
+        results.append(np.asarray(img.resize((240, 240), Image.Resampling.LANCZOS).convert('RGBA')))
+    return np.stack(results)
+
+
+def Measure(func, repeat: int, count: int) -> float:
+    func()  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return repeat * count / (time.perf_counter() - start)
+
+
+def MaxDiff(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+
+
+def Report(label: str, unit: str, count: int, repeat: int, pil_func, op_func):
+    max_diff = MaxDiff(pil_func(), op_func())
+    pil_rate = Measure(pil_func, repeat, count)
+    op_rate = Measure(op_func, repeat, count)
+    print(f'{label} ({count} {unit}, {repeat} repeats)')
+    print(f'  PIL crop + resize per image: {pil_rate:8.1f} {unit}/s')
+    print(f'  Palette-preserving resampler: {op_rate:7.1f} {unit}/s  ({op_rate / pil_rate:.1f}x)')
+    print(f'  Max channel difference vs PIL: {max_diff}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=7, help='radar frames per stack')
+    parser.add_argument('--repeat', type=int, default=30, help='stacks to time')
+    args = parser.parse_args()
+
+    layers = [Image.open(path).convert('RGBA') for path in SAMPLE_LAYERS]
+    background = PremultiplyUint8(FlattenLayers(list(PilCropAndResize(layers))))
+
+    # Rotate the sample frame so each frame in the stack differs
+    sample = Image.open(SAMPLE_FRAME)
+    sample.load()
+    frames = [sample.rotate(i * 7) for i in range(args.frames)]
+    for frame in frames:
+        frame.info['transparency'] = sample.info.get('transparency')
+
+    Report('Radar frames, resample + composite', 'frames', len(frames), args.repeat,
+           lambda: CompositeFrames(background, PilCropAndResize(frames)),
+           lambda: CompositePaletteFrames(background, *CropAndResizePalette(frames)))
+    Report('RGBA transparency layers, resample', 'layers', len(layers), args.repeat,
+           lambda: PilCropAndResize(layers),
+           lambda: CropAndResizeStack(layers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Load test api_server.py in Flask (threaded) and asyncio serving modes
+
+Starts each mode as a subprocess on a local port over a temporary images
+directory with pre-rendered frames, then drives it with concurrent clients
+fetching frames (and some /api/location lookups), the way a fleet of watches
+refreshes at once.
+
+Run from the webscraping directory:
+    python benchmarks/bench_serving.py [--concurrency 10 50 200] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+from PIL import Image
+
+WEBSCRAPING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, WEBSCRAPING_DIR)
+
+from frame_store import FrameStore
+
+SAMPLE_FRAME = 'IDR714.T.202310260114.png'
+STATIONS = ['IDR713', 'IDR023', 'IDR663', 'IDR643']
+NUM_IMAGES = 7
+
+
+def PopulateImages(images_dir: str):
+    """Render a full frame buffer for each benchmark station"""
+    frame = Image.open(SAMPLE_FRAME).convert('RGBA').resize((240, 240))
+    for radar_id in STATIONS:
+        store = FrameStore(radar_id, NUM_IMAGES, images_dir)
+        for i in range(NUM_IMAGES):
+            store.Push(frame, f'20240101{i:04d}')
+
+
+def StartServer(mode: str, port: int, images_dir: str) -> subprocess.Popen:
+    env = dict(os.environ, API_SERVER_MODE=mode, API_PORT=str(port), IMAGES_DIR=images_dir)
+    return subprocess.Popen([sys.executable, 'api_server.py'], cwd=WEBSCRAPING_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def WaitUntilUp(base_url: str, timeout: float = 15):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f'{base_url}/api/health') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f'Server at {base_url} did not start')
+
+
+def RandomPath(rng: random.Random) -> str:
+    if rng.random() < 0.1:
+        return f'/api/location?lat={rng.uniform(-38, -27):.4f}&lon={rng.uniform(138, 153):.4f}'
+    return f'/images/{rng.choice(STATIONS)}-{rng.randrange(NUM_IMAGES)}.png'
+
+
+async def Client(session, base_url: str, stop_at: float, seed: int, latencies: list, errors: list):
+    rng = random.Random(seed)
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            async with session.get(base_url + RandomPath(rng)) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def Load(base_url: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        stop_at = time.monotonic() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(Client(session, base_url, stop_at, seed, latencies, errors)
+                               for seed in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'errors': len(errors),
+    }
+
+
+async def Benchmark(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as images_dir:
+        PopulateImages(images_dir)
+        for offset, mode in enumerate(('flask', 'async')):
+            port = args.port + offset
+            server = StartServer(mode, port, images_dir)
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                await WaitUntilUp(base_url)
+                for concurrency in args.concurrency:
+                    results[mode, concurrency] = await Load(base_url, concurrency, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f'Serving frames + /api/location, {args.duration:.0f}s per run')
+    print(f'{"clients":>8} {"mode":>6} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for concurrency in args.concurrency:
+        for mode in ('flask', 'async'):
+            r = results[mode, concurrency]
+            print(f'{concurrency:>8} {mode:>6} {r["rps"]:>9.0f} {r["p50_ms"]:>8.1f} {r["p99_ms"]:>8.1f} {r["errors"]:>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200], help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per run')
+    parser.add_argument('--port', type=int, default=5600, help='first local port to use')
+    asyncio.run(Benchmark(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
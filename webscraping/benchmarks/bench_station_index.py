@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark nearest-radar lookup: per-entry haversine loop vs precomputed station index
+
+Run from the webscraping directory:
+    python benchmarks/bench_station_index.py [--queries 10000] [--batch 1000]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api_server import RADAR_STATIONS
+from station_index import StationIndex
+
+
+def HaversineDistance(lat1, lon1, lat2, lon2):
+    R = 6371
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def LoopNearest(lat, lon):
+    """Previous behaviour: haversine against every RADAR_STATIONS entry"""
+    nearest_id = None
+    nearest_distance = float('inf')
+    for radar_id, info in RADAR_STATIONS.items():
+        distance = HaversineDistance(lat, lon, info['lat'], info['lon'])
+        if distance < nearest_distance:
+            nearest_distance = distance
+            nearest_id = radar_id
+    return nearest_id, nearest_distance
+
+
+def Rate(func, count: int) -> float:
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=10000, help='coordinates to resolve')
+    parser.add_argument('--batch', type=int, default=1000, help='coordinates per batch call')
+    args = parser.parse_args()
+
+    # Random points over the Australian mainland bounding box
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-44, -10, args.queries).tolist()
+    lons = rng.uniform(112, 154, args.queries).tolist()
+    index = StationIndex(RADAR_STATIONS)
+
+    loop = [LoopNearest(lat, lon) for lat, lon in zip(lats, lons)]
+    indexed = [index.Nearest(lat, lon)[0] for lat, lon in zip(lats, lons)]
+    max_diff = max(abs(a[1] - b['distance_km']) for a, b in zip(loop, indexed))
+    same_site = sum(a[0][:-1] == b['radar_id'][:-1] for a, b in zip(loop, indexed))
+
+    loop_rate = Rate(lambda: [LoopNearest(lat, lon) for lat, lon in zip(lats, lons)], args.queries)
+    single_rate = Rate(lambda: [index.Nearest(lat, lon) for lat, lon in zip(lats, lons)], args.queries)
+    batch_rate = Rate(lambda: [index.NearestMany(lats[i:i + args.batch], lons[i:i + args.batch])
+                               for i in range(0, args.queries, args.batch)], args.queries)
+    k5_rate = Rate(lambda: [index.NearestMany(lats[i:i + args.batch], lons[i:i + args.batch], 5)
+                            for i in range(0, args.queries, args.batch)], args.queries)
+
+    print(f'Nearest radar for {args.queries} coordinates ({len(RADAR_STATIONS)} entries, {len(index.sites)} sites)')
+    print(f'  Haversine loop:            {loop_rate:10.0f} lookups/s')
+    print(f'  Index, one per call:       {single_rate:10.0f} lookups/s  ({single_rate / loop_rate:.1f}x)')
+    print(f'  Index, batched:            {batch_rate:10.0f} lookups/s  ({batch_rate / loop_rate:.1f}x)')
+    print(f'  Index, batches, k=5:       {k5_rate:10.0f} lookups/s  ({k5_rate / loop_rate:.1f}x)')
+    # Distances differ only where a site's range variants list slightly different coordinates
+    print(f'  Same site as loop: {same_site}/{args.queries}, max distance difference {max_diff:.2f} km')
+
+
+if __name__ == '__main__':
+    main()
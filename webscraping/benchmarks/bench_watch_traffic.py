@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Load generator replaying watch traffic against api_server.py
+
+Each simulated watch follows the real client flow: GET /api/location for its
+position, then fetches /images/<id>-6.png down to -0.png one at a time,
+retrying 202 responses after their Retry-After, and waits before the next
+refresh. Watch positions are drawn around Australia's population centres,
+with a share spread over the remote radar sites in RADAR_STATIONS, so
+station demand is as skewed as real traffic.
+
+By default the tool is self-contained: it serves a synthetic BOM tree from a
+local FTP server (see bench_pipeline.py), starts api_server.py on an empty
+images directory and runs a cold phase (every station generated on demand)
+followed by a warm phase against the same server. Use --target to drive an
+existing deployment instead.
+
+Run from the webscraping directory (self-contained mode needs `pip install pyftpdlib`):
+    python benchmarks/bench_watch_traffic.py [--watches 200] [--duration 20] [--mode flask|async]
+    python benchmarks/bench_watch_traffic.py --target http://your-server-ip --watches 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+WEBSCRAPING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, WEBSCRAPING_DIR)
+
+from api_server import NUM_IMAGES, RADAR_STATIONS, STATION_INDEX
+from bench_pipeline import PopulateFtpRoot, StartFtpServer
+from bench_serving import WaitUntilUp
+
+# (lat, lon, population in thousands) of the largest urban areas
+POPULATION_CENTRES = [
+    (-33.87, 151.21, 5300), (-37.81, 144.96, 5100), (-27.47, 153.03, 2600), (-31.95, 115.86, 2200),
+    (-34.93, 138.60, 1400), (-28.02, 153.40, 700), (-32.93, 151.78, 500), (-35.28, 149.13, 460),
+    (-34.43, 150.89, 310), (-42.88, 147.33, 250), (-19.26, 146.82, 180), (-38.15, 144.36, 280),
+    (-16.92, 145.77, 155), (-12.46, 130.84, 150), (-27.56, 151.95, 140), (-36.76, 144.28, 100),
+]
+# Share of watches away from the population centres, placed near any radar site
+REMOTE_SHARE = 0.15
+# Spread of positions around a centre or site, in degrees (~30 km)
+POSITION_SPREAD_DEG = 0.3
+MAX_RETRIES = 10
+
+
+def WatchPosition(rng: random.Random) -> tuple:
+    if rng.random() < REMOTE_SHARE:
+        site = rng.choice(list(RADAR_STATIONS.values()))
+        lat, lon = site['lat'], site['lon']
+    else:
+        lat, lon, _ = rng.choices(POPULATION_CENTRES, weights=[c[2] for c in POPULATION_CENTRES])[0]
+    return lat + rng.gauss(0, POSITION_SPREAD_DEG), lon + rng.gauss(0, POSITION_SPREAD_DEG)
+
+
+class Stats:
+    def __init__(self):
+        self.requests = []  # (kind, status, seconds); status None for a connection error
+        self.cycles = []  # seconds for a whole location + 7 frames refresh
+        self.stations = {}
+
+    def Summary(self, elapsed: float) -> dict:
+        latencies = sorted(seconds for _, _, seconds in self.requests)
+        statuses = [status for _, status, _ in self.requests]
+        images = [status for kind, status, _ in self.requests if kind == 'image']
+        cycles = sorted(self.cycles)
+
+        def Pct(values, q):
+            return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else float('nan')
+
+        return {
+            'requests': len(latencies),
+            'rps': len(latencies) / elapsed,
+            'p50_ms': Pct(latencies, 0.50),
+            'p95_ms': Pct(latencies, 0.95),
+            'p99_ms': Pct(latencies, 0.99),
+            'error_rate': sum(s is None or s >= 400 for s in statuses) / max(1, len(statuses)),
+            'accepted_rate': sum(s == 202 for s in images) / max(1, len(images)),
+            'cycles': len(cycles),
+            'cycle_p50_s': Pct(cycles, 0.50) / 1000,
+            'cycle_p95_s': Pct(cycles, 0.95) / 1000,
+            'stations': len(self.stations),
+        }
+
+
+async def Fetch(session, url: str, kind: str, stats: Stats) -> tuple:
+    start = time.perf_counter()
+    try:
+        async with session.get(url) as response:
+            body = await response.read()
+            stats.requests.append((kind, response.status, time.perf_counter() - start))
+            return response, body
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        stats.requests.append((kind, None, time.perf_counter() - start))
+        return None, None
+
+
+async def Watch(session, base_url: str, rng: random.Random, stop_at: float, args, stats: Stats):
+    lat, lon = WatchPosition(rng)
+    query = f'?profile={args.profile}' if args.profile else ''
+    await asyncio.sleep(rng.uniform(0, args.ramp))  # Watches don't all wake at once
+    while time.monotonic() < stop_at:
+        cycle_start = time.perf_counter()
+        response, body = await Fetch(session, f'{base_url}/api/location?lat={lat:.4f}&lon={lon:.4f}', 'location', stats)
+        if response is None or response.status != 200:
+            await asyncio.sleep(args.think)
+            continue
+        radar_id = json.loads(body)['radar_id']
+        stats.stations[radar_id] = stats.stations.get(radar_id, 0) + 1
+
+        # The watch fetches the newest frame first, one request at a time
+        for index in range(NUM_IMAGES - 1, -1, -1):
+            for _ in range(MAX_RETRIES):
+                response, _ = await Fetch(session, f'{base_url}/images/{radar_id}-{index}.png{query}', 'image', stats)
+                if response is None or response.status != 202:
+                    break
+                retry_after = float(response.headers.get('Retry-After', 1))
+                await asyncio.sleep(retry_after * args.retry_scale)
+        stats.cycles.append(time.perf_counter() - cycle_start)
+        await asyncio.sleep(args.think * rng.uniform(0.5, 1.5))
+
+
+async def Phase(base_url: str, args, seed: int) -> dict:
+    stats = Stats()
+    connector = aiohttp.TCPConnector(limit=args.watches)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        stop_at = time.monotonic() + args.duration
+        start = time.perf_counter()
+        await asyncio.gather(*(Watch(session, base_url, random.Random(seed + n), stop_at, args, stats)
+                               for n in range(args.watches)))
+        elapsed = time.perf_counter() - start
+    return stats.Summary(elapsed)
+
+
+def StartServer(mode: str, port: int, work_dir: str, ftp_port: int) -> subprocess.Popen:
+    env = dict(os.environ, API_SERVER_MODE=mode, API_PORT=str(port), IMAGES_DIR=os.path.join(work_dir, 'images'),
+               BACKGROUNDS_DIR=work_dir, BOM_FTP_HOST='127.0.0.1', BOM_FTP_PORT=str(ftp_port),
+               PYTHONPATH=WEBSCRAPING_DIR)
+    os.makedirs(os.path.join(work_dir, 'images'), exist_ok=True)
+    return subprocess.Popen([sys.executable, os.path.join(WEBSCRAPING_DIR, 'api_server.py')], cwd=work_dir,
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def Report(phase: str, r: dict):
+    print(f'{phase:>5} {r["requests"]:>8} {r["rps"]:>7.0f} {r["p50_ms"]:>7.1f} {r["p95_ms"]:>7.1f} '
+          f'{r["p99_ms"]:>7.1f} {r["error_rate"]:>6.1%} {r["accepted_rate"]:>6.1%} {r["cycles"]:>7} '
+          f'{r["cycle_p50_s"]:>7.2f} {r["cycle_p95_s"]:>7.2f} {r["stations"]:>8}')
+
+
+async def Run(args):
+    print(f'{args.watches} watches, {args.duration:.0f}s per phase, think {args.think:.0f}s')
+    print(f'{"phase":>5} {"requests":>8} {"req/s":>7} {"p50 ms":>7} {"p95 ms":>7} {"p99 ms":>7} '
+          f'{"errors":>6} {"202s":>6} {"cycles":>7} {"cyc p50":>7} {"cyc p95":>7} {"stations":>8}')
+    if args.target:
+        Report('run', await Phase(args.target.rstrip('/'), args, args.seed))
+        return
+
+    with tempfile.TemporaryDirectory() as ftp_root, tempfile.TemporaryDirectory() as work_dir:
+        # Only the stations nearest to some watch are ever requested
+        positions = [WatchPosition(random.Random(args.seed + n)) for n in range(args.watches)]
+        stations = {STATION_INDEX.Nearest(lat, lon)[0]['radar_id'] for lat, lon in positions}
+        PopulateFtpRoot(ftp_root, sorted(stations), NUM_IMAGES)
+        ftp_server, ftp_port = StartFtpServer(ftp_root)
+        server = StartServer(args.mode, args.port, work_dir, ftp_port)
+        try:
+            base_url = f'http://127.0.0.1:{args.port}'
+            await WaitUntilUp(base_url)
+            Report('cold', await Phase(base_url, args, args.seed))
+            Report('warm', await Phase(base_url, args, args.seed))
+        finally:
+            server.terminate()
+            server.wait()
+            ftp_server.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--watches', type=int, default=200, help='simulated watches')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per phase')
+    parser.add_argument('--think', type=float, default=5, help='mean seconds between a watch\'s refreshes')
+    parser.add_argument('--ramp', type=float, default=2, help='seconds over which watches start')
+    parser.add_argument('--retry-scale', type=float, default=1, help='multiplier on Retry-After waits')
+    parser.add_argument('--profile', default='mip240', help='device profile to request (empty for none)')
+    parser.add_argument('--mode', choices=('flask', 'async'), default='flask', help='API_SERVER_MODE to start')
+    parser.add_argument('--port', type=int, default=5700, help='local port for the started server')
+    parser.add_argument('--target', help='base URL of a running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(Run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Per-station animation bundles: every buffered frame in one sprite sheet"""
+from frame_store import FrameStore
+from metrics import METRICS
+from png_encoder import FRAME_ENCODER
+from PIL import Image, PngImagePlugin
+import json
+import os
+import threading
+
+# Frames per row of the sprite sheet (images/radar.png has always used 3)
+BUNDLE_COLUMNS = int(os.environ.get('BUNDLE_COLUMNS', '3'))
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _BundleLock(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def RenderSprite(paths: list, cols: int) -> Image.Image:
+    """Paste frames left to right, top to bottom into one RGBA grid"""
+    images = []
+    for path in paths:
+        with Image.open(path) as im:
+            images.append(im.convert('RGBA'))
+    width = max(im.width for im in images)
+    height = max(im.height for im in images)
+    rows = -(-len(images) // cols)
+
+    sheet = Image.new('RGBA', (width * cols, height * rows))
+    for i, im in enumerate(images):
+        sheet.paste(im, ((i % cols) * width, (i // cols) * height))
+    return sheet
+
+
+class FrameBundle:
+    """Sprite sheet of a station's buffered frames, rebuilt once per update.
+
+    The sheet and a JSON sidecar describing it (frame timestamps and where
+    each frame sits) are written next to the station's ring buffer. They are
+    rebuilt only when the buffer's manifest has changed since the last
+    build, so every request between updates is plain file serving.
+    """
+
+    def __init__(self, store: FrameStore, cols: int = BUNDLE_COLUMNS):
+        self.store = store
+        self.cols = max(1, cols)
+        prefix = f'{store.name}.' if store.name else ''
+        self.path = os.path.join(store.directory, prefix + 'bundle.png')
+        self.meta_path = os.path.join(store.directory, prefix + 'bundle.json')
+
+    @staticmethod
+    def _Source(manifest: dict) -> list:
+        """Identifies the buffer state a bundle was built from"""
+        return [manifest['head'], manifest['length'], manifest['updated']]
+
+    def _Current(self, manifest: dict) -> dict:
+        """Metadata of the bundle on disk if it was built from this manifest"""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('source') != self._Source(manifest) or not os.path.exists(self.path):
+            return None
+        meta['path'] = self.path
+        return meta
+
+    def Get(self) -> dict:
+        """Bundle metadata (with 'path'), building the sheet if the buffer has changed; None if empty"""
+        meta = self._Current(self.store.Manifest())
+        METRICS.Count('bundles', meta is not None)
+        if meta is not None:
+            return meta
+
+        with _BundleLock(self.path):
+            manifest = self.store.Manifest()
+            return self._Current(manifest) or self._Build(manifest)  # Another request may have built it
+
+    def _Build(self, manifest: dict) -> dict:
+        if not manifest['length']:
+            return None
+        slots = [self.store._Slot(manifest, i) for i in range(manifest['length'])]
+        paths = [self.store.SlotPath(slot) for slot in slots]
+        timestamps = [manifest['timestamps'][slot] for slot in slots]
+
+        sheet = RenderSprite(paths, self.cols)
+        width, height = sheet.width // self.cols, sheet.height // (-(-len(paths) // self.cols))
+        meta = {
+            'radar_id': self.store.name,
+            'timestamps': timestamps,
+            'columns': self.cols,
+            'frame_width': width,
+            'frame_height': height,
+            'frames': [{'index': i, 'timestamp': ts, 'x': (i % self.cols) * width, 'y': (i // self.cols) * height}
+                       for i, ts in enumerate(timestamps)],
+            'source': self._Source(manifest),
+        }
+
+        # The timestamps also travel inside the PNG for clients that only fetch the sheet
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Timestamps', ','.join(ts or '' for ts in timestamps))
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        FRAME_ENCODER.Save(sheet, tmp_path, pnginfo=info)
+        os.replace(tmp_path, self.path)
+
+        tmp_meta = f'{self.meta_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self.meta_path)
+        meta['path'] = self.path
+        return meta
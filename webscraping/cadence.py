@@ -0,0 +1,204 @@
+"""Per-station publish cadence prediction and frame freshness statistics"""
+from collections import deque
+from frame_store import FRAME_DIR
+import calendar
+import json
+import os
+import statistics
+import threading
+import time
+
+# Initial guesses until a station's listing has been seen
+CADENCE_DEFAULT_INTERVAL_SECONDS = float(os.environ.get('CADENCE_DEFAULT_INTERVAL_SECONDS', '360'))
+# How long after its timestamp a frame is expected to appear on the FTP server
+CADENCE_PUBLISH_DELAY_SECONDS = float(os.environ.get('CADENCE_PUBLISH_DELAY_SECONDS', '120'))
+# First retry after a miss; retries double up to one publish interval
+CADENCE_BACKOFF_SECONDS = float(os.environ.get('CADENCE_BACKOFF_SECONDS', '20'))
+# Consecutive misses before the station is re-synced from the directory listing
+CADENCE_RESYNC_MISSES = int(os.environ.get('CADENCE_RESYNC_MISSES', '3'))
+
+# Listing timestamps used to fit the interval
+CADENCE_HISTORY = 12
+# Freshness lags kept per station for the stats percentiles
+CADENCE_LAG_SAMPLES = 100
+
+FRESHNESS_FILE = 'freshness.json'
+
+
+def TimestampSeconds(timestamp: str) -> float:
+    """Unix time of a BOM frame timestamp (YYYYMMDDHHMM UTC)"""
+    return calendar.timegm(time.strptime(timestamp, '%Y%m%d%H%M'))
+
+
+def SecondsTimestamp(seconds: float) -> str:
+    """BOM frame timestamp (YYYYMMDDHHMM UTC) for a Unix time"""
+    return time.strftime('%Y%m%d%H%M', time.gmtime(seconds))
+
+
+def _Percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CadencePredictor:
+    """Learns when a station publishes its next frame and when to look for it.
+
+    The publish interval is the median spacing of the station's recent
+    listing timestamps, and the phase comes from the newest frame we hold, so
+    the next frame is expected at last + interval and polled for
+    publish_delay seconds after that. The delay adapts: a frame found on the
+    first poll nudges it earlier, one found after misses pulls it towards the
+    observed lag. Misses back off exponentially up to one interval, and after
+    CADENCE_RESYNC_MISSES misses the caller should re-read the listing
+    (NeedsResync) in case a frame was skipped or the cadence changed.
+    """
+
+    def __init__(self, radar_id: str, interval: float = CADENCE_DEFAULT_INTERVAL_SECONDS,
+                 publish_delay: float = CADENCE_PUBLISH_DELAY_SECONDS):
+        self.radar_id = radar_id
+        self.interval = interval
+        self.publish_delay = publish_delay
+        self.last = None  # Unix time of the newest frame held
+        self.last_poll = None
+        self.misses = 0
+
+        self.polls = 0
+        self.hits = 0
+        self.frames = 0
+        self.lags = deque(maxlen=CADENCE_LAG_SAMPLES)
+        self._lock = threading.Lock()
+
+    def Fit(self, timestamps: list):
+        """Learn the publish interval from listing timestamps (oldest first)"""
+        seconds = [TimestampSeconds(ts) for ts in timestamps[-CADENCE_HISTORY:]]
+        gaps = [b - a for a, b in zip(seconds, seconds[1:]) if b > a]
+        if gaps:
+            with self._lock:
+                self.interval = statistics.median(gaps)
+
+    def Seed(self, timestamp: str):
+        """Set the newest frame already held, e.g. from the frame store on startup"""
+        if timestamp:
+            with self._lock:
+                self.last = max(self.last or 0, TimestampSeconds(timestamp))
+
+    def IsNew(self, timestamp: str) -> bool:
+        return self.last is None or TimestampSeconds(timestamp) > self.last
+
+    def Expected(self) -> str:
+        """Timestamp of the next frame, None until a frame has been seen"""
+        return None if self.last is None else SecondsTimestamp(self.last + self.interval)
+
+    def NextPoll(self) -> float:
+        """Unix time at which the station should next be polled"""
+        with self._lock:
+            if self.last is None or self.last_poll is None:
+                return time.time()
+            due = self.last + self.interval + self.publish_delay
+            if self.misses:
+                backoff = min(CADENCE_BACKOFF_SECONDS * 2 ** (self.misses - 1), self.interval)
+                due = max(due, self.last_poll + backoff)
+            return due
+
+    def IsDue(self, now: float = None) -> bool:
+        return (now or time.time()) >= self.NextPoll()
+
+    def NeedsResync(self) -> bool:
+        """Whether to re-read the listing rather than poll for the expected frame"""
+        if self.last is None or self.misses >= CADENCE_RESYNC_MISSES:
+            return True
+        # More than one frame behind (e.g. after a restart)
+        return time.time() - self.last > 2 * self.interval + self.publish_delay
+
+    def Observe(self, timestamps: list, seen_at: float = None):
+        """Record a poll that rendered new frames (oldest first) at seen_at (default now)"""
+        seen_at = seen_at or time.time()
+        frame_time = TimestampSeconds(timestamps[-1])
+        lag = seen_at - frame_time  # Freshness of the buffer's newest frame
+        with self._lock:
+            # Only the predicted frame says anything about the publish delay
+            if self.last is not None and abs(frame_time - (self.last + self.interval)) < 60:
+                if self.misses:
+                    self.publish_delay = 0.7 * self.publish_delay + 0.3 * lag
+                else:
+                    # Found on the first poll, so it may have been there sooner
+                    self.publish_delay = max(0.0, self.publish_delay - CADENCE_BACKOFF_SECONDS / 2)
+            self.last = max(self.last or 0, frame_time)
+            self.last_poll = seen_at
+            self.misses = 0
+            self.polls += 1
+            self.hits += 1
+            self.frames += len(timestamps)
+            self.lags.append(lag)
+
+    def Missed(self):
+        """Record a poll that found no new frame"""
+        with self._lock:
+            self.last_poll = time.time()
+            self.misses += 1
+            self.polls += 1
+
+    def Stats(self) -> dict:
+        with self._lock:
+            last_lag = self.lags[-1] if self.lags else None
+            lags = sorted(self.lags)
+            stats = {
+                'radar_id': self.radar_id,
+                'interval_s': self.interval,
+                'publish_delay_s': round(self.publish_delay, 1),
+                'polls': self.polls,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.polls, 3) if self.polls else None,
+                'frames': self.frames,
+                'consecutive_misses': self.misses,
+                'newest': SecondsTimestamp(self.last) if self.last is not None else None,
+            }
+        stats['expected'] = self.Expected()
+        stats['next_poll'] = round(self.NextPoll())
+        if lags:
+            stats['lag_s'] = {
+                'last': round(last_lag, 1),
+                'mean': round(statistics.fmean(lags), 1),
+                'p50': round(_Percentile(lags, 0.5), 1),
+                'p95': round(_Percentile(lags, 0.95), 1),
+                'max': round(lags[-1], 1),
+            }
+        return stats
+
+
+class CadenceRegistry:
+    """Cadence predictors for every station a process polls, with shared stats.
+
+    Predictors are keyed by frame buffer (the station id, or another key for
+    buffers such as the default station's), and their stats are written to
+    freshness.json in the images directory for inspection.
+    """
+
+    def __init__(self, directory: str = FRAME_DIR):
+        self.path = os.path.join(directory, FRESHNESS_FILE)
+        self._predictors = {}
+        self._lock = threading.Lock()
+
+    def For(self, radar_id: str, key: str = None) -> CadencePredictor:
+        with self._lock:
+            predictor = self._predictors.get(key or radar_id)
+            if predictor is None:
+                predictor = self._predictors[key or radar_id] = CadencePredictor(radar_id)
+            return predictor
+
+    def Stats(self) -> dict:
+        with self._lock:
+            predictors = dict(self._predictors)
+        return {key: predictor.Stats() for key, predictor in predictors.items()}
+
+    def WriteStats(self):
+        tmp_path = f'{self.path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': time.time(), 'stations': self.Stats()}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Could not write freshness stats {self.path}: {e}')
+
+
+# Predictors for the stations polled by this process
+CADENCES = CadenceRegistry()
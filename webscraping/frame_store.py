@@ -0,0 +1,227 @@
+"""Ring-buffer store of rendered radar frames with a small JSON manifest"""
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+import threading
+import time
+
+# Shared by the scraper and the API server, so both resolve it the same way (relative to the working directory)
+FRAME_DIR = os.path.abspath(os.environ.get('IMAGES_DIR', 'images'))
+# Where each station's composite background is written by the scraper and read by the API server
+BACKGROUNDS_DIR = os.path.abspath(os.environ.get('BACKGROUNDS_DIR', '.'))
+# Transparency layers the scraper downloads; kept apart from the repository's radar_transparencies
+# so the station cache only ever evicts files it can download again
+LAYERS_DIR = os.path.abspath(os.environ.get('LAYERS_DIR', os.path.join(BACKGROUNDS_DIR, 'downloaded_transparencies')))
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+@contextmanager
+def _StoreLock(manifest_path: str):
+    """Exclusive access to one store across threads and processes.
+
+    The scraper and the API server can both write a station's buffer, so a
+    thread lock alone is not enough: the lock is also held as an flock on a
+    .lock file beside the manifest.
+    """
+    with _locks_lock:
+        lock = _locks.setdefault(manifest_path, threading.Lock())
+    with lock:
+        with open(manifest_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def BackgroundPath(radar_id: str = None) -> str:
+    """Composite background of a station (composite_background.png for the default station)"""
+    suffix = f'_{radar_id}' if radar_id else ''
+    return os.path.join(BACKGROUNDS_DIR, f'composite_background{suffix}.png')
+
+
+class FrameStore:
+    """Fixed-size ring of the most recent frames for one station.
+
+    Frames are written once to a physical slot file and never moved. The
+    manifest records the slot holding the newest frame (head), how many
+    frames are buffered and the BOM timestamp held in each slot, so adding a
+    frame costs one PNG write plus a tiny manifest update. Logical index 0 is
+    the oldest frame and count-1 the newest, matching /images/<id>-<n>.png.
+
+    One spare slot is kept so the slot being written is never one that the
+    current manifest points at.
+    """
+
+    def __init__(self, name: str = None, count: int = 7, directory: str = FRAME_DIR):
+        self.name = name
+        self.count = count
+        self.directory = directory
+        self.slots = count + 1
+
+        prefix = f'{name}.' if name else ''
+        self._slot_pattern = os.path.join(directory, prefix + 'slot{k}.png')
+        self.manifest_path = os.path.join(directory, prefix + 'manifest.json')
+
+        self._cached = None
+        self._cached_stat = None
+
+    def _Empty(self) -> dict:
+        return {'count': self.count, 'head': -1, 'length': 0,
+                'timestamps': [None] * self.slots, 'updated': None}
+
+    def Manifest(self) -> dict:
+        """Current manifest, re-read only when the file has changed"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return self._Empty()
+
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)  # Every rewrite is an os.replace, so a new inode
+        if self._cached_stat != key:
+            try:
+                with open(self.manifest_path) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f'Ignoring unreadable manifest {self.manifest_path}: {e}')
+                return self._Empty()
+            if len(manifest.get('timestamps', [])) != self.slots:
+                return self._Empty()  # Written for a different buffer size
+            self._cached, self._cached_stat = manifest, key
+        return self._cached
+
+    def _LockedManifest(self) -> dict:
+        """Manifest re-read under the store lock, skipping the stat cache.
+
+        Another process may have rewritten it within the filesystem's
+        timestamp resolution.
+        """
+        self._cached_stat = None
+        return self.Manifest()
+
+    def _WriteManifest(self, manifest: dict):
+        manifest['updated'] = time.time()
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)  # Readers never see a partial manifest
+
+    @staticmethod
+    def _Save(image, path: str, **save_kwargs):
+        """Write a slot file through a tmp file, so a reader still holding the previous manifest never sees it torn"""
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        image.save(tmp_path, 'PNG', **save_kwargs)
+        os.replace(tmp_path, path)
+
+    def SlotPath(self, slot: int) -> str:
+        return self._slot_pattern.format(k=slot)
+
+    @staticmethod
+    def OverlayPath(frame_path: str) -> str:
+        """Radar-only overlay stored beside a frame's slot file (see Push)"""
+        return frame_path[:-len('.png')] + '.overlay.png'
+
+    def _Slot(self, manifest: dict, index: int) -> int:
+        return (manifest['head'] - (manifest['length'] - 1 - index)) % self.slots
+
+    def Length(self) -> int:
+        return self.Manifest()['length']
+
+    def IsFull(self) -> bool:
+        return self.Length() >= self.count
+
+    def Path(self, index: int) -> str:
+        """Physical file for logical frame index (0 = oldest), None if not buffered"""
+        manifest = self.Manifest()
+        if not 0 <= index < manifest['length']:
+            return None
+        return self.SlotPath(self._Slot(manifest, index))
+
+    def Paths(self) -> list:
+        """Physical files of all buffered frames, oldest first"""
+        return [self.Path(i) for i in range(self.Length())]
+
+    def Timestamps(self) -> list:
+        """BOM timestamps of all buffered frames, oldest first"""
+        manifest = self.Manifest()
+        return [manifest['timestamps'][self._Slot(manifest, i)] for i in range(manifest['length'])]
+
+    def Frame(self, index: int) -> tuple:
+        """(physical file, BOM timestamp) of logical frame index from one manifest read, (None, None) if not buffered"""
+        manifest = self.Manifest()
+        if not 0 <= index < manifest['length']:
+            return None, None
+        slot = self._Slot(manifest, index)
+        return self.SlotPath(slot), manifest['timestamps'][slot]
+
+    def Recover(self) -> list:
+        """Validate a persisted manifest against its slot files, returning the usable timestamps (oldest first).
+
+        Used on startup to keep the frames a previous run rendered. Only the
+        newest run of frames that still have a timestamp and a slot file is
+        kept; the manifest is rewritten without the rest.
+        """
+        with _StoreLock(self.manifest_path):
+            manifest = self._LockedManifest()
+            kept = 0
+            for index in reversed(range(manifest['length'])):
+                slot = self._Slot(manifest, index)
+                if not manifest['timestamps'][slot] or not os.path.exists(self.SlotPath(slot)):
+                    break
+                kept += 1
+            if kept < manifest['length']:
+                print(f'Dropping {manifest["length"] - kept} unusable frames from {self.manifest_path}')
+                manifest = dict(manifest, length=kept)
+                if not kept:
+                    manifest.update(head=-1, timestamps=[None] * self.slots)
+                self._WriteManifest(manifest)
+        return self.Timestamps()
+
+    def Reset(self):
+        """Empty the buffer so it can be rebuilt from scratch (slot files are overwritten as frames arrive)"""
+        with _StoreLock(self.manifest_path):
+            self._WriteManifest(self._Empty())
+
+    def PathFor(self, timestamp: str) -> str:
+        """Physical file of the buffered frame with this BOM timestamp, None if not buffered"""
+        manifest = self.Manifest()
+        for index in range(manifest['length']):
+            slot = self._Slot(manifest, index)
+            if manifest['timestamps'][slot] == timestamp:
+                return self.SlotPath(slot)
+        return None
+
+    def Push(self, image, timestamp: str = None, overlay=None, **save_kwargs) -> str:
+        """Write a new newest frame into the next slot, dropping the oldest.
+
+        overlay, if given, is the frame's radar-only layer; it is written to
+        the slot's overlay file, and a stale overlay from the slot's previous
+        frame is removed otherwise. Returns the frame's file, or None if it was
+        not stored because it is no newer than the current newest (already
+        pushed by another writer, or older than the buffer).
+        """
+        with _StoreLock(self.manifest_path):
+            manifest = dict(self._LockedManifest())
+            manifest['timestamps'] = list(manifest['timestamps'])
+            if manifest['length'] and timestamp:
+                newest = manifest['timestamps'][manifest['head']]
+                if newest and timestamp <= newest:
+                    return None
+
+            slot = (manifest['head'] + 1) % self.slots
+            path = self.SlotPath(slot)
+            self._Save(image, path, **save_kwargs)
+            overlay_path = self.OverlayPath(path)
+            if overlay is not None:
+                self._Save(overlay, overlay_path, **save_kwargs)
+            elif os.path.exists(overlay_path):
+                os.remove(overlay_path)
+
+            manifest['head'] = slot
+            manifest['length'] = min(manifest['length'] + 1, self.count)
+            manifest['timestamps'][slot] = timestamp
+            self._WriteManifest(manifest)
+            return path
@@ -0,0 +1,199 @@
+"""Persistent, bounded pool of FTP sessions shared by all BOM access"""
+import ftplib
+from ftplib import FTP, all_errors
+from contextlib import contextmanager
+from metrics import METRICS
+import os
+import threading
+import time
+
+# BOM FTP server and pool limits (override via environment)
+FTP_HOST = os.environ.get('BOM_FTP_HOST', 'ftp.bom.gov.au')
+FTP_PORT = int(os.environ.get('BOM_FTP_PORT', '21'))
+FTP_MAX_SESSIONS = int(os.environ.get('FTP_MAX_SESSIONS', '3'))
+FTP_KEEPALIVE_SECONDS = float(os.environ.get('FTP_KEEPALIVE_SECONDS', '30'))
+FTP_MAX_IDLE_SECONDS = float(os.environ.get('FTP_MAX_IDLE_SECONDS', '300'))
+FTP_TIMEOUT_SECONDS = float(os.environ.get('FTP_TIMEOUT_SECONDS', '30'))
+
+RADAR_DIR = '/anon/gen/radar'
+
+# Errors that leave a session in an unknown state (a 550 doesn't)
+_BROKEN_ERRORS = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply, ftplib.error_proto)
+
+
+class FTPPool:
+    """Pool of logged-in FTP sessions with keep-alive and transparent reconnect.
+
+    At most max_sessions connections exist at once; callers block until one
+    is free. Idle sessions are kept alive with NOOPs and closed once they have
+    been unused for max_idle seconds. Every session starts in RADAR_DIR and
+    callers that cwd elsewhere are expected to cwd back before returning it.
+    """
+
+    def __init__(self, host: str = FTP_HOST, port: int = FTP_PORT,
+                 max_sessions: int = FTP_MAX_SESSIONS,
+                 keepalive: float = FTP_KEEPALIVE_SECONDS,
+                 max_idle: float = FTP_MAX_IDLE_SECONDS,
+                 timeout: float = FTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.keepalive = keepalive
+        self.max_idle = max_idle
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._lock = threading.Lock()
+        self._idle = []  # [(ftp, last_used)] most recently used last
+        self._local = threading.local()
+        self._keepalive_thread = None
+
+        self.connects = 0
+        self.reconnects = 0
+
+    def _Connect(self) -> FTP:
+        ftp = FTP(timeout=self.timeout)
+        try:
+            with METRICS.Time('ftp_connect'):
+                ftp.connect(self.host, self.port)
+                ftp.login()
+                ftp.cwd(RADAR_DIR)
+        except BaseException:
+            _CloseQuietly(ftp)
+            raise
+        self.connects += 1
+        print(f'Opened FTP session to {self.host} ({self.connects} total)')
+        return ftp
+
+    def _StartKeepAlive(self):
+        if self._keepalive_thread is None:
+            self._keepalive_thread = threading.Thread(target=self._KeepAliveLoop, daemon=True)
+            self._keepalive_thread.start()
+
+    def _KeepAliveLoop(self):
+        """NOOP idle sessions so BOM doesn't drop them, close ones idle too long.
+
+        Sessions are checked one at a time, each holding a slot like any
+        borrower, so a session being checked still counts against
+        max_sessions and Acquire never opens one in its place.
+        """
+        while True:
+            time.sleep(self.keepalive)
+            checked = 0  # Sessions before this index were checked and left in place
+            while self._slots.acquire(blocking=False):
+                try:
+                    with self._lock:
+                        if checked >= len(self._idle):
+                            break
+                        ftp, last_used = self._idle.pop(checked)
+
+                    now = time.monotonic()
+                    if now - last_used > self.max_idle:
+                        _CloseQuietly(ftp)
+                    elif now - last_used >= self.keepalive and not _IsAlive(ftp):
+                        _CloseQuietly(ftp)
+                    else:
+                        with self._lock:
+                            self._idle.insert(checked, (ftp, last_used))
+                        checked += 1
+                finally:
+                    self._slots.release()
+
+    def Acquire(self, blocking: bool = True) -> FTP:
+        """Borrow a live session, reconnecting if the pooled one went stale.
+
+        With blocking=False, returns None instead of waiting when every
+        session is in use.
+        """
+        if not self._slots.acquire(blocking):
+            return None
+        try:
+            self._StartKeepAlive()
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    ftp, last_used = self._idle.pop()
+
+                # Fresh sessions are trusted, older ones get a NOOP first
+                if time.monotonic() - last_used < self.keepalive or _IsAlive(ftp):
+                    return ftp
+                _CloseQuietly(ftp)
+                self.reconnects += 1
+                print('Pooled FTP session went stale, reconnecting')
+
+            return self._Connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def MarkIfBroken(self, ftp: FTP, error: Exception):
+        """Flag a session for disposal if error left it in an unknown state"""
+        if isinstance(error, _BROKEN_ERRORS):
+            ftp.pool_broken = True
+
+    def Release(self, ftp: FTP, broken: bool = False):
+        """Return a session to the pool, dropping it if it is broken"""
+        if broken or getattr(ftp, 'pool_broken', False):
+            _CloseQuietly(ftp)
+        else:
+            with self._lock:
+                self._idle.append((ftp, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def Connection(self, ftp_conn: FTP = None):
+        """Borrow a session for the duration of a with-block.
+
+        If ftp_conn is given it is used as-is. Nested borrows on the same
+        thread reuse the session already held, so helpers can borrow freely
+        without deadlocking a pool of one.
+        """
+        if ftp_conn is not None:
+            yield ftp_conn
+            return
+
+        held = getattr(self._local, 'held', None)
+        if held is not None:
+            yield held
+            return
+
+        ftp = self.Acquire()
+        self._local.held = ftp
+        broken = False
+        try:
+            yield ftp
+        except _BROKEN_ERRORS:
+            broken = True
+            raise
+        finally:
+            self._local.held = None
+            self.Release(ftp, broken)
+
+    def CloseAll(self):
+        """Close every idle session (in-use sessions close when released broken)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ftp, _ in idle:
+            _CloseQuietly(ftp)
+
+
+def _IsAlive(ftp: FTP) -> bool:
+    try:
+        ftp.voidcmd('NOOP')
+        return True
+    except (*all_errors, AttributeError):  # AttributeError: socket already closed
+        return False
+
+
+def _CloseQuietly(ftp: FTP):
+    try:
+        ftp.quit()
+    except all_errors:
+        ftp.close()
+    except Exception:
+        pass
+
+
+# Shared pool used by ftpscraper and anything generating images
+FTP_POOL = FTPPool()
@@ -1,365 +1,565 @@
-from ftplib import FTP
-from datetime import datetime, timedelta
-import time
+"""BOM radar pipeline: list, download, render and store a station's frames.
+
+Importing this module only defines functions (sessions, backgrounds and
+render workers are created on first use); scraper.py is the process that
+runs it on a schedule.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from PIL import Image
 import os
 import numpy as np
-import subprocess
+import threading
 from pathlib import Path
+from ftp_pool import FTP_MAX_SESSIONS, FTP_POOL
+from radar_listing import RADAR_LISTING, FrameTimestamp, RadarFilename
+from frame_store import FRAME_DIR, LAYERS_DIR, BackgroundPath, FrameStore
+from png_encoder import FRAME_ENCODER
+from bundles import FrameBundle, RenderSprite
+from compositor import CompositeFrames, FlattenLayers, LoadBackgroundArray
+from cadence import CADENCES
+from metrics import METRICS
+from mosaic import AlignFrames, GetMosaicMap
+from radar_stations import MosaicId, MosaicPrimary
+from render_pool import RENDER_POOL, RenderRadarFrames
+from resampling import TARGET_SIZE, CropAndResizeStack
+
+# Also store a radar-only overlay beside each frame for layered delivery ('1' to enable)
+LAYERED_FRAMES = os.environ.get('LAYERED_FRAMES', '0') != '0'
+# FTP sessions one generation downloads its frames over: the caller's plus spare pooled ones
+DOWNLOAD_CONNECTIONS = int(os.environ.get('DOWNLOAD_CONNECTIONS', '3'))
+# Transparency layers checked into the repository, used in place of downloading them
+BUNDLED_TRANSPARENCIES_DIR = 'radar_transparencies'
+# Sprite sheet of the default station's buffer
+SPRITE_PATH = os.path.join(FRAME_DIR, 'radar.png')
+
+# Threads driving the extra download sessions (never more than the pool can hand out)
+_downloaders = ThreadPoolExecutor(max_workers=max(1, FTP_MAX_SESSIONS), thread_name_prefix='download')
+
+def _RetrieveBinary(fn: str, callback, ftp_conn=None):
+    """RETR a file using the provided FTP connection or one borrowed from the pool"""
+    with FTP_POOL.Connection(ftp_conn) as ftp_to_use:
+        try:
+            with METRICS.Time('download'):
+                ftp_to_use.retrbinary(f'RETR {fn}', callback)
+        except Exception as e:
+            FTP_POOL.MarkIfBroken(ftp_to_use, e)
+            raise
 
 def DownloadFile(fn: str, local_path: str = None, ftp_conn=None) -> bool:
     """Download a file from FTP server"""
+    save_path = local_path if local_path else fn
+    tmp_path = f'{save_path}.{os.getpid()}.{threading.get_ident()}.tmp'  # Another process may be reading it
     try:
-        save_path = local_path if local_path else fn
-        # Use provided FTP connection or fall back to global
-        ftp_to_use = ftp_conn if ftp_conn is not None else ftp
-        with open(save_path, 'wb') as fp:
-            ftp_to_use.retrbinary(f'RETR {fn}', fp.write)
-            print(f'Downloaded {fn} -> {save_path}')
-            return True
+        with open(tmp_path, 'wb') as fp:
+            _RetrieveBinary(fn, fp.write, ftp_conn)
+        os.replace(tmp_path, save_path)
+        print(f'Downloaded {fn} -> {save_path}')
+        return True
     except Exception as e:
         print(f'File "{fn}" does not exist or failed to download: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return False
 
-def DownloadTransparencies(radar_id: str, transparency_dir: str = 'radar_transparencies', ftp_conn=None):
-    """Download background transparency layers for a radar station"""
-    Path(transparency_dir).mkdir(exist_ok=True)
+def DownloadBytes(fn: str, ftp_conn=None) -> bytes:
+    """Download a file from FTP server into memory, None if it failed"""
+    try:
+        buffer = BytesIO()
+        _RetrieveBinary(fn, buffer.write, ftp_conn)
+        print(f'Downloaded {fn} ({buffer.tell()} bytes)')
+        return buffer.getvalue()
+    except Exception as e:
+        print(f'File "{fn}" does not exist or failed to download: {e}')
+        return None
+
+def DownloadTransparencies(radar_id: str, transparency_dir: str = LAYERS_DIR, ftp_conn=None,
+                           bundled_dir: str = BUNDLED_TRANSPARENCIES_DIR):
+    """Download background transparency layers for a radar station.
+
+    Layers shipped in bundled_dir are used in place and never written;
+    missing ones are downloaded to transparency_dir, which the station cache
+    may evict.
+    """
+    Path(transparency_dir).mkdir(parents=True, exist_ok=True)
 
     layers = ['background', 'topography', 'roads']
     downloaded = {}
 
-    # Use provided FTP connection or fall back to global
-    ftp_to_use = ftp_conn if ftp_conn is not None else ftp
-
     print(f'Downloading transparency layers for {radar_id}...')
-    ftp_to_use.cwd('/anon/gen/radar_transparencies')
 
+    # Only connect if a layer is missing (transparencies don't change often)
+    paths = {}
     for layer in layers:
-        filename = f'{radar_id}.{layer}.png'
-        local_path = os.path.join(transparency_dir, filename)
-
-        # Only download if doesn't exist (transparencies don't change often)
-        if not os.path.exists(local_path):
-            if DownloadFile(filename, local_path, ftp_to_use):
-                downloaded[layer] = local_path
-            else:
-                print(f'Warning: Could not download {layer} layer')
-        else:
-            print(f'Using cached {filename}')
-            downloaded[layer] = local_path
-
-    ftp_to_use.cwd('/anon/gen/radar')  # Return to radar directory
+        bundled = os.path.join(bundled_dir, f'{radar_id}.{layer}.png')
+        paths[layer] = bundled if os.path.exists(bundled) else os.path.join(transparency_dir, f'{radar_id}.{layer}.png')
+    missing = [layer for layer in layers if not os.path.exists(paths[layer])]
+    METRICS.Count('transparencies', not missing)
+    if not missing:
+        for layer in layers:
+            print(f'Using cached {radar_id}.{layer}.png')
+            downloaded[layer] = paths[layer]
+        return downloaded
+
+    # Use provided FTP connection or borrow one from the pool
+    with FTP_POOL.Connection(ftp_conn) as ftp_to_use:
+        ftp_to_use.cwd('/anon/gen/radar_transparencies')
+        try:
+            for layer in layers:
+                filename = f'{radar_id}.{layer}.png'
+                local_path = paths[layer]
+
+                if layer in missing:
+                    if DownloadFile(filename, local_path, ftp_to_use):
+                        downloaded[layer] = local_path
+                    else:
+                        print(f'Warning: Could not download {layer} layer')
+                else:
+                    print(f'Using cached {filename}')
+                    downloaded[layer] = local_path
+        finally:
+            ftp_to_use.cwd('/anon/gen/radar')  # Return to radar directory
     return downloaded
 
-def CropAndResize(fn: str, path = ''):
+def CropAndResizeImage(img: Image.Image) -> Image.Image:
     """Crop and resize an image to 240x240 for watch display"""
-    img = Image.open(path+fn)
-    border = 70 + 16
-    down = 70
-    img = img.crop((border, border+down, img.width - border, img.height - border+down))
-    img = img.resize((240,240),Image.Resampling.LANCZOS)
-    img.save(fn)
-
-def CreateCompositeBackground(transparency_layers: dict, output_path: str = 'composite_background.png') -> str:
+    return Image.fromarray(CropAndResizeStack([img])[0])
+
+def CropAndResize(fn: str, path = ''):
+    """Crop and resize an image file to 240x240 for watch display"""
+    CropAndResizeImage(Image.open(path+fn)).save(fn)
+
+def CreateCompositeBackground(transparency_layers: dict, output_path: str = BackgroundPath()) -> str:
     """Composite background, topography, and roads into a single background image"""
     print('Creating composite background...')
 
     # Start with background layer
     if 'background' not in transparency_layers:
         print('Warning: No background layer, using blank background')
-        composite = Image.new('RGBA', (240, 240), (0, 0, 0, 255))
+        layers = [np.zeros((*TARGET_SIZE[::-1], 4), np.uint8)]
+        layers[0][..., 3] = 255
     else:
-        composite = Image.open(transparency_layers['background']).convert('RGBA')
-        # Crop and resize background
-        border = 70 + 16
-        down = 70
-        composite = composite.crop((border, border+down, composite.width - border, composite.height - border+down))
-        composite = composite.resize((240, 240), Image.Resampling.LANCZOS)
-
-    # Overlay topography
-    if 'topography' in transparency_layers:
-        topo = Image.open(transparency_layers['topography']).convert('RGBA')
-        topo = topo.crop((border, border+down, topo.width - border, topo.height - border+down))
-        topo = topo.resize((240, 240), Image.Resampling.LANCZOS)
-        composite = Image.alpha_composite(composite, topo)
-
-    # Overlay roads
-    if 'roads' in transparency_layers:
-        roads = Image.open(transparency_layers['roads']).convert('RGBA')
-        roads = roads.crop((border, border+down, roads.width - border, roads.height - border+down))
-        roads = roads.resize((240, 240), Image.Resampling.LANCZOS)
-        composite = Image.alpha_composite(composite, roads)
-
-    composite.save(output_path, 'PNG')
+        layers = []
+
+    # Crop and resize background, topography and roads (bottom to top) as one stack
+    sources = []
+    for name in ('background', 'topography', 'roads'):
+        if name in transparency_layers:
+            with Image.open(transparency_layers[name]) as layer:
+                sources.append(layer.convert('RGBA'))
+    if sources:
+        with METRICS.Time('crop_resize'):
+            layers.extend(CropAndResizeStack(sources))
+
+    # Overlay all layers in one vectorized pass
+    with METRICS.Time('composite'):
+        composite = Image.fromarray(FlattenLayers(layers))
+    tmp_path = f'{output_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    composite.save(tmp_path, 'PNG')
+    os.replace(tmp_path, output_path)  # The API server serves it while the scraper may be rewriting it
     print(f'Saved composite background to {output_path}')
     return output_path
 
-def CompositeRadarOnBackground(radar_image_path: str, background_path: str, output_path: str):
-    """Overlay radar data on top of the composite background"""
-    background = Image.open(background_path).convert('RGBA')
-    radar = Image.open(radar_image_path).convert('RGBA')
+def _DecodeRadar(data: bytes) -> Image.Image:
+    img = Image.open(BytesIO(data))
+    img.load()
+    return img
+
+def DownloadRadar(fn: str, ftp_conn=None) -> Image.Image:
+    """Download and decode a radar frame in memory, None if it failed"""
+    data = DownloadBytes(fn, ftp_conn)
+    return _DecodeRadar(data) if data is not None else None
+
+def _DownloadQueue(pending: deque, lock: threading.Lock, results: dict, ftp_conn, on_download=None):
+    """Download filenames from a shared queue over one session until it is empty or the session breaks"""
+    while not getattr(ftp_conn, 'pool_broken', False):
+        with lock:
+            if not pending:
+                return
+            fn = pending.popleft()
+        results[fn] = DownloadBytes(fn, ftp_conn)
+        if on_download is not None and results[fn] is not None:
+            on_download(fn, results[fn])
+
+def _DownloadOnSpare(ftp, pending: deque, lock: threading.Lock, results: dict, on_download=None):
+    try:
+        _DownloadQueue(pending, lock, results, ftp, on_download)
+    finally:
+        FTP_POOL.Release(ftp)
+
+def DownloadFrames(filenames: list, ftp_conn=None, on_download=None) -> list:
+    """Download several files concurrently, returning [(filename, bytes or None)] in input order.
+
+    The calling thread downloads over its own session (ftp_conn, or one
+    borrowed from the pool) while up to DOWNLOAD_CONNECTIONS - 1 sessions
+    that are free right now work through the same queue on download threads.
+    Spare sessions are never waited for, so a busy pool just means fewer
+    parallel streams. on_download(filename, data), if given, is called from
+    the downloading thread as each file arrives.
+    """
+    pending, lock, results = deque(filenames), threading.Lock(), {}
+    helpers = []
+    for _ in range(min(DOWNLOAD_CONNECTIONS, len(filenames)) - 1):
+        try:
+            ftp = FTP_POOL.Acquire(blocking=False)
+        except Exception as e:
+            print(f'Could not open an extra FTP session: {e}')
+            break
+        if ftp is None:
+            break
+        helpers.append(_downloaders.submit(_DownloadOnSpare, ftp, pending, lock, results, on_download))
+
+    with FTP_POOL.Connection(ftp_conn) as ftp_to_use:
+        _DownloadQueue(pending, lock, results, ftp_to_use, on_download)
+    for helper in helpers:
+        helper.result()
+
+    # Anything left behind by a broken session is retried once on the caller's
+    for fn in pending:
+        results[fn] = DownloadBytes(fn, ftp_conn)
+    return [(fn, results.get(fn)) for fn in filenames]
+
+def ProcessFrames(filenames: list, background: np.ndarray = None, ftp_conn=None, overlays: bool = LAYERED_FRAMES) -> list:
+    """Download and render a set of radar frames entirely in memory.
+
+    Frames are fetched concurrently over several FTP sessions (see
+    DownloadFrames). With RENDER_PROCESSES, each frame is handed to a render
+    process as soon as it arrives, so a set costs about its slowest download
+    plus one render, and frames come back already palette-quantized.
+    Otherwise the whole set is cropped/resized and composited in vectorized
+    batches on this thread. Nothing touches disk and the caller encodes each
+    result once. Returns [(filename, image, overlay)] for the frames that
+    downloaded, in input order; overlay is the radar-only layer, or None.
+    """
+    futures = {}
+    on_download = None
+    if RENDER_POOL.enabled and len(filenames) > 1:
+        def on_download(fn, data):
+            futures[fn] = RENDER_POOL.Submit(data, background, overlays)
+
+    downloaded = []
+    for fn, data in DownloadFrames(filenames, ftp_conn, on_download):
+        if data is None:
+            print(f'Failed to download {fn}')
+        else:
+            downloaded.append((fn, data))
+
+    if futures:
+        rendered = []
+        for fn, data in downloaded:
+            try:
+                frame, overlay = RENDER_POOL.Result(futures[fn])
+            except Exception as e:
+                print(f'Render process failed for {fn} ({e}), rendering here')
+                frames, layers = RenderRadarFrames([_DecodeRadar(data)], background, overlays)
+                frame = Image.fromarray(frames[0])
+                overlay = Image.fromarray(layers[0]) if layers is not None else None
+            rendered.append((fn, frame, overlay))
+        return rendered
+
+    if not downloaded:
+        return []
+    frames, layers = RenderRadarFrames([_DecodeRadar(data) for _, data in downloaded], background, overlays)
+    if layers is None:
+        return [(fn, Image.fromarray(frame), None) for (fn, _), frame in zip(downloaded, frames)]
+    return [(fn, Image.fromarray(frame), Image.fromarray(layer))
+            for (fn, _), frame, layer in zip(downloaded, frames, layers)]
 
-    # Composite radar on top of background
-    final = Image.alpha_composite(background, radar)
-    final.save(output_path, 'PNG')
-    return output_path
+def ProcessFrame(fn: str, background: np.ndarray = None, ftp_conn=None) -> Image.Image:
+    """Download and render a single radar frame in memory, None if it failed"""
+    processed = ProcessFrames([fn], background, ftp_conn, overlays=False)
+    return processed[0][1] if processed else None
 
 def GetRecentRadarFiles(radar_id: str, count: int = 7, ftp_conn=None) -> list:
     """Find the most recent radar files on FTP server"""
     print(f'Scanning for recent {radar_id} radar files...')
 
-    try:
-        # Use provided FTP connection or fall back to global
-        ftp_to_use = ftp_conn if ftp_conn is not None else ftp
-
-        # List all files in radar directory
-        files = []
-        ftp_to_use.retrlines('NLST', files.append)
-
-        # Filter for our radar ID and sort by timestamp (filename contains timestamp)
-        radar_files = [f for f in files if f.startswith(f'{radar_id}.T.') and f.endswith('.png')]
-        radar_files.sort(reverse=True)  # Most recent first
-
-        # Get the requested number of most recent files
-        recent_files = radar_files[:count]
-        print(f'Found {len(recent_files)} recent files')
-
-        return recent_files
-    except Exception as e:
-        print(f'Error listing radar files: {e}')
-        return []
+    # Served from the shared listing index, which re-lists the directory
+    # only once its TTL has expired
+    recent_files = RADAR_LISTING.Latest(radar_id, count, ftp_conn)
+    print(f'Found {len(recent_files)} recent files')
+    return recent_files
+
+def FramesToFetch(store: FrameStore, recent_files: list) -> list:
+    """The latest files (as listed, newest first) a buffer still needs, oldest first.
+
+    Frames already rendered into the buffer are kept, so normally only files
+    newer than its newest valid frame are returned. All of them are returned
+    if the buffer is empty, or if it is missing older frames the server still
+    has: FrameStore.Push only appends frames newer than the newest, so such a
+    buffer is reset and rebuilt rather than refetched without filling it.
+    """
+    buffered = store.Recover()
+    wanted = list(reversed(recent_files))
+    newer = [fn for fn in wanted if buffered and FrameTimestamp(fn) > buffered[-1]]
+    if buffered and len(buffered) + len(newer) >= len(wanted):
+        print(f'Reusing {len(buffered)} buffered images, fetching {len(newer)} newer')
+        return newer
+    if buffered:
+        print(f'Rebuilding buffer of {len(buffered)} images, the server has {len(wanted)}')
+        store.Reset()
+    return wanted
 
 def InitializeImageBuffer(radar_id: str, num_images: int, composite_bg_path: str, use_radar_naming: bool = False):
-    """Download most recent radar images to populate buffer on startup"""
+    """Populate the buffer on startup, reusing the frames a previous run left in it.
+
+    The persisted manifest records the BOM timestamp in each slot, so after a
+    restart only frames newer than the newest valid buffered frame are
+    downloaded. The whole buffer is fetched again only if it is empty, or if
+    frames are missing from its older end while the server still has them.
+    """
     print(f'Initializing image buffer with {num_images} most recent images...')
+    store = FrameStore(radar_id if use_radar_naming else None, num_images)
+    buffered = store.Recover()
 
     # Get most recent radar files from FTP
     recent_files = GetRecentRadarFiles(radar_id, num_images)
 
     if not recent_files:
+        if buffered:
+            print(f'Warning: No radar files found on FTP server, serving {len(buffered)} buffered images')
+            return True
         print('Warning: No radar files found on FTP server')
         return False
 
-    # Download and process each file
+    # Download and process each missing file (composited with background if available)
+    background = LoadBackgroundArray(composite_bg_path)
     downloaded_count = 0
-    for filename in reversed(recent_files):  # Oldest to newest
-        if DownloadFile(filename):
-            # Crop and resize
-            CropAndResize(filename)
-
-            # Composite with background if available
-            if os.path.exists(composite_bg_path):
-                temp_output = 'temp_radar_composite.png'
-                CompositeRadarOnBackground(filename, composite_bg_path, temp_output)
-                os.remove(filename)
-                os.rename(temp_output, filename)
-
-            # Add to rolling buffer
-            UpdateImageNames(filename, num_images, radar_id if use_radar_naming else None)
+    for filename, frame, overlay in ProcessFrames(FramesToFetch(store, recent_files), background):
+        # Add to rolling buffer
+        if UpdateImageNames(frame, num_images, radar_id if use_radar_naming else None, FrameTimestamp(filename),
+                            overlay):
             downloaded_count += 1
-            os.remove(filename)
-        else:
-            print(f'Failed to download {filename}')
 
-    print(f'Initialized buffer with {downloaded_count} images')
+    print(f'Initialized buffer with {downloaded_count} new images ({store.Length()} buffered)')
 
     # Create composite grid (only for non-radar-specific naming)
-    if downloaded_count > 0 and not use_radar_naming:
+    if store.Length() and not use_radar_naming and (downloaded_count or not os.path.exists(SPRITE_PATH)):
         CombineImages(num_images, 3)
 
-    return downloaded_count > 0
+    return store.Length() > 0
 
 def GetOrCreateBackground(radar_id: str) -> str:
     """Get or create composite background for a specific radar station"""
-    composite_bg_path = f'composite_background_{radar_id}.png'
+    composite_bg_path = BackgroundPath(radar_id)
 
     # Return if already exists
-    if os.path.exists(composite_bg_path):
+    exists = os.path.exists(composite_bg_path)
+    METRICS.Count('background_files', exists)
+    if exists:
         print(f'Using cached background for {radar_id}')
         return composite_bg_path
 
     # Download transparency layers and create background
     print(f'Creating new background for {radar_id}...')
-    with FTP("ftp.bom.gov.au") as ftp_conn:
-        ftp_conn.login()
-        transparency_layers = DownloadTransparencies(radar_id, ftp_conn=ftp_conn)
-        if transparency_layers:
-            CreateCompositeBackground(transparency_layers, composite_bg_path)
-            return composite_bg_path
-        else:
-            print(f'Warning: Could not create background for {radar_id}')
-            return None
+    transparency_layers = DownloadTransparencies(radar_id)
+    if transparency_layers:
+        CreateCompositeBackground(transparency_layers, composite_bg_path)
+        return composite_bg_path
+    else:
+        print(f'Warning: Could not create background for {radar_id}')
+        return None
 
 def GenerateImagesForRadar(radar_id: str, num_images: int = 7) -> bool:
-    """Generate radar images for a specific station on-demand"""
+    """Generate radar images for a specific station on-demand.
+
+    Frames already rendered for the station are kept; only BOM frames newer
+    than the buffer's newest are downloaded and rendered, so a steady-state
+    refresh costs one frame.
+    """
     print(f'Generating {num_images} images for {radar_id}...')
 
     # Get or create background for this radar
     composite_bg_path = GetOrCreateBackground(radar_id)
-    if not composite_bg_path:
+    background = LoadBackgroundArray(composite_bg_path)
+    if background is None:
         print(f'Failed to get background for {radar_id}')
         return False
 
-    # Connect to FTP and generate images
+    # Borrow a pooled FTP session and generate images
     try:
-        with FTP("ftp.bom.gov.au") as ftp_conn:
-            ftp_conn.login()
-            ftp_conn.cwd("/anon/gen/radar")
-
+        with FTP_POOL.Connection() as ftp_conn:
             # Get most recent radar files
             recent_files = GetRecentRadarFiles(radar_id, num_images, ftp_conn)
             if not recent_files:
                 print(f'No radar files found for {radar_id}')
                 return False
 
-            # Download and process each file
+            # Download and process only the frames not already buffered, pushing
+            # oldest to newest so the served buffer stays valid while it changes
+            store = FrameStore(radar_id, num_images)
+            wanted = FramesToFetch(store, recent_files)
             downloaded_count = 0
-            for idx, filename in enumerate(reversed(recent_files)):  # Oldest to newest
-                if DownloadFile(filename, ftp_conn=ftp_conn):
-                    # Crop and resize
-                    CropAndResize(filename)
-
-                    # Composite with background - save directly to final location
-                    output_name = f'images/{radar_id}-{idx}.png'
-                    CompositeRadarOnBackground(filename, composite_bg_path, output_name)
-                    os.remove(filename)
-
-                    downloaded_count += 1
-                    print(f'Generated {output_name}')
-                else:
-                    print(f'Failed to download {filename}')
-
-            print(f'Generated {downloaded_count}/{num_images} images for {radar_id}')
-            return downloaded_count > 0
+            for filename, frame, overlay in ProcessFrames(wanted, background, ftp_conn):
+                # Single palette-quantized encode straight to the frame's buffer slot
+                with METRICS.Time('encode'):
+                    if overlay is not None:
+                        overlay = FRAME_ENCODER.Quantize(overlay)
+                    output_name = store.Push(FRAME_ENCODER.Quantize(frame), FrameTimestamp(filename), overlay,
+                                             **FRAME_ENCODER.save_kwargs)
+                if output_name is None:
+                    continue  # Another writer already pushed it or something newer
+
+                downloaded_count += 1
+                print(f'Generated {output_name}')
+
+            print(f'Generated {downloaded_count} new images for {radar_id} ({store.Length()}/{num_images} buffered)')
+            if downloaded_count:
+                FrameBundle(store).Get()  # Build the bundle once now rather than on its first request
+            return downloaded_count > 0 or not wanted  # Nothing wanted: the buffer is already current
 
     except Exception as e:
         print(f'Error generating images for {radar_id}: {e}')
         return False
 
-def UpdateImageNames(fn: str, num: int, radar_id: str = None):
-    """Update rolling buffer of images with optional radar-specific naming"""
-    new_img = Image.open(fn)
-    img_list = []
-
-    # Use radar-specific naming if provided
-    name_pattern = f'images/{radar_id}-{{i}}.png' if radar_id else 'images/{i}.png'
-
-    for i in range(num):
-        img_name = name_pattern.format(i=i)
-        if not os.path.isfile(img_name):
-            new_img.save(img_name)
-            return
-        img_list.append(Image.open(img_name))
-    # remove first element
-    img_list.pop(0)
-    # add new image
-    img_list.append(new_img)
-    # save in order
-    for i in range(num):
-        img_name = name_pattern.format(i=i)
-        img_list[i].save(img_name)
-
-def CombineImages(num: int, cols: int):
-
-    rows = int(np.ceil(num/cols))
-
-    fileFormat = 'images/{name}.png'
-    filenames = [fileFormat.format(name = x) for x in range(num)]
-    images = [Image.open(x).convert("RGBA") for x in filenames]
-    widths, heights = zip(*(i.size for i in images))
-
-    total_width = max(widths)*cols
-    total_height = max(heights)*rows
-
-    new_im = Image.new("RGBA", (total_width, total_height))
+def GenerateMosaicForRadar(radar_id: str, num_images: int = 7) -> bool:
+    """Generate a station's mosaic frames, filled in from the stations overlapping it (see mosaic.py).
 
-    x_offset = 0
-    y_offset = 0
-    for im in images:
+    Mosaic frames follow the station's own timestamps, each combining the
+    closest frame of every member station, and are buffered as the station
+    MosaicId(radar_id) on the station's background. Like
+    GenerateImagesForRadar only frames newer than the buffer's newest are
+    built.
+    """
+    print(f'Generating {num_images} mosaic images for {radar_id}...')
 
-        new_im.paste(im, ( x_offset, y_offset ))
-        x_offset += im.size[0]
-        if x_offset >= total_width:
-            x_offset = 0
-            y_offset += im.size[1]
-
-    new_im.save('images/radar.png', "PNG")
-
-
-# Configuration
-RADAR_ID = 'IDR711'  # Default radar station (can be changed based on GPS)
-SYDNEY_RADAR_ID = 'IDR711'  # Pre-generate Sydney for watch app
-image_count = 7
-composite_bg_path = 'composite_background.png'
+    composite_bg_path = GetOrCreateBackground(radar_id)
+    background = LoadBackgroundArray(composite_bg_path)
+    if background is None:
+        print(f'Failed to get background for {radar_id}')
+        return False
+    mosaic_map = GetMosaicMap(radar_id)
 
-# Ensure images directory exists
-Path('images').mkdir(exist_ok=True)
+    try:
+        with FTP_POOL.Connection() as ftp_conn:
+            recent_files = GetRecentRadarFiles(radar_id, num_images, ftp_conn)
+            if not recent_files:
+                print(f'No radar files found for {radar_id}')
+                return False
 
-# Initialize: Download transparency layers and create composite background
-print(f'Starting BetterWeather radar server for {RADAR_ID}...')
-print('='*50)
+            store = FrameStore(MosaicId(radar_id), num_images)
+            wanted = [FrameTimestamp(fn) for fn in FramesToFetch(store, recent_files)]
+            listings = {member: RADAR_LISTING.Timestamps(member, ftp_conn) for member in mosaic_map.members}
+            aligned = AlignFrames(listings, wanted)
+            filenames = sorted({RadarFilename(member, ts) for frame in aligned for member, ts in frame.items()})
+            downloaded = dict(DownloadFrames(filenames, ftp_conn))
+
+            generated = 0
+            for timestamp, frame in zip(wanted, aligned):
+                images = {member: _DecodeRadar(downloaded[RadarFilename(member, ts)])
+                          for member, ts in frame.items() if downloaded.get(RadarFilename(member, ts))}
+                if radar_id not in images:
+                    print(f'Failed to download {RadarFilename(radar_id, timestamp)}')
+                    continue
+                with METRICS.Time('mosaic'):
+                    layer = mosaic_map.Render(images)
+                with METRICS.Time('composite'):
+                    composited = CompositeFrames(background, layer[np.newaxis])[0]
+                with METRICS.Time('encode'):
+                    overlay = FRAME_ENCODER.Quantize(Image.fromarray(layer)) if LAYERED_FRAMES else None
+                    output_name = store.Push(FRAME_ENCODER.Quantize(Image.fromarray(composited)), timestamp, overlay,
+                                             **FRAME_ENCODER.save_kwargs)
+                if output_name is None:
+                    continue
+                generated += 1
+                print(f'Generated {output_name} from {", ".join(sorted(images))}')
+
+            print(f'Generated {generated} new mosaic images for {radar_id} ({store.Length()}/{num_images} buffered)')
+            if generated:
+                FrameBundle(store).Get()
+            return generated > 0 or not wanted
 
-with FTP("ftp.bom.gov.au") as ftp:
-    ftp.login()
+    except Exception as e:
+        print(f'Error generating mosaic for {radar_id}: {e}')
+        return False
 
-    # Download and create background
-    print('\n[1/3] Setting up background layers...')
-    transparency_layers = DownloadTransparencies(RADAR_ID)
-    if transparency_layers:
-        CreateCompositeBackground(transparency_layers, composite_bg_path)
+def GenerateStation(station_id: str, num_images: int = 7) -> bool:
+    """Generate a station's frames, or a mosaic's for a MosaicId"""
+    radar_id = MosaicPrimary(station_id)
+    if radar_id:
+        return GenerateMosaicForRadar(radar_id, num_images)
+    return GenerateImagesForRadar(station_id, num_images)
+
+def PollForNewFrames(radar_id: str, num_images: int, background: np.ndarray, store_name: str = None,
+                     key: str = None, ftp_conn=None) -> int:
+    """Fetch frames newer than a buffer's newest, guided by the station's cadence.
+
+    Normally a single RETR of the predicted next filename. The directory
+    listing is only read to (re)learn the cadence and catch up on missed
+    frames. Returns the number of new frames pushed to the buffer.
+    """
+    cadence = CADENCES.For(radar_id, key)
+    newest = [ts for ts in FrameStore(store_name, num_images).Timestamps() if ts]
+    cadence.Seed(newest[-1] if newest else None)
+
+    if cadence.NeedsResync():
+        timestamps = RADAR_LISTING.Timestamps(radar_id, ftp_conn)
+        cadence.Fit(timestamps)
+        wanted = [ts for ts in timestamps if cadence.IsNew(ts)][-num_images:]
     else:
-        print('Warning: No transparency layers downloaded, radar will have no background')
-
-    # Populate image buffer with most recent radar data
-    print('\n[2/3] Populating image buffer...')
-    ftp.cwd("/anon/gen/radar")
-    InitializeImageBuffer(RADAR_ID, image_count, composite_bg_path)
-
-# Pre-generate Sydney (IDR063) images for watch app
-print('\n[3/3] Pre-generating Sydney (IDR063) images for watch app...')
-sydney_images_exist = all(os.path.exists(f'images/{SYDNEY_RADAR_ID}-{i}.png') for i in range(7))
-if not sydney_images_exist:
-    success = GenerateImagesForRadar(SYDNEY_RADAR_ID, 7)
-    if success:
-        print(f'Successfully pre-generated {SYDNEY_RADAR_ID} images')
+        wanted = [cadence.Expected()]
+
+    rendered = ProcessFrames([RadarFilename(radar_id, ts) for ts in wanted], background, ftp_conn) if wanted else []
+    pushed = 0
+    for filename, frame, overlay in rendered:  # Oldest to newest
+        if UpdateImageNames(frame, num_images, store_name, FrameTimestamp(filename), overlay):
+            pushed += 1
+    if rendered:
+        cadence.Observe([FrameTimestamp(filename) for filename, _, _ in rendered])
+        if store_name:
+            FrameBundle(FrameStore(store_name, num_images)).Get()
     else:
-        print(f'Warning: Failed to pre-generate {SYDNEY_RADAR_ID} images')
-else:
-    print(f'{SYDNEY_RADAR_ID} images already exist, skipping generation')
-
-print('='*50)
-print('Initialization complete! Starting continuous updates...\n')
+        cadence.Missed()
 
-# Main loop: Download radar images and composite with background
-while True:
-    with FTP("ftp.bom.gov.au") as ftp:
-        # Create filename based on 6 mins ago (BOM updates every 6-10 minutes)
-        filename = (datetime.utcnow() - timedelta(minutes=6)).strftime(f'{RADAR_ID}.T.%Y%m%d%H%M.png')
-        ftp.login()
-        ftp.cwd("/anon/gen/radar")
+    CADENCES.WriteStats()
+    METRICS.WriteSnapshot()
+    return pushed
 
-        if DownloadFile(filename):
-            # Crop and resize radar image
-            CropAndResize(filename)
+def RefreshStation(radar_id: str, num_images: int = 7) -> bool:
+    """Scheduled refresh of an on-demand station or mosaic, tracking its cadence and freshness"""
+    cadence = CADENCES.For(radar_id)
+    store = FrameStore(radar_id, num_images)
+    before = store.Timestamps()
 
-            # Composite radar on background if background exists
-            if os.path.exists(composite_bg_path):
-                temp_output = 'temp_radar_composite.png'
-                CompositeRadarOnBackground(filename, composite_bg_path, temp_output)
-                os.remove(filename)
-                os.rename(temp_output, filename)
+    success = GenerateStation(radar_id, num_images)
 
-            # Update rolling buffer of images (no radar-specific naming for default station)
-            UpdateImageNames(filename, image_count, None)
-
-            # Create composite grid image
-            CombineImages(image_count, 3)
+    after = [ts for ts in store.Timestamps() if ts]
+    cadence.Fit(RADAR_LISTING.Timestamps(MosaicPrimary(radar_id) or radar_id))  # A mosaic follows its station
+    if after and after != before and cadence.IsNew(after[-1]):
+        cadence.Observe([ts for ts in after if cadence.IsNew(ts)])
+    else:
+        cadence.Missed()
+    CADENCES.WriteStats()
+    METRICS.WriteSnapshot()
+    return success
+
+def UpdateImageNames(new_img: Image.Image, num: int, radar_id: str = None, timestamp: str = None,
+                     overlay: Image.Image = None) -> str:
+    """Add the newest frame to the rolling buffer with optional radar-specific naming.
+
+    The buffer is a ring of slot files, so this writes exactly one image (plus
+    its radar-only overlay, if given) and the manifest rather than shifting
+    and re-saving every frame. Returns the frame's file, None if it wasn't
+    newer than the buffer's newest.
+    """
+    with METRICS.Time('encode'):
+        if overlay is not None:
+            overlay = FRAME_ENCODER.Quantize(overlay)
+        return FrameStore(radar_id, num).Push(FRAME_ENCODER.Quantize(new_img), timestamp, overlay,
+                                       **FRAME_ENCODER.save_kwargs)
 
-            os.remove(filename)
+def CombineImages(num: int, cols: int):
+    filenames = FrameStore(None, num).Paths()
+    if not filenames:
+        return
+    FRAME_ENCODER.Save(RenderSprite(filenames, cols), SPRITE_PATH)
 
-        subprocess.call('./updateDNS.sh', stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-    time.sleep(60)
+if __name__ == '__main__':
+    # Older deployments start the scraper as ftpscraper.py
+    from scraper import main
+    main()
 
 # path = '../radar_backgrounds_orginal/'
 # filelist=os.listdir(path)
@@ -0,0 +1,140 @@
+"""Single-flight station generation jobs on a bounded worker pool"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+# Stations generated concurrently (each holds one pooled FTP session)
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', '2'))
+# Generations allowed to wait for a worker before new stations are refused
+GENERATION_QUEUE_LIMIT = int(os.environ.get('GENERATION_QUEUE_LIMIT', '16'))
+# How long finished jobs stay visible through the status API
+GENERATION_JOB_RETENTION_SECONDS = float(os.environ.get('GENERATION_JOB_RETENTION_SECONDS', '600'))
+
+
+class QueueFullError(Exception):
+    """Raised when a new station cannot be queued because too many are waiting"""
+
+
+class GenerationJob:
+    """One generation of a station, shared by every caller that asked for it"""
+
+    def __init__(self, radar_id: str):
+        self.radar_id = radar_id
+        self.state = 'queued'
+        self.success = None
+        self.error = None
+        self.requests = 1
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ('succeeded', 'failed')
+
+    def Wait(self, timeout: float = None) -> bool:
+        """Wait up to timeout seconds for the job, returning whether it finished"""
+        try:
+            self.future.result(timeout)
+        except Exception:
+            pass  # Failures are recorded on the job
+        return self.done
+
+    def Status(self) -> dict:
+        now = time.time()
+        status = {
+            'radar_id': self.radar_id,
+            'state': self.state,
+            'requests': self.requests,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.started_at is None:
+            status['queued_s'] = round(now - self.submitted_at, 1)
+        else:
+            status['elapsed_s'] = round((self.finished_at or now) - self.started_at, 1)
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+class JobManager:
+    """Coalesces generation requests per station onto a fixed worker pool.
+
+    Submit() returns the station's active job if there is one, so concurrent
+    callers share a single generation and can all wait on it. New jobs run
+    on `workers` threads; once `max_queue` jobs are waiting for a worker,
+    further stations are refused with QueueFullError rather than piling up.
+    Finished jobs are kept for `retention` seconds for the status API.
+    """
+
+    def __init__(self, generate, workers: int = GENERATION_WORKERS, max_queue: int = GENERATION_QUEUE_LIMIT,
+                 retention: float = GENERATION_JOB_RETENTION_SECONDS):
+        self.generate = generate
+        self.max_queue = max_queue
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='generate')
+        self._jobs = {}  # radar_id -> latest GenerationJob
+        self._lock = threading.Lock()
+
+    def Active(self, radar_id: str) -> GenerationJob:
+        """The station's queued or running job, None if there is none"""
+        with self._lock:
+            job = self._jobs.get(radar_id)
+            return job if job is not None and not job.done else None
+
+    def Submit(self, radar_id: str) -> GenerationJob:
+        """Start generating a station, or join the generation already under way"""
+        with self._lock:
+            job = self._jobs.get(radar_id)
+            if job is not None and not job.done:
+                job.requests += 1
+                return job
+
+            self._Expire()
+            queued = sum(1 for other in self._jobs.values() if other.state == 'queued')
+            if queued >= self.max_queue:
+                raise QueueFullError(f'{queued} stations already waiting for generation')
+
+            job = self._jobs[radar_id] = GenerationJob(radar_id)
+            job.future = self._executor.submit(self._Run, job)
+            return job
+
+    def _Run(self, job: GenerationJob):
+        job.started_at = time.time()
+        job.state = 'running'
+        try:
+            job.success = bool(self.generate(job.radar_id))
+            if not job.success:
+                job.error = 'Image generation failed'
+        except Exception as e:
+            print(f'Error generating images for {job.radar_id}: {e}')
+            job.success = False
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.state = 'succeeded' if job.success else 'failed'
+            print(f'Generation for {job.radar_id}: {job.state} in {job.finished_at - job.started_at:.1f}s')
+        return job.success
+
+    def _Expire(self):
+        cutoff = time.time() - self.retention
+        for radar_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                del self._jobs[radar_id]
+
+    def Counts(self) -> dict:
+        """Number of jobs waiting for a worker and running"""
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {'queued': states.count('queued'), 'running': states.count('running')}
+
+    def Status(self, radar_id: str) -> dict:
+        """Status of the station's current or most recent job, None if unknown"""
+        with self._lock:
+            self._Expire()
+            job = self._jobs.get(radar_id)
+            return job.Status() if job is not None else None
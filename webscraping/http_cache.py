@@ -0,0 +1,92 @@
+"""HTTP validators (ETag / Last-Modified) and cache lifetimes for radar frames"""
+from cadence import CADENCE_DEFAULT_INTERVAL_SECONDS, CADENCE_PUBLISH_DELAY_SECONDS, FRESHNESS_FILE, TimestampSeconds
+from email.utils import formatdate, parsedate_to_datetime
+import json
+import math
+import os
+import time
+
+# Bounds on the max-age given to frames served by logical index
+FRAME_MIN_MAX_AGE_SECONDS = int(os.environ.get('FRAME_MIN_MAX_AGE_SECONDS', '10'))
+FRAME_MAX_MAX_AGE_SECONDS = int(os.environ.get('FRAME_MAX_MAX_AGE_SECONDS', '600'))
+# Frames addressed by their BOM timestamp never change
+IMMUTABLE_MAX_AGE_SECONDS = 7 * 24 * 3600
+# Station backgrounds only change if they are regenerated
+BACKGROUND_MAX_AGE_SECONDS = int(os.environ.get('BACKGROUND_MAX_AGE_SECONDS', str(24 * 3600)))
+
+# Parsed freshness.json, keyed by its stat
+_freshness = {'stat': None, 'stations': {}}
+
+
+def ETag(path: str) -> tuple:
+    """(strong ETag, Last-Modified unix time) for a frame file.
+
+    A slot file only changes when a whole new frame is written to it, so the
+    write's mtime and size identify the content. The format matches aiohttp's
+    FileResponse so both serving modes agree. Last-Modified is the mtime
+    truncated to the second, as HTTP dates carry no fractions.
+    """
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', math.floor(stat.st_mtime)
+
+
+def IsNotModified(headers, etag: str, last_modified: int, modified_since: bool = True) -> bool:
+    """Whether a conditional GET can be answered with 304 Not Modified.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+    Pass modified_since=False for URLs whose file can be replaced (frames by
+    index, bundles): a new file written within the same second as the
+    client's copy has the same Last-Modified, so only the ETag can tell them
+    apart.
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since and modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _Freshness(directory: str) -> dict:
+    """Per-station cadence stats written by the scraper (see cadence.py)"""
+    path = os.path.join(directory, FRESHNESS_FILE)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _freshness['stat'] != key:
+        try:
+            with open(path) as f:
+                stations = json.load(f).get('stations', {})
+        except (OSError, ValueError):
+            return _freshness['stations']
+        _freshness.update(stat=key, stations=stations)
+    return _freshness['stations']
+
+
+def ExpectedUpdate(radar_id: str, newest_timestamp: str, directory: str) -> float:
+    """Unix time the station's frames are next expected to change"""
+    stats = _Freshness(directory).get(radar_id)
+    if stats and stats.get('next_poll'):
+        return stats['next_poll']
+    if newest_timestamp:
+        return TimestampSeconds(newest_timestamp) + CADENCE_DEFAULT_INTERVAL_SECONDS + CADENCE_PUBLISH_DELAY_SECONDS
+    return time.time()
+
+
+def FrameMaxAge(radar_id: str, newest_timestamp: str, directory: str) -> int:
+    """max-age for a frame served by logical index: until the station's next expected update"""
+    remaining = ExpectedUpdate(radar_id, newest_timestamp, directory) - time.time()
+    return int(min(FRAME_MAX_MAX_AGE_SECONDS, max(FRAME_MIN_MAX_AGE_SECONDS, remaining)))
+
+
+def CacheHeaders(etag: str, last_modified: int, max_age: int, immutable: bool = False) -> dict:
+    cache_control = f'public, max-age={max_age}' + (', immutable' if immutable else '')
+    return {'ETag': etag, 'Last-Modified': formatdate(last_modified, usegmt=True), 'Cache-Control': cache_control}
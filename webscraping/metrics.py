@@ -0,0 +1,180 @@
+"""Pipeline stage timings and cache counters, exposed in Prometheus text format"""
+from contextlib import contextmanager
+from frame_store import FRAME_DIR
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the stage histogram buckets, from a palette remap to a slow BOM login
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_FILE = 'metrics.json'
+METRIC_PREFIX = 'betterweather'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsRegistry:
+    """Per-stage latency histograms and cache hit/miss counters for one process.
+
+    The pipeline times ftp_connect, listing, download, crop_resize, composite,
+    mosaic and encode; caches count lookups by name (radar_listing, backgrounds,
+    bundles, renditions, ...) and bounded caches also report their size and
+    evictions.
+
+    The scraper and the API server both run the pipeline, so each keeps its
+    own registry. The scraper writes a snapshot to metrics.json in the images
+    directory (like freshness.json) and the API server merges it into
+    /api/metrics with a process label.
+    """
+
+    def __init__(self, directory: str = FRAME_DIR, buckets: tuple = STAGE_BUCKETS):
+        self.path = os.path.join(directory, METRICS_FILE)
+        self.buckets = buckets
+        self._stages = {}  # stage -> {'buckets': [count per bucket], 'sum': s, 'count': n}
+        self._caches = {}  # cache -> {'hit': n, 'miss': n}
+        self._evictions = {}  # cache -> {'entries': n, 'bytes': n}
+        self._sizes = {}  # cache -> bytes held
+        self._lock = threading.Lock()
+
+    def Observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    @contextmanager
+    def Time(self, stage: str):
+        """Observe the duration of a with-block under stage, including failed attempts"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.Observe(stage, time.perf_counter() - start)
+
+    def Drain(self) -> dict:
+        """Stage histograms recorded since the last drain, e.g. for a render process to hand to its parent"""
+        with self._lock:
+            stages, self._stages = self._stages, {}
+        return stages
+
+    def Merge(self, stages: dict):
+        """Add stage histograms drained from another registry with the same buckets"""
+        with self._lock:
+            for stage, other in stages.items():
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], other['buckets'])]
+                histogram['sum'] += other['sum']
+                histogram['count'] += other['count']
+
+    def Count(self, cache: str, hit: bool):
+        with self._lock:
+            counts = self._caches.setdefault(cache, {'hit': 0, 'miss': 0})
+            counts['hit' if hit else 'miss'] += 1
+
+    def Evicted(self, cache: str, nbytes: int, entries: int = 1):
+        with self._lock:
+            counts = self._evictions.setdefault(cache, {'entries': 0, 'bytes': 0})
+            counts['entries'] += entries
+            counts['bytes'] += nbytes
+
+    def SetSize(self, cache: str, nbytes: int):
+        with self._lock:
+            self._sizes[cache] = nbytes
+
+    def Snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'stages': {stage: dict(h, buckets=list(h['buckets'])) for stage, h in self._stages.items()},
+                'caches': {cache: dict(counts) for cache, counts in self._caches.items()},
+                'evictions': {cache: dict(counts) for cache, counts in self._evictions.items()},
+                'sizes': dict(self._sizes),
+            }
+
+    def WriteSnapshot(self):
+        tmp_path = f'{self.path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': time.time(), **self.Snapshot()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Could not write metrics {self.path}: {e}')
+
+
+def ReadSnapshot(directory: str) -> dict:
+    """Snapshot written by another process's WriteSnapshot, None if there isn't one"""
+    try:
+        with open(os.path.join(directory, METRICS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _Labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+def _Number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def Render(snapshots: dict, gauges: list = ()) -> str:
+    """Prometheus text exposition of {process: snapshot} plus gauges.
+
+    gauges is a list of (name, help, [(labels, value)]) families.
+    """
+    stage = f'{METRIC_PREFIX}_stage_seconds'
+    lines = [f'# HELP {stage} Time spent in each pipeline stage.', f'# TYPE {stage} histogram']
+    for process, snapshot in snapshots.items():
+        for name, histogram in sorted(snapshot['stages'].items()):
+            labels = {'process': process, 'stage': name}
+            cumulative = 0
+            for bound, count in zip(snapshot['buckets'], histogram['buckets']):
+                cumulative += count
+                lines.append(f'{stage}_bucket{_Labels({**labels, "le": _Number(float(bound))})} {cumulative}')
+            lines.append(f'{stage}_bucket{_Labels({**labels, "le": "+Inf"})} {histogram["count"]}')
+            lines.append(f'{stage}_sum{_Labels(labels)} {_Number(float(histogram["sum"]))}')
+            lines.append(f'{stage}_count{_Labels(labels)} {histogram["count"]}')
+
+    cache = f'{METRIC_PREFIX}_cache_requests_total'
+    lines += [f'# HELP {cache} Cache lookups by result.', f'# TYPE {cache} counter']
+    for process, snapshot in snapshots.items():
+        for name, counts in sorted(snapshot['caches'].items()):
+            for result in ('hit', 'miss'):
+                labels = {'process': process, 'cache': name, 'result': result}
+                lines.append(f'{cache}{_Labels(labels)} {counts.get(result, 0)}')
+
+    evictions = f'{METRIC_PREFIX}_cache_evictions_total'
+    evicted_bytes = f'{METRIC_PREFIX}_cache_evicted_bytes_total'
+    size = f'{METRIC_PREFIX}_cache_bytes'
+    families = [
+        (evictions, 'Entries evicted from bounded caches.', 'counter', 'evictions', lambda c: c['entries']),
+        (evicted_bytes, 'Bytes evicted from bounded caches.', 'counter', 'evictions', lambda c: c['bytes']),
+        (size, 'Bytes held by bounded caches.', 'gauge', 'sizes', lambda c: c),
+    ]
+    for name, help_text, kind, key, value in families:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for process, snapshot in snapshots.items():
+            for cache_name, entry in sorted(snapshot.get(key, {}).items()):
+                lines.append(f'{name}{_Labels({"process": process, "cache": cache_name})} {value(entry)}')
+
+    for name, help_text, samples in gauges:
+        name = f'{METRIC_PREFIX}_{name}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        lines += [f'{name}{_Labels(labels)} {_Number(value)}' for labels, value in samples]
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics recorded by this process
+METRICS = MetricsRegistry()
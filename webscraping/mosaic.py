@@ -0,0 +1,190 @@
+"""Multi-radar mosaics: a station's watch frame filled in from the stations overlapping it"""
+from radar_stations import RADAR_STATIONS
+from resampling import TARGET_SIZE, PaletteLut, RadarCropBox
+from station_index import EARTH_RADIUS_KM, RangeKm, StationIndex
+from cadence import TimestampSeconds
+import functools
+import numpy as np
+import os
+import threading
+
+# Stations combined into one mosaic, including the one it is centred on (each adds a download per frame)
+MOSAIC_MAX_STATIONS = int(os.environ.get('MOSAIC_MAX_STATIONS', '4'))
+# How far (seconds) a neighbour's frame may be from a mosaic frame's timestamp to be used in it
+MOSAIC_MAX_SKEW_SECONDS = float(os.environ.get('MOSAIC_MAX_SKEW_SECONDS', '600'))
+# Mosaic maps kept in memory (about 0.5 MB per station in the mosaic)
+MOSAIC_MAP_CACHE_SIZE = int(os.environ.get('MOSAIC_MAP_CACHE_SIZE', '64'))
+
+# BOM radar images are 512x512, centred on the radar and spanning twice its range
+SOURCE_SIZE = 512
+
+_EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+_SITES = StationIndex(RADAR_STATIONS)
+
+
+def GnomonicForward(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> tuple:
+    """(x, y, visible): metres east/north on the gnomonic plane centred at lat0/lon0.
+
+    visible is False for points on the far hemisphere, which have no projection.
+    """
+    phi0, lam0 = np.radians(lat0), np.radians(lon0)
+    phi, dlam = np.radians(lats), np.radians(lons) - lam0
+    cos_c = np.sin(phi0) * np.sin(phi) + np.cos(phi0) * np.cos(phi) * np.cos(dlam)
+    visible = cos_c > 0
+    cos_c = np.where(visible, cos_c, 1)
+    x = _EARTH_RADIUS_M * np.cos(phi) * np.sin(dlam) / cos_c
+    y = _EARTH_RADIUS_M * (np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(dlam)) / cos_c
+    return x, y, visible
+
+
+def GnomonicInverse(lat0: float, lon0: float, x: np.ndarray, y: np.ndarray) -> tuple:
+    """(lat, lon) in degrees of points on the gnomonic plane centred at lat0/lon0"""
+    phi0 = np.radians(lat0)
+    rho = np.hypot(x, y)
+    c = np.arctan(rho / _EARTH_RADIUS_M)
+    sin_c, cos_c = np.sin(c), np.cos(c)
+    ratio = np.divide(y, rho, out=np.zeros_like(rho), where=rho > 0)
+    lat = np.arcsin(cos_c * np.sin(phi0) + ratio * sin_c * np.cos(phi0))
+    lon = np.radians(lon0) + np.arctan2(x * sin_c, rho * np.cos(phi0) * cos_c - y * np.sin(phi0) * sin_c)
+    return np.degrees(lat), np.degrees(lon)
+
+
+def SourceMetresPerPixel(radar_id: str) -> float:
+    """Metres per pixel of a station's BOM image (RADAR_STATIONS scale is per watch pixel)"""
+    left, _, right, _ = RadarCropBox((SOURCE_SIZE, SOURCE_SIZE))
+    return RADAR_STATIONS[radar_id]['scale'] * TARGET_SIZE[0] / (right - left)
+
+
+def FramePlane(radar_id: str, size: tuple = TARGET_SIZE) -> tuple:
+    """(x, y) metres east/north of the radar of each watch frame pixel centre, as (h, w) arrays.
+
+    Follows the crop box and resize of resampling.py, so sampling a station's
+    own image at these points gives exactly its normal frame.
+    """
+    left, upper, right, lower = RadarCropBox((SOURCE_SIZE, SOURCE_SIZE))
+    metres = SourceMetresPerPixel(radar_id)
+    cols = left + (np.arange(size[0]) + 0.5) * (right - left) / size[0]
+    rows = upper + (np.arange(size[1]) + 0.5) * (lower - upper) / size[1]
+    return np.meshgrid((cols - SOURCE_SIZE / 2) * metres, (SOURCE_SIZE / 2 - rows) * metres)
+
+
+def MosaicCandidates(radar_id: str, count: int) -> list:
+    """The station and the count - 1 nearest other sites at the same range, nearest first"""
+    info = RADAR_STATIONS[radar_id]
+    matches = _SITES.Nearest(info['lat'], info['lon'], count, RangeKm(info['scale']))
+    others = [match['radar_id'] for match in matches if match['radar_id'][:-1] != radar_id[:-1]]
+    return [radar_id] + others[:count - 1]
+
+
+class MosaicMap:
+    """Precomputed gathers that build one station's watch frame from several radars.
+
+    Every pixel of the station's frame is projected once onto each nearby
+    station's 512 px BOM image with the gnomonic projection BOM draws them
+    in, and is taken from the nearest station whose range covers it. The
+    result is a flat NumPy index array per station (target pixels and the
+    source pixels they copy), so rendering a mosaic frame is one gather per
+    station rather than per-request geometry. Stations whose range does not
+    reach the frame are dropped; the station itself is always the first
+    member, and pixels only it covers match its normal frame exactly.
+
+    A neighbour's frame can be missing for a timestamp, so gathers are
+    built (and cached) per set of members actually available.
+    """
+
+    def __init__(self, radar_id: str, max_stations: int = MOSAIC_MAX_STATIONS, size: tuple = TARGET_SIZE):
+        self.radar_id = radar_id
+        self.size = tuple(size)
+
+        x, y = FramePlane(radar_id, size)
+        info = RADAR_STATIONS[radar_id]
+        lats, lons = GnomonicInverse(info['lat'], info['lon'], x, y)
+
+        self.members = []
+        self._sources = {}  # radar_id -> (h*w,) int32 source pixel of each frame pixel
+        self._distances = {}  # radar_id -> (h*w,) float32 metres from the radar, inf where not covered
+        for member in MosaicCandidates(radar_id, 2 * max_stations):  # Extra candidates in case some don't reach
+            if len(self.members) >= max_stations:
+                break
+            if member == radar_id:
+                mx, my, visible = x, y, True
+            else:
+                mx, my, visible = GnomonicForward(RADAR_STATIONS[member]['lat'], RADAR_STATIONS[member]['lon'],
+                                                  lats, lons)
+            metres = SourceMetresPerPixel(member)
+            col = np.floor(mx / metres + SOURCE_SIZE / 2)
+            row = np.floor(SOURCE_SIZE / 2 - my / metres)
+            distance = np.hypot(mx, my)
+            covered = (visible & (distance <= metres * SOURCE_SIZE / 2)
+                       & (col >= 0) & (col < SOURCE_SIZE) & (row >= 0) & (row < SOURCE_SIZE))
+            if member != radar_id and not covered.any():
+                continue
+
+            self.members.append(member)
+            source = np.where(covered, row * SOURCE_SIZE + col, 0).astype(np.int32)
+            self._sources[member] = source.ravel()
+            self._distances[member] = np.where(covered, distance, np.inf).astype(np.float32).ravel()
+
+        self._gathers = {}
+        self._lock = threading.Lock()
+
+    def Gathers(self, available) -> list:
+        """[(radar_id, target pixels, source pixels)] using only the available members, built once per set"""
+        key = tuple(member for member in self.members if member in available)
+        with self._lock:
+            gathers = self._gathers.get(key)
+        if gathers is not None:
+            return gathers
+
+        gathers = []
+        if key:
+            distances = np.stack([self._distances[member] for member in key])
+            owner = np.argmin(distances, axis=0)
+            owner[np.isinf(distances.min(axis=0))] = -1  # Beyond every available radar
+            for i, member in enumerate(key):
+                target = np.flatnonzero(owner == i).astype(np.int32)
+                gathers.append((member, target, self._sources[member][target]))
+        with self._lock:
+            self._gathers[key] = gathers
+        return gathers
+
+    def Render(self, images: dict) -> np.ndarray:
+        """(h, w, 4) straight-alpha RGBA mosaic from {radar_id: decoded BOM image}; missing members are skipped"""
+        images = {member: image for member, image in images.items()
+                  if image is not None and image.size == (SOURCE_SIZE, SOURCE_SIZE)}
+        out = np.zeros(self.size[0] * self.size[1], np.uint32)
+        for member, target, source in self.Gathers(images):
+            image = images[member]
+            if image.mode == 'P':
+                # Gather palette indices, then look up only the gathered pixels
+                out[target] = PaletteLut(image)[np.asarray(image).ravel()[source]]
+            else:
+                out[target] = np.asarray(image.convert('RGBA')).view(np.uint32).ravel()[source]
+        return out.view(np.uint8).reshape(self.size[1], self.size[0], 4)
+
+
+@functools.lru_cache(maxsize=MOSAIC_MAP_CACHE_SIZE)
+def GetMosaicMap(radar_id: str) -> MosaicMap:
+    """Shared mosaic map for a station, built on first use"""
+    return MosaicMap(radar_id)
+
+
+def AlignFrames(timestamps: dict, frame_timestamps: list, max_skew: float = MOSAIC_MAX_SKEW_SECONDS) -> list:
+    """{radar_id: timestamp} of each station's frame closest to each mosaic frame timestamp.
+
+    timestamps maps each member to its sorted listing timestamps. Stations
+    with no frame within max_skew seconds are left out of that mosaic frame.
+    """
+    seconds = {member: [TimestampSeconds(ts) for ts in listed] for member, listed in timestamps.items()}
+    aligned = []
+    for frame_timestamp in frame_timestamps:
+        at = TimestampSeconds(frame_timestamp)
+        frame = {}
+        for member, listed in timestamps.items():
+            if not listed:
+                continue
+            i = int(np.argmin([abs(s - at) for s in seconds[member]]))
+            if abs(seconds[member][i] - at) <= max_skew:
+                frame[member] = listed[i]
+        aligned.append(frame)
+    return aligned
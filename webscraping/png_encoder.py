@@ -0,0 +1,109 @@
+"""Size-optimized PNG encoding of rendered frames"""
+from io import BytesIO
+from PIL import Image
+import numpy as np
+import os
+import zlib
+
+# Palette size for adaptive quantization; 0 keeps full-colour RGBA
+PNG_COLORS = int(os.environ.get('PNG_COLORS', '256'))
+# 'mediancut', 'maxcoverage', 'fastoctree' or 'libimagequant' (if Pillow was built with it)
+PNG_QUANTIZE_METHOD = os.environ.get('PNG_QUANTIZE_METHOD', 'fastoctree')
+# 'none' keeps rain-intensity bands crisp; 'floydsteinberg' smooths gradients at the cost of size
+PNG_DITHER = os.environ.get('PNG_DITHER', 'none')
+# zlib level 0-9 and strategy ('default', 'filtered', 'huffman', 'rle' or 'fixed')
+PNG_COMPRESS_LEVEL = int(os.environ.get('PNG_COMPRESS_LEVEL', '6'))
+PNG_ZLIB_STRATEGY = os.environ.get('PNG_ZLIB_STRATEGY', 'default')
+
+QUANTIZE_METHODS = {
+    'mediancut': Image.Quantize.MEDIANCUT,
+    'maxcoverage': Image.Quantize.MAXCOVERAGE,
+    'fastoctree': Image.Quantize.FASTOCTREE,
+    'libimagequant': Image.Quantize.LIBIMAGEQUANT,
+}
+DITHERS = {'none': Image.Dither.NONE, 'floydsteinberg': Image.Dither.FLOYDSTEINBERG}
+ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+
+
+class PngEncoder:
+    """Quantizes a frame to an adaptive palette and writes it with tuned zlib settings.
+
+    Radar frames are a handful of rain-intensity colours over a static
+    background, so a palette PNG holds them at a fraction of the size of
+    RGBA. Frames with transparency (no background) fall back to fastoctree
+    when the chosen method can't keep alpha, and only their opaque pixels are
+    dithered. See
+    benchmarks/bench_png_encoder.py for the size/time trade-off of each
+    setting.
+    """
+
+    def __init__(self, colors: int = PNG_COLORS, method: str = PNG_QUANTIZE_METHOD, dither: str = PNG_DITHER,
+                 compress_level: int = PNG_COMPRESS_LEVEL, strategy: str = PNG_ZLIB_STRATEGY):
+        self.colors = colors
+        self.method = QUANTIZE_METHODS[method]
+        self.dither = DITHERS[dither]
+        self.save_kwargs = {'compress_level': compress_level, 'compress_type': ZLIB_STRATEGIES[strategy]}
+
+    def Quantize(self, image: Image.Image) -> Image.Image:
+        """The frame reduced to an adaptive palette, unchanged if quantization is disabled"""
+        if not self.colors or image.mode == 'P':
+            return image
+        method = self.method
+        if image.mode == 'LA':
+            image = image.convert('RGBA')  # Pillow doesn't quantize LA
+        if image.mode == 'RGBA':
+            if image.getchannel('A').getextrema()[0] == 255:
+                image = image.convert('RGB')  # Composited frames are opaque
+            elif method not in (Image.Quantize.FASTOCTREE, Image.Quantize.LIBIMAGEQUANT):
+                method = Image.Quantize.FASTOCTREE
+        quantized = image.quantize(colors=self.colors, method=method)
+        if self.dither == Image.Dither.NONE:
+            return quantized
+        if image.mode == 'RGBA':
+            return self._DitherTransparent(image, quantized)
+        # Pillow only dithers when mapping onto a given palette, so map onto the adaptive one
+        return image.quantize(palette=quantized, dither=self.dither)
+
+    def _DitherTransparent(self, image: Image.Image, quantized: Image.Image) -> Image.Image:
+        """Dithered palette frame for an image with transparency.
+
+        Pillow can only map RGB or L images onto a palette, so only the opaque
+        pixels (the rain itself) are dithered, onto the palette entries they
+        were already quantized to; transparent and anti-aliased edge pixels
+        keep their undithered index so their alpha is unchanged.
+        """
+        indices = np.asarray(quantized).copy()
+        solid = np.asarray(image.getchannel('A')) == 255
+        used = np.unique(indices[solid])
+        if not len(used):
+            return quantized
+        palette = np.array(quantized.getpalette('RGBA'), np.uint8).reshape(-1, 4)
+        lookup = np.resize(used, 256)  # Padded with repeats so every index Pillow picks maps back
+        target = Image.new('P', (1, 1))
+        target.putpalette(palette[lookup, :3].ravel().tolist())
+
+        rgb = np.asarray(image.convert('RGB')).copy()
+        rgb[~solid] = palette[used[0], :3]  # Exact palette colour, so no error diffuses in from the gaps
+        dithered = np.asarray(Image.fromarray(rgb).quantize(palette=target, dither=self.dither))
+        indices[solid] = lookup[dithered[solid]]
+        result = Image.fromarray(indices, 'P')
+        result.putpalette(palette.ravel().tolist(), 'RGBA')
+        return result
+
+    def Save(self, image: Image.Image, fp, **save_kwargs):
+        self.Quantize(image).save(fp, 'PNG', **self.save_kwargs, **save_kwargs)
+
+    def Encode(self, image: Image.Image) -> bytes:
+        buffer = BytesIO()
+        self.Save(image, buffer)
+        return buffer.getvalue()
+
+
+# Encoder for every frame written to a station's buffer
+FRAME_ENCODER = PngEncoder()
@@ -0,0 +1,111 @@
+"""Shared, TTL-cached index of the BOM /anon/gen/radar directory listing"""
+from ftp_pool import FTP_POOL
+from metrics import METRICS
+import os
+import re
+import threading
+import time
+
+# How long a directory listing is reused before the next NLST
+RADAR_LISTING_TTL_SECONDS = float(os.environ.get('RADAR_LISTING_TTL_SECONDS', '30'))
+# How long to wait after a failed NLST before trying again
+RADAR_LISTING_RETRY_SECONDS = float(os.environ.get('RADAR_LISTING_RETRY_SECONDS', '10'))
+
+# e.g. IDR714.T.202310260114.png
+RADAR_FILE_PATTERN = re.compile(r'^(IDR\w+)\.T\.(\d{12})\.png$')
+
+
+def RadarFilename(radar_id: str, timestamp: str) -> str:
+    """Build the BOM filename for a radar frame timestamp (YYYYMMDDHHMM UTC)"""
+    return f'{radar_id}.T.{timestamp}.png'
+
+
+def FrameTimestamp(filename: str) -> str:
+    """Timestamp (YYYYMMDDHHMM UTC) of a BOM radar frame filename, None if not one"""
+    match = RADAR_FILE_PATTERN.match(os.path.basename(filename))
+    return match.group(2) if match else None
+
+
+class RadarListing:
+    """Per-radar sorted timestamps built from one shared NLST.
+
+    Lookups are served from memory while the listing is younger than ttl.
+    When it expires, the first caller refreshes it and concurrent callers
+    wait for that refresh rather than issuing their own NLST. After a failed
+    NLST the old index is served until retry_after has passed.
+    """
+
+    def __init__(self, ttl: float = RADAR_LISTING_TTL_SECONDS, pool=FTP_POOL,
+                 retry_after: float = RADAR_LISTING_RETRY_SECONDS):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.pool = pool
+        self._index = {}  # radar_id -> [timestamp, ...] oldest first
+        self._refreshed_at = None
+        self._retry_at = None  # monotonic time before which a failed NLST isn't retried
+        self._refresh_lock = threading.Lock()
+
+        self.hits = 0
+        self.refreshes = 0
+
+    def _IsFresh(self) -> bool:
+        return self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.ttl
+
+    def _IsBackingOff(self) -> bool:
+        return self._retry_at is not None and time.monotonic() < self._retry_at
+
+    def Refresh(self, ftp_conn=None, force: bool = False) -> bool:
+        """Re-list the radar directory if the cached listing has expired"""
+        if not force and self._IsFresh():
+            self.hits += 1
+            METRICS.Count('radar_listing', True)
+            return True
+
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited
+            if not force and self._IsFresh():
+                self.hits += 1
+                METRICS.Count('radar_listing', True)
+                return True
+            if not force and self._IsBackingOff():
+                return self._refreshed_at is not None  # Keep serving the old index
+
+            METRICS.Count('radar_listing', False)
+            try:
+                files = []
+                with self.pool.Connection(ftp_conn) as ftp_to_use, METRICS.Time('listing'):
+                    ftp_to_use.retrlines('NLST', files.append)
+            except Exception as e:
+                print(f'Error listing radar files: {e}')
+                self._retry_at = time.monotonic() + self.retry_after
+                return self._refreshed_at is not None  # Keep serving the old index
+
+            index = {}
+            for name in files:
+                match = RADAR_FILE_PATTERN.match(name)
+                if match:
+                    index.setdefault(match.group(1), []).append(match.group(2))
+            for timestamps in index.values():
+                timestamps.sort()
+
+            self._index = index
+            self._refreshed_at = time.monotonic()
+            self._retry_at = None
+            self.refreshes += 1
+            print(f'Indexed {len(files)} radar files across {len(index)} radars')
+            return True
+
+    def Timestamps(self, radar_id: str, ftp_conn=None) -> list:
+        """All known frame timestamps for a radar, oldest first"""
+        self.Refresh(ftp_conn)
+        return list(self._index.get(radar_id, []))
+
+    def Latest(self, radar_id: str, count: int = 7, ftp_conn=None) -> list:
+        """Filenames of the most recent frames for a radar, most recent first"""
+        self.Refresh(ftp_conn)
+        timestamps = self._index.get(radar_id, [])
+        return [RadarFilename(radar_id, ts) for ts in reversed(timestamps[-count:])] if count > 0 else []
+
+
+# Shared listing used by every generation in this process
+RADAR_LISTING = RadarListing()
@@ -0,0 +1,186 @@
+"""Demand tracking and the multi-station refresh scheduler"""
+from concurrent.futures import ThreadPoolExecutor
+from frame_store import FRAME_DIR, FrameStore
+import json
+import math
+import os
+import threading
+import time
+
+# Stations requested within this window are kept fresh
+HOT_STATION_TTL_SECONDS = float(os.environ.get('HOT_STATION_TTL_SECONDS', '1800'))
+# Demand scores halve over this period, so recent requests weigh more
+DEMAND_HALF_LIFE_SECONDS = float(os.environ.get('DEMAND_HALF_LIFE_SECONDS', '600'))
+# A station is due once its newest render is this old (BOM publishes every 6 minutes)
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('REFRESH_INTERVAL_SECONDS', '360'))
+# Concurrent station refreshes (each holds one pooled FTP session)
+REFRESH_WORKERS = int(os.environ.get('REFRESH_WORKERS', '2'))
+# How often the API server writes its demand counts to disk
+DEMAND_FLUSH_SECONDS = float(os.environ.get('DEMAND_FLUSH_SECONDS', '5'))
+
+DEMAND_FILE = 'demand.json'
+
+
+def _Decay(score: float, elapsed: float) -> float:
+    return score * math.pow(0.5, max(elapsed, 0) / DEMAND_HALF_LIFE_SECONDS)
+
+
+class DemandTracker:
+    """Per-station request counts shared between the API server and the scraper.
+
+    The API server records each request in memory and writes the table to
+    demand.json in the images directory at most every flush_interval seconds;
+    the scraper process reads it to decide which stations to refresh. Each
+    entry holds an exponentially decayed request score and when the station
+    was last requested. Stations not requested for ttl seconds are dropped.
+    """
+
+    def __init__(self, directory: str = FRAME_DIR, ttl: float = HOT_STATION_TTL_SECONDS,
+                 flush_interval: float = DEMAND_FLUSH_SECONDS):
+        self.path = os.path.join(directory, DEMAND_FILE)
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._stations = {}  # radar_id -> {'score', 'at', 'last_seen'}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+
+    def Record(self, radar_id: str):
+        """Count one request for a station"""
+        now = time.time()
+        with self._lock:
+            entry = self._stations.get(radar_id)
+            is_new = entry is None
+            if is_new:
+                entry = self._stations[radar_id] = {'score': 0.0, 'at': now, 'last_seen': now}
+            entry['score'] = _Decay(entry['score'], now - entry['at']) + 1
+            entry['at'] = entry['last_seen'] = now
+
+            # Newly hot stations are written straight away so the scheduler sees them
+            if is_new or now - self._flushed_at >= self.flush_interval:
+                self._Flush(now)
+
+    def _Flush(self, now: float):
+        self._stations = {radar_id: entry for radar_id, entry in self._stations.items()
+                          if now - entry['last_seen'] < self.ttl}
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._stations, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Could not write demand file {self.path}: {e}')
+        self._flushed_at = now
+
+    def Load(self) -> dict:
+        """Hot stations from the demand file as {radar_id: (score, last_seen)}"""
+        try:
+            with open(self.path) as f:
+                stations = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f'Ignoring unreadable demand file {self.path}: {e}')
+            return {}
+
+        now = time.time()
+        return {radar_id: (_Decay(entry['score'], now - entry['at']), entry['last_seen'])
+                for radar_id, entry in stations.items()
+                if now - entry['last_seen'] < self.ttl}
+
+
+class RefreshScheduler:
+    """Keeps every hot station fresh using a bounded pool of refresh workers.
+
+    Every tick the scheduler reads the demand table, drops stations nobody
+    has asked for within the hot window, and ranks the rest by demand score
+    times staleness (how many refresh intervals since the station's newest
+    render). Due stations are handed to refresh(radar_id) in that order, with
+    at most `workers` refreshes running and never two for one station.
+    Pinned stations are always treated as hot. A station is due once it is
+    a full interval stale, or whenever is_due(radar_id) says so if given.
+    Stations whose buffer has never been written are left to the API
+    server, which generates them on their first request.
+    """
+
+    def __init__(self, refresh, pinned: list = (), directory: str = FRAME_DIR,
+                 workers: int = REFRESH_WORKERS, interval: float = REFRESH_INTERVAL_SECONDS,
+                 num_images: int = 7, tick: float = 10, is_due=None):
+        self.refresh = refresh
+        self.is_due = is_due
+        self.demand = DemandTracker(directory)
+        self.directory = directory
+        self.pinned = list(pinned)
+        self.workers = max(1, workers)
+        self.interval = interval
+        self.num_images = num_images
+        self.tick = tick
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='refresh')
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def LastRefresh(self, radar_id: str) -> float:
+        """When a station's frame buffer was last written, 0 if never"""
+        return FrameStore(radar_id, self.num_images, self.directory).Manifest().get('updated') or 0
+
+    def Ranked(self) -> list:
+        """Due stations as [(priority, radar_id)], most urgent first"""
+        now = time.time()
+        hot = self.demand.Load()
+        for radar_id in self.pinned:
+            hot.setdefault(radar_id, (1.0, now))
+
+        ranked = []
+        for radar_id, (score, _) in hot.items():
+            last_refresh = self.LastRefresh(radar_id)
+            if not last_refresh and radar_id not in self.pinned:
+                continue  # Never generated: the API server's first request is generating it
+            staleness = (now - last_refresh) / self.interval
+            if (self.is_due(radar_id) if self.is_due else staleness >= 1):
+                ranked.append((score * staleness, radar_id))
+        ranked.sort(reverse=True)
+        return ranked
+
+    def RunOnce(self) -> list:
+        """Submit due stations to free workers, returning the ones started"""
+        started = []
+        for _, radar_id in self.Ranked():
+            with self._lock:
+                if len(self._in_flight) >= self.workers:
+                    break
+                if radar_id in self._in_flight:
+                    continue
+                self._in_flight.add(radar_id)
+            self._executor.submit(self._Refresh, radar_id)
+            started.append(radar_id)
+        return started
+
+    def _Refresh(self, radar_id: str):
+        try:
+            print(f'Scheduled refresh of {radar_id}')
+            self.refresh(radar_id)
+        except Exception as e:
+            print(f'Error refreshing {radar_id}: {e}')
+        finally:
+            with self._lock:
+                self._in_flight.discard(radar_id)
+
+    def _Loop(self):
+        while not self._stop.is_set():
+            try:
+                self.RunOnce()
+            except Exception as e:
+                print(f'Refresh scheduler error: {e}')
+            self._stop.wait(self.tick)
+
+    def Start(self):
+        """Run the scheduler on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._Loop, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+
+    def Stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
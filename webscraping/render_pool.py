@@ -0,0 +1,139 @@
+"""Radar frame rendering, optionally on a pool of worker processes"""
+from compositor import CompositeFrames, CompositePaletteFrames, ExpandPalette
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from metrics import METRICS
+from PIL import Image
+from png_encoder import FRAME_ENCODER
+from resampling import CanResamplePalette, CropAndResizePalette, CropAndResizeStack
+import multiprocessing
+import numpy as np
+import os
+import threading
+
+# Worker processes that render the frames of a multi-frame generation; 0 renders on the calling thread.
+# Defaults to one per CPU (up to 4), and off on a single CPU where a pool only adds overhead.
+_CPUS = os.cpu_count() or 1
+RENDER_PROCESSES = int(os.environ.get('RENDER_PROCESSES', str(min(4, _CPUS) if _CPUS > 1 else 0)))
+
+
+def RenderRadarFrames(radars: list, background: np.ndarray, overlays: bool = False) -> tuple:
+    """Crop/resize a batch of decoded radar frames and overlay them on the background.
+
+    background is the premultiplied array from LoadBackgroundArray; without one
+    the resized frames are returned as-is. BOM palette frames are resampled and
+    composited as palette indices, only expanding the rain pixels to RGBA.
+    Returns (frames, radar-only overlays); overlays is None unless requested
+    and there is a background to separate them from.
+    """
+    if background is not None and CanResamplePalette(radars):
+        with METRICS.Time('crop_resize'):
+            indices, palettes = CropAndResizePalette(radars)
+        with METRICS.Time('composite'):
+            frames = CompositePaletteFrames(background, indices, palettes)
+            return frames, ExpandPalette(indices, palettes) if overlays else None
+
+    with METRICS.Time('crop_resize'):
+        frames = CropAndResizeStack(radars)
+    if background is None:
+        return frames, None
+    with METRICS.Time('composite'):
+        return CompositeFrames(background, frames), frames if overlays else None
+
+
+def _Picklable(image: Image.Image) -> Image.Image:
+    """Palette images only pickle their RGB palette, so carry palette alpha as tRNS transparency"""
+    if image is None or image.mode != 'P' or image.palette.mode != 'RGBA':
+        return image
+    alpha = bytes(image.getpalette('RGBA')[3::4])
+    image.putpalette(image.getpalette('RGB'), 'RGB')
+    image.info['transparency'] = alpha
+    return image
+
+
+def RenderFrame(data: bytes, background: np.ndarray, overlays: bool) -> tuple:
+    """Decode, render and palette-quantize one downloaded BOM frame.
+
+    Runs in a worker process, so the result is what is cheap to send back:
+    (frame, overlay or None) as palette images ready for FrameStore.Push, plus
+    the stage timings recorded here for the parent's metrics.
+    """
+    radar = Image.open(BytesIO(data))
+    radar.load()
+    frames, layers = RenderRadarFrames([radar], background, overlays)
+    with METRICS.Time('quantize'):
+        frame = FRAME_ENCODER.Quantize(Image.fromarray(frames[0]))
+        overlay = FRAME_ENCODER.Quantize(Image.fromarray(layers[0])) if layers is not None else None
+    return _Picklable(frame), _Picklable(overlay), METRICS.Drain()
+
+
+def _Ready() -> int:
+    return os.getpid()
+
+
+class RenderPool:
+    """Lazily started process pool for RenderFrame.
+
+    Resizing, compositing and quantizing a frame are CPU-bound, so frames
+    rendered on threads queue behind each other on the GIL. Workers are
+    started with forkserver (spawn where it isn't available) so they never
+    inherit the server's threads or FTP sessions, and only the downloaded
+    PNG bytes, the premultiplied background and the 8-bit results cross the
+    process boundary. A crashed worker breaks the pool; it is replaced on
+    the next Submit.
+    """
+
+    def __init__(self, processes: int = RENDER_PROCESSES):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    def _Executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload([__name__])  # Workers fork with NumPy and Pillow loaded
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+            return self._executor
+
+    def Start(self):
+        """Start the workers now rather than on the first generation (startup takes about a second)"""
+        if self.enabled:
+            executor = self._Executor()
+            for future in [executor.submit(_Ready) for _ in range(self.processes)]:
+                future.result()
+
+    def Submit(self, data: bytes, background: np.ndarray, overlays: bool) -> Future:
+        try:
+            return self._Executor().submit(RenderFrame, data, background, overlays)
+        except BrokenProcessPool:
+            self.Reset()
+            return self._Executor().submit(RenderFrame, data, background, overlays)
+
+    def Result(self, future: Future) -> tuple:
+        """(frame, overlay) from a submitted render, merging its stage timings into this process's metrics"""
+        try:
+            frame, overlay, stages = future.result()
+        except BrokenProcessPool:
+            self.Reset()
+            raise
+        METRICS.Merge(stages)
+        return frame, overlay
+
+    def Reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by every generation in this process
+RENDER_POOL = RenderPool()
@@ -0,0 +1,128 @@
+"""Per-device renditions of buffered frames, encoded once in the device's native format"""
+from metrics import METRICS
+from PIL import Image
+import json
+import os
+import threading
+
+# Renditions live under <images dir>/renditions/<radar_id>/<timestamp>.<profile>.<ext>
+RENDITIONS_SUBDIR = 'renditions'
+RENDITION_JPEG_QUALITY = int(os.environ.get('RENDITION_JPEG_QUALITY', '85'))
+
+# size: output pixels; colors: 64 = Garmin MIP palette, other N = adaptive N-colour palette,
+# 0 = full colour; format: 'png' or 'jpeg'
+PROFILES = {
+    'mip218': {'size': (218, 218), 'colors': 64, 'format': 'png'},     # vivoactive 4S
+    'mip240': {'size': (240, 240), 'colors': 64, 'format': 'png'},     # Forerunner 245/745/945, fenix 6S
+    'mip260': {'size': (260, 260), 'colors': 64, 'format': 'png'},     # fenix 6/7, Forerunner 955
+    'mip280': {'size': (280, 280), 'colors': 64, 'format': 'png'},     # fenix 6X/7X, Enduro
+    'amoled360': {'size': (360, 360), 'colors': 256, 'format': 'png'},  # Venu 2S
+    'amoled390': {'size': (390, 390), 'colors': 256, 'format': 'png'},  # Venu
+    'amoled416': {'size': (416, 416), 'colors': 256, 'format': 'png'},  # Venu 2, epix, Forerunner 965
+}
+# Extra or overriding profiles as JSON, e.g. '{"mono176": {"size": [176, 176], "colors": 2, "format": "png"}}'
+PROFILES.update(json.loads(os.environ.get('RENDITION_PROFILES', '{}')))
+
+MIME_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg'}
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _RenditionLock(path: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def _MipPalette() -> Image.Image:
+    """The 64 colours of Garmin MIP displays: 0x00/0x55/0xAA/0xFF in each channel"""
+    levels = (0x00, 0x55, 0xAA, 0xFF)
+    colors = [c for r in levels for g in levels for b in levels for c in (r, g, b)]
+    palette = Image.new('P', (1, 1))
+    palette.putpalette(colors + colors[:3] * (256 - 64))  # Pad with a repeat so no extra colour is matched
+    return palette
+
+
+MIP_PALETTE = _MipPalette()
+
+
+def Render(image: Image.Image, profile: dict) -> Image.Image:
+    """Resize a frame to a profile's resolution and reduce it to its colour depth"""
+    size = tuple(profile['size'])
+    image = image.convert('RGBA')
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    # The watch draws frames on black, so flatten any transparency the same way
+    flat = Image.new('RGB', size)
+    flat.paste(image, mask=image.getchannel('A'))
+
+    colors = profile.get('colors', 0)
+    if colors == 64:
+        return flat.quantize(palette=MIP_PALETTE, dither=Image.Dither.NONE)
+    if colors:
+        return flat.quantize(colors=colors, dither=Image.Dither.NONE)
+    return flat
+
+
+class RenditionCache:
+    """Renditions keyed by (station, frame timestamp, profile), rendered on first request.
+
+    Buffered frames never change once written, so a rendition is rendered at
+    most once and every later request is plain file serving. Renditions of
+    frames that have left a station's buffer are removed when a new one is
+    made.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, RENDITIONS_SUBDIR)
+
+    def Path(self, radar_id: str, timestamp: str, profile_name: str) -> str:
+        ext = PROFILES[profile_name]['format']
+        return os.path.join(self.directory, radar_id, f'{timestamp}.{profile_name}.{ext}')
+
+    def Get(self, radar_id: str, timestamp: str, profile_name: str, source_path: str, keep: list = None) -> str:
+        """Path of the rendition, rendering it from source_path if it doesn't exist yet.
+
+        keep lists the station's buffered timestamps; renditions of any other
+        frame are pruned after a new rendition is written.
+        """
+        path = self.Path(radar_id, timestamp, profile_name)
+        exists = os.path.exists(path)
+        METRICS.Count('renditions', exists)
+        if exists:
+            return path
+
+        with _RenditionLock(path):
+            if os.path.exists(path):
+                return path  # Rendered by another request while we waited
+            profile = PROFILES[profile_name]
+            with Image.open(source_path) as im:
+                rendition = Render(im, profile)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            if profile['format'] == 'jpeg':
+                rendition.convert('RGB').save(tmp_path, 'JPEG', quality=RENDITION_JPEG_QUALITY)
+            else:
+                rendition.save(tmp_path, 'PNG', optimize=True)
+            os.replace(tmp_path, path)
+
+        if keep is not None:
+            self.Prune(radar_id, keep)
+        return path
+
+    def Prune(self, radar_id: str, keep: list):
+        """Delete a station's renditions of frames no longer in its buffer"""
+        station_dir = os.path.join(self.directory, radar_id)
+        keep = set(keep)
+        try:
+            names = os.listdir(station_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.split('.', 1)[0] not in keep and not name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(station_dir, name))
+                except FileNotFoundError:
+                    pass  # Pruned concurrently
@@ -0,0 +1,102 @@
+"""Crop-and-resize of BOM radar images to the watch geometry, keeping palette frames as indices"""
+from PIL import Image
+import numpy as np
+
+from compositor import ExpandPalette
+
+# BOM radar images are 512x512; trim the borders and the legend strip
+# (see parse_radar_coords.py for how this maps to the scale in RADAR_STATIONS)
+CROP_BORDER = 70 + 16
+CROP_DOWN = 70
+TARGET_SIZE = (240, 240)
+
+
+def RadarCropBox(size: tuple) -> tuple:
+    """Crop box (left, upper, right, lower) applied to a BOM image of the given size"""
+    width, height = size
+    return (CROP_BORDER, CROP_BORDER + CROP_DOWN, width - CROP_BORDER, height - CROP_BORDER + CROP_DOWN)
+
+
+def PaletteLut(img: Image.Image) -> np.ndarray:
+    """(256,) uint32 RGBA lookup table for a palette image, honouring its transparency"""
+    lut = np.zeros((256, 4), np.uint8)
+    palette = np.frombuffer(bytes(img.getpalette('RGB') or []), np.uint8).reshape(-1, 3)[:256]
+    lut[:len(palette), :3] = palette
+    lut[:, 3] = 255
+
+    transparency = img.info.get('transparency')
+    if isinstance(transparency, bytes):
+        lut[:len(transparency), 3] = np.frombuffer(transparency, np.uint8)[:256]
+    elif transparency is not None:
+        lut[transparency, 3] = 0
+    return lut.view(np.uint32).reshape(256)
+
+
+class PillowResampler:
+    """Thin wrapper over Pillow's crop + resize for one (source size, crop box, target size).
+
+    Nothing is precomputed: each image goes through Pillow's C resize. What
+    this adds is keeping palette frames as 1-byte indices. Pillow resizes
+    palette images with NEAREST whatever filter is asked for, so the crop box
+    is folded into that resize (no intermediate crop) and nothing is expanded
+    to RGBA until the compositor needs it. Other images are cropped and
+    Lanczos-resampled. Output is identical to crop() followed by
+    resize(LANCZOS) and convert('RGBA').
+
+    Gathering precomputed NEAREST rows and columns with NumPy instead was
+    measured at half the speed: just copying decoded frames out of Pillow costs
+    more than Pillow's whole resize.
+    """
+
+    def __init__(self, src_size: tuple, box: tuple, dst_size: tuple):
+        self.src_size = tuple(src_size)
+        self.box = tuple(box)
+        self.dst_size = tuple(dst_size)
+
+    def Indices(self, images: list) -> np.ndarray:
+        """(N, h, w) resampled palette indices for a list of palette images"""
+        return np.stack([np.asarray(img.resize(self.dst_size, Image.Resampling.NEAREST, self.box))
+                         for img in images])
+
+    def Palette(self, images: list) -> tuple:
+        """(N, h, w) resampled indices and (N, 256) RGBA palettes for palette images"""
+        return self.Indices(images), np.stack([PaletteLut(img) for img in images])
+
+    def Lanczos(self, images: list) -> np.ndarray:
+        """(N, h, w, 4) RGBA uint8 for a list of non-palette images"""
+        # Crop first: resizing from a box would sample pixels outside it at the edges
+        return np.stack([np.asarray(img.convert('RGBA').crop(self.box).resize(self.dst_size, Image.Resampling.LANCZOS))
+                         for img in images])
+
+
+def _Resampler(images: list, size: tuple) -> PillowResampler:
+    return PillowResampler(images[0].size, RadarCropBox(images[0].size), tuple(size))
+
+
+def CanResamplePalette(images: list) -> bool:
+    """Whether a batch can stay in palette form (all palette images of one size)"""
+    return all(img.mode == 'P' and img.size == images[0].size for img in images)
+
+
+def CropAndResizePalette(images: list, size: tuple = TARGET_SIZE) -> tuple:
+    """Crop and resize same-sized palette images, returning (indices, palettes)"""
+    return _Resampler(images, size).Palette(images)
+
+
+def CropAndResizeStack(images: list, size: tuple = TARGET_SIZE) -> np.ndarray:
+    """Crop and resize BOM images to an (N, h, w, 4) RGBA uint8 stack.
+
+    Images are grouped by source size and kind and each group goes through
+    the resampler for its geometry.
+    """
+    out = np.empty((len(images), size[1], size[0], 4), np.uint8)
+
+    groups = {}
+    for i, img in enumerate(images):
+        groups.setdefault((img.size, img.mode == 'P'), []).append(i)
+
+    for (src_size, is_palette), members in groups.items():
+        group = [images[i] for i in members]
+        resampler = _Resampler(group, size)
+        out[members] = ExpandPalette(*resampler.Palette(group)) if is_palette else resampler.Lanczos(group)
+    return out
@@ -0,0 +1,91 @@
+"""BetterWeather scraper process: keeps the default and pre-generated stations fresh.
+
+The pipeline itself lives in ftpscraper.py, which has no import-time side
+effects so the API server and benchmarks can import it directly.
+"""
+from cadence import CADENCES
+from compositor import LoadBackgroundArray
+from frame_store import FRAME_DIR, BackgroundPath, FrameStore
+from ftp_pool import FTP_POOL
+from ftpscraper import (CombineImages, CreateCompositeBackground, DownloadTransparencies, GenerateImagesForRadar,
+                        InitializeImageBuffer, PollForNewFrames, RefreshStation)
+from pathlib import Path
+from refresh_scheduler import RefreshScheduler
+from render_pool import RENDER_POOL
+from station_cache import StationDiskCache
+import os
+import subprocess
+import time
+
+# Configuration
+RADAR_ID = 'IDR711'  # Default radar station (can be changed based on GPS)
+SYDNEY_RADAR_ID = 'IDR711'  # Pre-generate Sydney for watch app
+image_count = 7
+composite_bg_path = BackgroundPath()
+
+def main():
+    # Ensure images directory exists
+    Path(FRAME_DIR).mkdir(parents=True, exist_ok=True)
+    RENDER_POOL.Start()
+
+    # Initialize: Download transparency layers and create composite background
+    print(f'Starting BetterWeather radar server for {RADAR_ID}...')
+    print('='*50)
+
+    with FTP_POOL.Connection():
+        # Download and create background, unless a previous run already did
+        print('\n[1/3] Setting up background layers...')
+        if os.path.exists(composite_bg_path):
+            print(f'Using existing {composite_bg_path}')
+        else:
+            transparency_layers = DownloadTransparencies(RADAR_ID)
+            if transparency_layers:
+                CreateCompositeBackground(transparency_layers, composite_bg_path)
+            else:
+                print('Warning: No transparency layers downloaded, radar will have no background')
+
+        # Populate image buffer with most recent radar data
+        print('\n[2/3] Populating image buffer...')
+        InitializeImageBuffer(RADAR_ID, image_count, composite_bg_path)
+
+    # Pre-generate Sydney (IDR063) images for watch app
+    print('\n[3/3] Pre-generating Sydney (IDR063) images for watch app...')
+    sydney_images_exist = len(FrameStore(SYDNEY_RADAR_ID, 7).Recover()) >= 7
+    if not sydney_images_exist:
+        success = GenerateImagesForRadar(SYDNEY_RADAR_ID, 7)
+        if success:
+            print(f'Successfully pre-generated {SYDNEY_RADAR_ID} images')
+        else:
+            print(f'Warning: Failed to pre-generate {SYDNEY_RADAR_ID} images')
+    else:
+        print(f'{SYDNEY_RADAR_ID} images already exist, skipping generation')
+
+    # Keep every station the watch app has recently asked for fresh, not just RADAR_ID
+    scheduler = RefreshScheduler(lambda radar_id: RefreshStation(radar_id, image_count),
+                                 pinned=[SYDNEY_RADAR_ID], num_images=image_count,
+                                 is_due=lambda radar_id: CADENCES.For(radar_id).IsDue())
+    scheduler.Start()
+
+    # Remove idle on-demand stations' files so disk use stays within STATION_CACHE_MAX_BYTES
+    StationDiskCache(pinned=[RADAR_ID, SYDNEY_RADAR_ID]).Start()
+
+    print('='*50)
+    print('Initialization complete! Starting continuous updates...\n')
+
+    # Main loop: poll just after each frame is expected to be published and composite it with the background
+    default_cadence = CADENCES.For(RADAR_ID, 'default')
+    while True:
+        time.sleep(max(0, default_cadence.NextPoll() - time.time()))
+
+        with FTP_POOL.Connection() as ftp:
+            # Crop, resize and composite new frames on background (if it exists) in memory,
+            # into the rolling buffer (no radar-specific naming for default station)
+            if PollForNewFrames(RADAR_ID, image_count, LoadBackgroundArray(composite_bg_path), None, 'default', ftp):
+                # Create composite grid image
+                CombineImages(image_count, 3)
+
+            subprocess.call('./updateDNS.sh', stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+if __name__ == '__main__':
+    main()
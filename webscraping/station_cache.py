@@ -0,0 +1,296 @@
+"""Bounded caches: decoded backgrounds in memory, station frame sets and layers on disk"""
+from collections import OrderedDict
+from frame_store import BACKGROUNDS_DIR, FRAME_DIR, LAYERS_DIR
+from metrics import METRICS
+from radar_stations import MosaicPrimary
+from refresh_scheduler import DemandTracker
+from renditions import RENDITIONS_SUBDIR
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+# Decoded backgrounds kept in memory (a 240x240 premultiplied background is 225 KB)
+BACKGROUND_CACHE_MAX_BYTES = int(os.environ.get('BACKGROUND_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Disk budget for on-demand stations' frames, renditions, bundles, backgrounds and layers
+STATION_CACHE_MAX_BYTES = int(os.environ.get('STATION_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+# Stations not requested for this long are removed from disk regardless of the budget
+STATION_CACHE_MAX_IDLE_SECONDS = float(os.environ.get('STATION_CACHE_MAX_IDLE_SECONDS', str(7 * 24 * 3600)))
+# How often the scraper sweeps the disk tier
+STATION_CACHE_SWEEP_SECONDS = float(os.environ.get('STATION_CACHE_SWEEP_SECONDS', '300'))
+
+STATION_CACHE_FILE = 'station_cache.json'
+TRANSPARENCY_LAYERS = ('background', 'topography', 'roads')
+
+_STATION_FILE = re.compile(r'^(IDR\w+)\.(?:manifest\.json(?:\.lock)?|slot\d+(?:\.overlay)?\.png|bundle\.(?:png|json))$')
+_BACKGROUND_FILE = re.compile(r'^composite_background_(IDR\w+)\.png$')
+_LAYER_FILE = re.compile(r'^(IDR\w+)\.(?:' + '|'.join(TRANSPARENCY_LAYERS) + r')\.png$')
+
+
+def _Entries(directory: str) -> list:
+    """[(entry, stat)] of the files in a directory, skipping ones removed while listing"""
+    files = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        try:
+            if entry.is_file():
+                files.append((entry, entry.stat()))
+        except FileNotFoundError:
+            pass
+    return files
+
+
+def _Ratio(hits: int, misses: int) -> float:
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+class ArrayCache:
+    """LRU of decoded arrays bounded by their total size in bytes.
+
+    Entries are keyed by path and carry a version (the file's mtime) so a
+    rewritten file is decoded again. Least recently used entries are evicted
+    once the total exceeds max_bytes; an array larger than the whole budget
+    is returned to the caller but not kept.
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (version, array), least recently used first
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def Get(self, key, version):
+        """The cached array for key at version, None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        METRICS.Count(self.name, hit)
+        return entry[1] if hit else None
+
+    def Put(self, key, version, array):
+        with self._lock:
+            self._Remove(key)
+            if array.nbytes <= self.max_bytes:
+                self._entries[key] = (version, array)
+                self.bytes += array.nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+                METRICS.Evicted(self.name, evicted.nbytes)
+            size = self.bytes
+        METRICS.SetSize(self.name, size)
+        return array
+
+    def Discard(self, key):
+        with self._lock:
+            self._Remove(key)
+            size = self.bytes
+        METRICS.SetSize(self.name, size)
+
+    def _Remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1].nbytes
+
+    def Stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': _Ratio(self.hits, self.misses),
+                'evictions': self.evictions,
+            }
+
+
+# Premultiplied station backgrounds shared by every generation in this process (see compositor.py)
+BACKGROUND_CACHE = ArrayCache('backgrounds', BACKGROUND_CACHE_MAX_BYTES)
+
+
+class StationDiskCache:
+    """Disk tier: evicts whole on-demand stations by last access and total size.
+
+    A station's entry is everything generated for it: its frame buffer
+    (slots, overlays, manifest), bundle, device renditions, composite
+    background and downloaded transparency layers (LAYERS_DIR; layers checked
+    into radar_transparencies are never removed). Last access is when the
+    station was last requested (from the API server's demand table), falling
+    back to its newest file for stations cached before tracking began.
+
+    Each sweep removes stations idle for longer than max_idle, then the least
+    recently accessed ones until the total is within max_bytes. Pinned
+    stations and the default buffer are never removed, and neither are hot
+    stations (requested within HOT_STATION_TTL_SECONDS) since the scheduler
+    would only regenerate them. Removing a station deletes its manifest
+    first, so the API server sees an empty buffer and generates it again on
+    the next request. Hit ratio and eviction stats are written to
+    station_cache.json in the images directory.
+    """
+
+    def __init__(self, directory: str = FRAME_DIR, backgrounds_dir: str = BACKGROUNDS_DIR,
+                 layers_dir: str = LAYERS_DIR, max_bytes: int = STATION_CACHE_MAX_BYTES,
+                 max_idle: float = STATION_CACHE_MAX_IDLE_SECONDS, pinned: list = (),
+                 memory: ArrayCache = BACKGROUND_CACHE):
+        self.directory = directory
+        self.backgrounds_dir = backgrounds_dir
+        self.layers_dir = layers_dir
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self.pinned = set(pinned)
+        self.memory = memory
+        self.demand = DemandTracker(directory)
+        self.path = os.path.join(directory, STATION_CACHE_FILE)
+
+        self._access = self._LoadAccess()  # radar_id -> last requested (unix time)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.bytes = 0
+        self.stations = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def _LoadAccess(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f).get('last_access', {})
+        except (OSError, ValueError):
+            return {}
+
+    def Files(self) -> dict:
+        """{radar_id: [(path, bytes, mtime)]} of everything cached for each station"""
+        stations = {}
+        for directory, pattern in ((self.directory, _STATION_FILE), (self.backgrounds_dir, _BACKGROUND_FILE),
+                                   (self.layers_dir, _LAYER_FILE)):
+            for entry, stat in _Entries(directory):
+                match = pattern.match(entry.name)
+                if match:
+                    stations.setdefault(match.group(1), []).append((entry.path, stat.st_size, stat.st_mtime))
+
+        renditions_dir = os.path.join(self.directory, RENDITIONS_SUBDIR)
+        radar_ids = os.listdir(renditions_dir) if os.path.isdir(renditions_dir) else []
+        for radar_id in radar_ids:
+            for entry, stat in _Entries(os.path.join(renditions_dir, radar_id)):
+                stations.setdefault(radar_id, []).append((entry.path, stat.st_size, stat.st_mtime))
+        return stations
+
+    def Sweep(self) -> list:
+        """Evict idle and least recently used stations, returning the ones removed"""
+        now = time.time()
+        hot = self.demand.Load()
+        files = self.Files()
+        with self._lock:
+            for radar_id, (_, last_seen) in hot.items():
+                self._access[radar_id] = max(self._access.get(radar_id, 0), last_seen)
+            self._access = {radar_id: at for radar_id, at in self._access.items() if radar_id in files}
+            for radar_id, station_files in files.items():
+                self._access.setdefault(radar_id, max(mtime for _, _, mtime in station_files))
+            access = dict(self._access)
+
+        sizes = {radar_id: sum(size for _, size, _ in station_files) for radar_id, station_files in files.items()}
+        total = sum(sizes.values())
+        # A hot mosaic is drawn on its station's background, so keep that station too
+        keep = self.pinned | set(hot) | {MosaicPrimary(radar_id) for radar_id in hot}
+        evict = []
+        for radar_id in sorted(files, key=lambda r: access[r]):  # Least recently accessed first
+            if radar_id in keep:
+                continue
+            if now - access[radar_id] > self.max_idle or total > self.max_bytes:
+                evict.append(radar_id)
+                total -= sizes[radar_id]
+        if total > self.max_bytes:
+            print(f'Station cache holds {total} bytes of hot or pinned stations, over its {self.max_bytes} budget')
+
+        for radar_id in evict:
+            self._Evict(radar_id, files[radar_id])
+            print(f'Evicted {radar_id} from the station cache ({sizes[radar_id]} bytes, '
+                  f'last requested {(now - access[radar_id]) / 3600:.1f}h ago)')
+        with self._lock:
+            for radar_id in evict:
+                self._access.pop(radar_id, None)
+            self.evictions += len(evict)
+            self.evicted_bytes += sum(sizes[radar_id] for radar_id in evict)
+            self.stations = len(files) - len(evict)
+            self.bytes = total
+        METRICS.SetSize('station_disk', total)
+        self.WriteStats()
+        return evict
+
+    def _Evict(self, radar_id: str, station_files: list):
+        manifest = os.path.join(self.directory, f'{radar_id}.manifest.json')
+        nbytes = 0
+        # Manifest first, so the API server sees an empty buffer; its lock file last
+        for path, size, _ in sorted(station_files, key=lambda f: (f[0] != manifest, f[0] == manifest + '.lock')):
+            try:
+                os.remove(path)
+                nbytes += size
+            except FileNotFoundError:
+                pass  # Replaced or removed concurrently
+            if _BACKGROUND_FILE.match(os.path.basename(path)):
+                self.memory.Discard(os.path.abspath(path))
+        shutil.rmtree(os.path.join(self.directory, RENDITIONS_SUBDIR, radar_id), ignore_errors=True)
+        METRICS.Evicted('station_disk', nbytes)
+
+    def Stats(self) -> dict:
+        """Disk tier size and evictions, plus hit ratios of the caches in front of it"""
+        snapshot = METRICS.Snapshot()['caches']
+        with self._lock:
+            stats = {
+                'stations': self.stations,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'max_idle_s': self.max_idle,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+            }
+        stats['hit_ratio'] = {cache: _Ratio(counts['hit'], counts['miss']) for cache, counts in snapshot.items()}
+        stats['memory'] = self.memory.Stats()
+        return stats
+
+    def WriteStats(self):
+        with self._lock:
+            access = dict(self._access)
+        tmp_path = f'{self.path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': time.time(), **self.Stats(), 'last_access': access}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Could not write station cache stats {self.path}: {e}')
+
+    def _Loop(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.Sweep()
+                METRICS.WriteSnapshot()
+            except Exception as e:
+                print(f'Station cache sweep error: {e}')
+            self._stop.wait(interval)
+
+    def Start(self, interval: float = STATION_CACHE_SWEEP_SECONDS):
+        """Sweep on a background thread every interval seconds"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._Loop, args=(interval,), name='station-cache', daemon=True)
+            self._thread.start()
+
+    def Stop(self):
+        self._stop.set()
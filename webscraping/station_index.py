@@ -0,0 +1,99 @@
+"""Precomputed spatial index over BOM radar sites for nearest-station lookup"""
+from collections import defaultdict
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+# RADAR_STATIONS scale is metres per watch pixel: the 340 px crop of a
+# 512 px image spanning twice the range, resized to 240 px
+# (see parse_radar_coords.py)
+_KM_PER_SCALE = 240 * 512 / ((512 - 2 * (70 + 16)) * 2 * 1000)
+
+
+def RangeKm(scale: float) -> float:
+    """Radar range (radius, km) of a RADAR_STATIONS entry from its scale"""
+    return round(scale * _KM_PER_SCALE)
+
+
+def UnitVectors(lats, lons) -> np.ndarray:
+    """(N, 3) unit-sphere vectors for latitudes/longitudes in degrees"""
+    lat = np.radians(np.asarray(lats, np.float64))
+    lon = np.radians(np.asarray(lons, np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _GreatCircleKm(dots: np.ndarray) -> np.ndarray:
+    """Great-circle distance for dot products of unit vectors (matches haversine)"""
+    chord = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * dots))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, chord / 2))
+
+
+class StationIndex:
+    """Nearest-site lookup over RADAR_STATIONS with one entry per physical site.
+
+    Each BOM site is listed once per range (IDRxx1 = 512 km to IDRxx4 =
+    64 km), so entries are grouped by site and the index holds one unit
+    vector per site. A query is a single matrix product against all sites;
+    the range variant is then picked from the site's entries by scale.
+    """
+
+    def __init__(self, stations: dict):
+        sites = defaultdict(list)
+        for radar_id, info in stations.items():
+            sites[radar_id[:-1]].append((radar_id, info))
+
+        self.sites = []
+        for site_id, variants in sites.items():
+            # Widest range first, i.e. largest scale
+            variants.sort(key=lambda variant: -variant[1]['scale'])
+            self.sites.append({
+                'site': site_id,
+                'name': variants[0][1]['name'],
+                'lat': variants[0][1]['lat'],
+                'lon': variants[0][1]['lon'],
+                'variants': [(radar_id, RangeKm(info['scale'])) for radar_id, info in variants],
+            })
+
+        self._vectors = UnitVectors([site['lat'] for site in self.sites],
+                                    [site['lon'] for site in self.sites])
+
+    def Variant(self, site: dict, range_km: float = None) -> tuple:
+        """(radar_id, range_km) of the site's narrowest range covering range_km.
+
+        Without range_km the widest range is used; if no range is wide
+        enough the widest is returned.
+        """
+        if range_km is None:
+            return site['variants'][0]
+        covering = [variant for variant in site['variants'] if variant[1] >= range_km]
+        return covering[-1] if covering else site['variants'][0]
+
+    def NearestMany(self, lats, lons, k: int = 1, range_km: float = None) -> list:
+        """k nearest sites for each coordinate, as lists of result dicts, nearest first"""
+        queries = UnitVectors(lats, lons).reshape(-1, 3)
+        k = max(1, min(k, len(self.sites)))
+
+        dots = queries @ self._vectors.T
+        if k == 1:
+            nearest = np.argmax(dots, axis=1)[:, np.newaxis]
+        else:
+            nearest = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(dots, nearest, axis=1), axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+        distances = _GreatCircleKm(np.take_along_axis(dots, nearest, axis=1))
+
+        results = []
+        for sites, site_distances in zip(nearest.tolist(), distances.tolist()):
+            matches = []
+            for site_index, distance in zip(sites, site_distances):
+                site = self.sites[site_index]
+                radar_id, variant_range = self.Variant(site, range_km)
+                matches.append({'radar_id': radar_id, 'radar_name': site['name'],
+                                'distance_km': distance, 'range_km': variant_range})
+            results.append(matches)
+        return results
+
+    def Nearest(self, lat: float, lon: float, k: int = 1, range_km: float = None) -> list:
+        """k nearest sites to one coordinate, nearest first"""
+        return self.NearestMany([lat], [lon], k, range_km)[0]